@@ -0,0 +1,387 @@
+"""
+analytics/backtest.py
+─────────────────────
+Copy-trade backtest (README item 6): follow a set of wallets, buy a fixed
+USD amount of every token they buy, sell after a fixed hold, and measure
+ROI. Every (buy size, hold, wallet subset) combination of a grid is
+evaluated.
+
+A Market holds the inputs column-wise as NumPy arrays:
+    buys     wallet index, token index, timestamp of every followed buy
+    prices   every token's (ts, price) ticks, concatenated and sorted by
+             (token, ts)
+
+Per-trade prices are looked up for all buys at once with one searchsorted
+on a packed (token << 40 | ts) key. For one hold time, the multiplier of
+every trade is a single vector. It is summed per wallet with bincount,
+and a subset x wallet mask matrix product then gives every subset and
+buy size at once. Hold times are split across a process pool. Each
+worker receives the Market once, through its initializer.
+
+Costs: FEE_USD per swap (priority + router fees) on entry and exit, plus
+SLIPPAGE_BPS on each side. This is why buy size matters at all.
+
+Run:
+    python -m analytics.backtest --synthetic [--wallets 200 --tokens 1000 --buys 100000]
+    python -m analytics.backtest --fixtures analytics/fixtures/wallet_swaps.json
+        [--sizes 25,100,500] [--holds 5m,1h,6h,1d] [--subsets all,each,random:10:100]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+FEE_USD = 0.5  # per swap, paid on entry and on exit
+SLIPPAGE_BPS = 100  # per side
+ENTRY_DELAY = 5  # seconds between the wallet's buy and ours
+TS_BITS = 40  # timestamps below 2**40 (year 36812) pack next to the token index
+
+RESULT_DTYPE = np.dtype(
+    [
+        ("size_usd", "f8"),
+        ("hold", "i8"),
+        ("subset", "i4"),
+        ("trades", "i8"),
+        ("pnl_usd", "f8"),
+        ("roi", "f8"),
+        ("win_rate", "f8"),
+    ]
+)
+
+
+class Market:
+    """Followed buys plus price ticks, as flat arrays."""
+
+    def __init__(
+        self,
+        buy_wallet: np.ndarray,
+        buy_token: np.ndarray,
+        buy_ts: np.ndarray,
+        price_token: np.ndarray,
+        price_ts: np.ndarray,
+        price: np.ndarray,
+        wallets: Sequence[str],
+        tokens: Sequence[str],
+    ):
+        order = np.lexsort((price_ts, price_token))
+        self.price_token = price_token[order].astype(np.int64)
+        self.price_ts = price_ts[order].astype(np.int64)
+        self.price = price[order].astype(np.float64)
+        self.price_key = (self.price_token << TS_BITS) | self.price_ts
+        self.buy_wallet = buy_wallet.astype(np.int64)
+        self.buy_token = buy_token.astype(np.int64)
+        self.buy_ts = buy_ts.astype(np.int64)
+        self.wallets = list(wallets)
+        self.tokens = list(tokens)
+        self.skill: Optional[np.ndarray] = None  # synthetic markets only
+
+    def __repr__(self) -> str:
+        return (
+            f"Market({len(self.wallets)} wallets, {len(self.tokens)} tokens, "
+            f"{len(self.buy_ts)} buys, {len(self.price)} ticks)"
+        )
+
+    def price_at(self, token: np.ndarray, ts: np.ndarray) -> np.ndarray:
+        """Last tick at or before ts, per element. NaN where the token has no tick yet."""
+        idx = np.searchsorted(self.price_key, (token << TS_BITS) | ts, side="right") - 1
+        clipped = np.clip(idx, 0, None)
+        valid = (idx >= 0) & (self.price_token[clipped] == token)
+        return np.where(valid, self.price[clipped], np.nan)
+
+
+# ─── evaluation ──────────────────────────────────────────────────────────────
+def trade_multipliers(
+    market: Market, hold: int, delay: int = ENTRY_DELAY, slippage_bps: float = SLIPPAGE_BPS
+) -> np.ndarray:
+    """exit/entry value ratio of every buy after slippage; NaN if it can't be priced."""
+    entry_ts = market.buy_ts + delay
+    entry = market.price_at(market.buy_token, entry_ts)
+    exit_ = market.price_at(market.buy_token, entry_ts + hold)
+    keep = 1.0 - slippage_bps / 10_000
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mult = exit_ / entry * keep * keep
+    mult[~(entry > 0)] = np.nan
+    return mult
+
+
+def evaluate_hold(
+    market: Market,
+    hold: int,
+    sizes: np.ndarray,
+    subsets: np.ndarray,
+    fee_usd: float = FEE_USD,
+    delay: int = ENTRY_DELAY,
+    slippage_bps: float = SLIPPAGE_BPS,
+) -> np.ndarray:
+    """
+    Results for one hold time across every subset x size. subsets is a bool
+    matrix (n_subsets, n_wallets). Unpriceable buys are skipped.
+    """
+    mult = trade_multipliers(market, hold, delay, slippage_bps)
+    priced = ~np.isnan(mult)
+    wallet, mult = market.buy_wallet[priced], mult[priced]
+    n_wallets = len(market.wallets)
+
+    # per-wallet totals first, so subsets cost (n_subsets x n_wallets), not x n_buys
+    w_trades = np.bincount(wallet, minlength=n_wallets).astype(np.float64)
+    w_gross = np.bincount(wallet, weights=mult, minlength=n_wallets)
+    # trade pnl = size * (mult - 1) - 2 * fee, so a win needs mult > 1 + 2 * fee / size
+    w_wins = np.stack(
+        [
+            np.bincount(wallet, weights=(mult > 1.0 + 2 * fee_usd / size), minlength=n_wallets)
+            for size in sizes
+        ],
+        axis=1,
+    )  # (W, B)
+
+    sub = subsets.astype(np.float64)
+    trades = sub @ w_trades  # (S,)
+    gross = sub @ w_gross  # (S,) sum of multipliers
+    wins = sub @ w_wins  # (S, B)
+
+    pnl = sizes[None, :] * (gross - trades)[:, None] - 2 * fee_usd * trades[:, None]  # (S, B)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi = pnl / (sizes[None, :] * trades[:, None])
+        win_rate = wins / trades[:, None]
+
+    n_subsets, n_sizes = pnl.shape
+    out = np.empty(n_subsets * n_sizes, dtype=RESULT_DTYPE)
+    out["size_usd"] = np.tile(sizes, n_subsets)
+    out["hold"] = hold
+    out["subset"] = np.repeat(np.arange(n_subsets), n_sizes)
+    out["trades"] = np.repeat(trades, n_sizes).astype(np.int64)
+    out["pnl_usd"] = pnl.ravel()
+    out["roi"] = np.nan_to_num(roi.ravel())
+    out["win_rate"] = np.nan_to_num(win_rate.ravel())
+    return out
+
+
+_worker: Dict = {}
+
+
+def _init_worker(market: Market, sizes: np.ndarray, subsets: np.ndarray, kwargs: Dict) -> None:
+    _worker.update(market=market, sizes=sizes, subsets=subsets, kwargs=kwargs)
+
+
+def _run_holds(holds: List[int]) -> np.ndarray:
+    w = _worker
+    return np.concatenate(
+        [evaluate_hold(w["market"], h, w["sizes"], w["subsets"], **w["kwargs"]) for h in holds]
+    )
+
+
+def sweep(
+    market: Market,
+    sizes: Sequence[float],
+    holds: Sequence[int],
+    subsets: np.ndarray,
+    workers: Optional[int] = None,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Full grid, sorted by roi descending (then hold, subset, size). Holds
+    are split across `workers` processes (os.cpu_count() by default);
+    workers=1 runs in process.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    holds = [int(h) for h in holds]
+    workers = min(workers or os.cpu_count() or 1, len(holds))
+    if workers <= 1:
+        _init_worker(market, sizes, subsets, kwargs)
+        results = _run_holds(holds)
+    else:
+        chunks = [holds[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(market, sizes, subsets, kwargs),
+        ) as pool:
+            results = np.concatenate(list(pool.map(_run_holds, chunks)))
+    # ties broken on the grid position, so the order doesn't depend on how
+    # holds were split across workers
+    order = np.lexsort(
+        (results["size_usd"], results["subset"], results["hold"], -results["roi"])
+    )
+    return results[order]
+
+
+# ─── subsets ─────────────────────────────────────────────────────────────────
+def build_subsets(spec: str, n_wallets: int, seed: int = 0) -> Tuple[np.ndarray, List[str]]:
+    """
+    Comma-separated: "all", "each" (one subset per wallet), "random:K:N"
+    (N random subsets of K wallets). Returns (bool matrix, labels).
+    """
+    rng = np.random.default_rng(seed)
+    rows, labels = [], []
+    for part in spec.split(","):
+        kind, *args = part.strip().split(":")
+        if kind == "all":
+            rows.append(np.ones((1, n_wallets), dtype=bool))
+            labels.append("all")
+        elif kind == "each":
+            rows.append(np.eye(n_wallets, dtype=bool))
+            labels.extend(f"wallet:{i}" for i in range(n_wallets))
+        elif kind == "random":
+            k, n = int(args[0]), int(args[1])
+            m = np.zeros((n, n_wallets), dtype=bool)
+            for i in range(n):
+                m[i, rng.choice(n_wallets, size=min(k, n_wallets), replace=False)] = True
+            rows.append(m)
+            labels.extend(f"random{k}:{i}" for i in range(n))
+        else:
+            raise ValueError(f"unknown subset spec: {part}")
+    return np.vstack(rows), labels
+
+
+# ─── data ────────────────────────────────────────────────────────────────────
+def synthetic_market(
+    n_wallets: int = 200,
+    n_tokens: int = 1000,
+    n_buys: int = 100_000,
+    ticks_per_token: int = 500,
+    seed: int = 0,
+) -> Market:
+    """
+    Memecoin-shaped random data: each token pumps from launch to a random
+    peak and then bleeds out, with multiplicative noise on top. Wallets have
+    a hidden skill in [0, 1]. Skilled wallets buy early in the pump, the rest
+    buy uniformly over the token's life, so a good sweep should rank the
+    skilled subsets first.
+    """
+    rng = np.random.default_rng(seed)
+    day = 86_400
+    launch = rng.integers(1_700_000_000, 1_700_000_000 + 30 * day, n_tokens)
+    life = rng.integers(day // 4, 7 * day, n_tokens)
+    peak_at = rng.uniform(0.05, 0.5, n_tokens)
+    peak_mult = np.exp(rng.normal(1.0, 1.2, n_tokens))
+
+    frac = np.sort(rng.random((n_tokens, ticks_per_token)), axis=1)
+    frac[:, 0] = 0.0
+    pump = np.minimum(frac / peak_at[:, None], 1.0)
+    dump = np.clip((frac - peak_at[:, None]) / (1 - peak_at[:, None]), 0.0, 1.0)
+    curve = peak_mult[:, None] ** pump * (0.02 ** dump)
+    noise = np.exp(np.cumsum(rng.normal(0, 0.03, frac.shape), axis=1))
+    price = 1e-5 * curve * noise
+    price_ts = launch[:, None] + (frac * life[:, None]).astype(np.int64)
+    price_token = np.repeat(np.arange(n_tokens), ticks_per_token)
+
+    skill = rng.random(n_wallets)
+    buy_wallet = rng.integers(0, n_wallets, n_buys)
+    buy_token = rng.integers(0, n_tokens, n_buys)
+    # skilled wallets draw their entry from early in the pump
+    s = skill[buy_wallet]
+    entry = np.where(
+        rng.random(n_buys) < s,
+        rng.random(n_buys) * peak_at[buy_token] * 0.5,
+        rng.random(n_buys),
+    )
+    buy_ts = launch[buy_token] + (entry * life[buy_token]).astype(np.int64)
+
+    market = Market(
+        buy_wallet, buy_token, buy_ts,
+        price_token, price_ts.ravel(), price.ravel(),
+        wallets=[f"W{i}" for i in range(n_wallets)],
+        tokens=[f"T{i}" for i in range(n_tokens)],
+    )
+    market.skill = skill
+    return market
+
+
+def market_from_fills(wallet_fills: Dict[str, List[Dict]]) -> Market:
+    """
+    Market from decoded fills (analytics/decoder.py), keyed by wallet. The
+    followed buys are the wallets' buys. Every fill doubles as a price tick
+    (value_usd / amount), since that is a real execution price.
+    """
+    wallets = sorted(wallet_fills)
+    tokens = sorted({f["mint"] for fills in wallet_fills.values() for f in fills})
+    token_idx = {m: i for i, m in enumerate(tokens)}
+    bw, bt, bts, pt, pts, px = [], [], [], [], [], []
+    for w, wallet in enumerate(wallets):
+        for f in wallet_fills[wallet]:
+            if f["amount"] <= 0:
+                continue
+            t = token_idx[f["mint"]]
+            pt.append(t)
+            pts.append(f["ts"])
+            px.append(f["value_usd"] / f["amount"])
+            if f["side"] == "buy":
+                bw.append(w)
+                bt.append(t)
+                bts.append(f["ts"])
+    arr = lambda xs, dt: np.asarray(xs, dtype=dt)  # noqa: E731
+    return Market(
+        arr(bw, np.int64), arr(bt, np.int64), arr(bts, np.int64),
+        arr(pt, np.int64), arr(pts, np.int64), arr(px, np.float64),
+        wallets=wallets, tokens=tokens,
+    )
+
+
+def parse_duration(text: str) -> int:
+    """"90" / "90s" / "5m" / "6h" / "2d" -> seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86_400}
+    text = text.strip()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--fixtures", nargs="+", help="recorded transactions JSON (analytics/pnl.py format)")
+    parser.add_argument("--wallets", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--buys", type=int, default=100_000)
+    parser.add_argument("--sizes", default="25,50,100,250,500,1000")
+    parser.add_argument("--holds", default="1m,5m,15m,30m,1h,2h,4h,6h,12h,1d")
+    parser.add_argument("--subsets", default="all,random:10:100,random:25:100")
+    parser.add_argument("--fee-usd", type=float, default=FEE_USD)
+    parser.add_argument("--slippage-bps", type=float, default=SLIPPAGE_BPS)
+    parser.add_argument("--delay", type=int, default=ENTRY_DELAY, help="seconds after the wallet's buy")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-trades", type=int, default=20, help="hide configs with fewer trades")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        from analytics.decoder import decode_transactions
+        from analytics.pnl import load_fixture
+
+        fills = {}
+        for path in args.fixtures:
+            fx = load_fixture(path)
+            fills.setdefault(fx["wallet"], []).extend(
+                decode_transactions(fx["transactions"], fx["wallet"], fx["sol_usd"])
+            )
+        market = market_from_fills(fills)
+    elif args.synthetic:
+        market = synthetic_market(args.wallets, args.tokens, args.buys)
+    else:
+        parser.error("pass --synthetic or --fixtures")
+
+    sizes = [float(s) for s in args.sizes.split(",")]
+    holds = [parse_duration(h) for h in args.holds.split(",")]
+    subsets, labels = build_subsets(args.subsets, len(market.wallets))
+    n_configs = len(sizes) * len(holds) * len(subsets)
+    print(f"[INFO] {market}; {n_configs} configurations")
+
+    start = time.perf_counter()
+    results = sweep(
+        market, sizes, holds, subsets, workers=args.workers,
+        fee_usd=args.fee_usd, delay=args.delay, slippage_bps=args.slippage_bps,
+    )
+    print(f"[INFO] Sweep finished in {time.perf_counter() - start:.2f}s")
+    for r in results[results["trades"] >= args.min_trades][: args.top]:
+        print(
+            f"  {labels[r['subset']]:>16}  size ${r['size_usd']:>7,.0f}  hold {r['hold']:>6}s  "
+            f"trades {r['trades']:>6}  pnl ${r['pnl_usd']:>12,.2f}  roi {r['roi']:>7.2%}  "
+            f"win {r['win_rate']:>6.1%}"
+        )
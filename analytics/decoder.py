@@ -0,0 +1,195 @@
+"""
+analytics/decoder.py
+────────────────────
+Decodes jsonParsed Solana transactions (getTransaction, encoding=jsonParsed)
+into buy/sell fills for one wallet.
+
+No DEX-specific parsing is needed: a swap shows up as the wallet's token
+balance of one mint going up or down while its quote balance (SOL/WSOL or
+a USD stablecoin) moves the other way. The size of the quote move is the
+fill value. Failed transactions, plain transfers and token-for-token swaps
+(no quote leg, so no price) produce no fill.
+
+decode_transfers pulls plain SOL/SPL transfers between wallets out of the
+same transactions, for the fund-flow graph (analytics/fund_flow.py).
+
+sol_usd is either one SOL/USD price or a callable ts -> price (e.g.
+scrapers.binance.PriceHistory), so each SOL leg is valued at its own
+blockTime.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+LAMPORTS_PER_SOL = 1_000_000_000
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+USD_MINTS = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
+}
+DUST = 1e-9  # ignore token balance changes smaller than this
+MIN_QUOTE_USD = 0.01  # quote moves below this are rent/rounding, not a trade
+
+SolUsd = Union[float, Callable[[int], float]]
+
+
+def _sol_price(sol_usd: SolUsd, ts: int) -> float:
+    return sol_usd(ts) if callable(sol_usd) else sol_usd
+
+
+def _account_index(tx: Dict, wallet: str) -> Optional[int]:
+    for i, key in enumerate(tx["transaction"]["message"]["accountKeys"]):
+        pubkey = key["pubkey"] if isinstance(key, dict) else key
+        if pubkey == wallet:
+            return i
+    return None
+
+
+def _token_deltas(meta: Dict, wallet: str) -> Dict[str, float]:
+    """Net ui-amount change per mint over every token account the wallet owns."""
+    deltas: Dict[str, float] = {}
+    for sign, key in ((-1, "preTokenBalances"), (1, "postTokenBalances")):
+        for bal in meta.get(key) or []:
+            if bal.get("owner") != wallet:
+                continue
+            amount = float(bal["uiTokenAmount"].get("uiAmountString") or 0)
+            deltas[bal["mint"]] = deltas.get(bal["mint"], 0.0) + sign * amount
+    return deltas
+
+
+def decode_transaction(tx: Dict, wallet: str, sol_usd: SolUsd) -> Optional[Dict]:
+    """
+    Returns {"signature", "ts", "mint", "side", "amount", "value_usd"} or
+    None if tx is not a priced swap for wallet. Values are in USD, with SOL
+    legs converted at the SOL price of the tx's blockTime.
+    """
+    meta = tx.get("meta") or {}
+    if meta.get("err") is not None:
+        return None
+    index = _account_index(tx, wallet)
+    if index is None:
+        return None
+
+    lamports = meta["postBalances"][index] - meta["preBalances"][index]
+    if index == 0:  # fee payer: the network fee is not part of the trade
+        lamports += meta.get("fee") or 0
+    sol = lamports / LAMPORTS_PER_SOL
+    usd = 0.0
+    tokens = {}
+    for mint, delta in _token_deltas(meta, wallet).items():
+        if abs(delta) <= DUST:
+            continue
+        if mint == WSOL_MINT:
+            sol += delta
+        elif mint in USD_MINTS:
+            usd += delta
+        else:
+            tokens[mint] = delta
+
+    if len(tokens) != 1:
+        return None
+    (mint, amount), = tokens.items()
+    ts = tx.get("blockTime") or 0
+    quote = (sol * _sol_price(sol_usd, ts) if sol else 0.0) + usd
+    # a buy spends quote, a sell receives it; same-sign moves are transfers
+    if amount > 0 and quote <= -MIN_QUOTE_USD:
+        side = "buy"
+    elif amount < 0 and quote >= MIN_QUOTE_USD:
+        side = "sell"
+    else:
+        return None
+
+    return {
+        "signature": tx["transaction"]["signatures"][0],
+        "ts": ts,
+        "mint": mint,
+        "side": side,
+        "amount": abs(amount),
+        "value_usd": abs(quote),
+    }
+
+
+def decode_transactions(txs: Iterable[Dict], wallet: str, sol_usd: SolUsd) -> List[Dict]:
+    fills = []
+    for tx in txs:
+        if tx:
+            fill = decode_transaction(tx, wallet, sol_usd)
+            if fill:
+                fills.append(fill)
+    return fills
+
+
+def _token_accounts(tx: Dict) -> Dict[str, Dict]:
+    """token account pubkey -> {"owner", "mint", "decimals"} from the balance lists."""
+    keys = tx["transaction"]["message"]["accountKeys"]
+    meta = tx.get("meta") or {}
+    accounts = {}
+    for bal in (meta.get("preTokenBalances") or []) + (meta.get("postTokenBalances") or []):
+        key = keys[bal["accountIndex"]]
+        accounts[key["pubkey"] if isinstance(key, dict) else key] = {
+            "owner": bal.get("owner"),
+            "mint": bal["mint"],
+            "decimals": bal["uiTokenAmount"].get("decimals") or 0,
+        }
+    return accounts
+
+
+def decode_transfers(
+    tx: Dict, sol_usd: SolUsd, prices: Optional[Dict[str, float]] = None
+) -> List[Dict]:
+    """
+    Direct wallet-to-wallet SOL and SPL transfers in tx, as
+    {"signature", "ix", "ts", "source", "destination", "mint", "amount",
+    "value_usd"} with owner addresses (not token accounts). Only top-level
+    instructions count: inner transfers are program plumbing (pool legs,
+    fees), not one wallet paying another. Tokens without a price in prices
+    get value_usd 0.
+    """
+    meta = tx.get("meta") or {}
+    if meta.get("err") is not None:
+        return []
+    prices = prices or {}
+    accounts = None
+    out = []
+    for i, ix in enumerate(tx["transaction"]["message"].get("instructions") or []):
+        parsed = ix.get("parsed")
+        if not isinstance(parsed, dict):
+            continue
+        kind, info = parsed.get("type"), parsed.get("info") or {}
+        if ix.get("program") == "system" and kind == "transfer":
+            source, destination, mint = info.get("source"), info.get("destination"), WSOL_MINT
+            amount = (info.get("lamports") or 0) / LAMPORTS_PER_SOL
+        elif ix.get("program") == "spl-token" and kind in ("transfer", "transferChecked"):
+            if accounts is None:
+                accounts = _token_accounts(tx)
+            src, dst = accounts.get(info.get("source")), accounts.get(info.get("destination"))
+            if not src or not dst:
+                continue
+            source, destination, mint = src["owner"], dst["owner"], src["mint"]
+            if "tokenAmount" in info:
+                amount = float(info["tokenAmount"].get("uiAmountString") or 0)
+            else:
+                amount = int(info.get("amount") or 0) / 10 ** src["decimals"]
+        else:
+            continue
+        if not source or not destination or source == destination or amount <= DUST:
+            continue
+
+        if mint == WSOL_MINT:
+            value = amount * _sol_price(sol_usd, tx.get("blockTime") or 0)
+        elif mint in USD_MINTS:
+            value = amount
+        else:
+            value = amount * prices.get(mint, 0.0)
+        out.append(
+            {
+                "signature": tx["transaction"]["signatures"][0],
+                "ix": i,
+                "ts": tx.get("blockTime") or 0,
+                "source": source,
+                "destination": destination,
+                "mint": mint,
+                "amount": amount,
+                "value_usd": value,
+            }
+        )
+    return out
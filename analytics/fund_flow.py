@@ -0,0 +1,391 @@
+"""
+analytics/fund_flow.py
+──────────────────────
+Wallet clusters from fund flows: wallets that move meaningful money
+between each other, repeatedly, are treated as one entity.
+
+    ingest     fetch tracked wallets' transactions, store their direct
+               SOL/SPL transfers in flows.db (data/flow_data.py)
+    aggregate  fold transfers into one flow_edges row per wallet pair:
+               volume each way, count, first/last seen, and whether the
+               pair looks like a recurring payment (same amount, one
+               direction, regular interval: payroll, subscriptions)
+    build      union-find over edges above --min-volume / --min-transfers,
+               skipping recurring edges and hub wallets (exchanges,
+               routers) with more than --max-degree qualifying edges;
+               results replace clusters / cluster_members
+
+Memory stays bounded however many transfers there are: aggregation
+streams the pair-ordered index one row at a time, and union-find uses
+flat typed arrays indexed by wallet id (a few bytes per wallet, nothing per
+edge).
+
+Run:
+    python -m analytics.fund_flow ingest --member smart --sol-usd 150 [--limit 200]
+    python -m analytics.fund_flow build [--min-volume 1000] [--min-transfers 2] [--max-degree 25]
+    python -m analytics.fund_flow show <address>
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analytics.decoder import decode_transfers
+from data.flow_data import (
+    DB_PATH,
+    append_transfers,
+    connect_flows_db,
+    initialize_flows_db,
+)
+from data.storage import get_connection
+from data.wallet_queries import MEMBERSHIPS
+from data.writer import DBWriter
+from pipelines.executor import run_workers
+from scrapers.helius_utils import get_wallet_transactions, helius_session
+
+MIN_VOLUME_USD = 1_000  # edge must carry at least this much, both directions summed
+MIN_TRANSFERS = 2  # ...over at least this many transfers
+MAX_DEGREE = 25  # wallets linked to more qualifying peers than this are hubs
+MIN_CLUSTER_SIZE = 2
+
+RECURRING_MIN_N = 4  # fewer transfers than this can't establish a pattern
+RECURRING_AMOUNT_CV = 0.05  # amount stddev / mean at or below this = "same amount"
+RECURRING_GAP_CV = 0.25  # interval stddev / mean at or below this = "regular"
+RECURRING_MIN_GAP = 12 * 3600  # bots fire rapidly at fixed sizes; payments don't
+
+EDGE_FLUSH = 10_000
+
+
+# ─── ingest ──────────────────────────────────────────────────────────────────
+def tracked_wallets(member: str) -> List[str]:
+    """Every wallet in the woi or smart DB."""
+    _, path, table, column = MEMBERSHIPS[member]
+    if not os.path.exists(path):
+        return []
+    return [r[0] for r in get_connection(path).execute(f"SELECT {column} FROM {table}")]
+
+
+async def ingest_transfers(
+    wallets: Iterable[str],
+    sol_usd: float,
+    prices: Optional[Dict[str, float]] = None,
+    limit: int = 200,
+    concurrency: int = 8,
+    rpc_url: Optional[str] = None,
+) -> int:
+    """Stores the transfers in each wallet's last `limit` transactions. Returns wallets done."""
+    initialize_flows_db()
+    stored = 0
+
+    async def handle(wallet: str) -> None:
+        nonlocal stored
+        try:
+            txs = await get_wallet_transactions(wallet, limit=limit, rpc_url=rpc_url)
+        except Exception as e:
+            print(f"[WARN] Transactions for {wallet} failed: {e}")
+            return
+        transfers = [t for tx in txs if tx for t in decode_transfers(tx, sol_usd, prices)]
+        await writer.write(append_transfers, transfers)
+        stored += len(transfers)
+
+    writer = DBWriter(DB_PATH)
+    async with writer, helius_session():
+        done = await run_workers(wallets, handle, workers=concurrency)
+    print(f"[INFO] Stored {stored} transfers from {done} wallets")
+    return done
+
+
+# ─── aggregate ───────────────────────────────────────────────────────────────
+class _PairStats:
+    """Running totals for one wallet pair (Welford for amount and interval spread)."""
+
+    __slots__ = ("a", "b", "volume", "a_to_b", "b_to_a", "n", "first", "last",
+                 "mint", "one_mint", "amt_mean", "amt_m2", "gaps", "gap_mean", "gap_m2")
+
+    def __init__(self, a: int, b: int):
+        self.a, self.b = a, b
+        self.volume = self.a_to_b = self.b_to_a = 0.0
+        self.n = self.gaps = 0
+        self.first = self.last = 0
+        self.mint = None
+        self.one_mint = True
+        self.amt_mean = self.amt_m2 = self.gap_mean = self.gap_m2 = 0.0
+
+    def add(self, outgoing: int, ts: int, mint: str, amount: float, value: float) -> None:
+        self.volume += value
+        if outgoing:
+            self.a_to_b += value
+        else:
+            self.b_to_a += value
+        if self.n:
+            self.gaps += 1
+            gap = ts - self.last
+            delta = gap - self.gap_mean
+            self.gap_mean += delta / self.gaps
+            self.gap_m2 += delta * (gap - self.gap_mean)
+        else:
+            self.first = ts
+            self.mint = mint
+        self.one_mint = self.one_mint and mint == self.mint
+        self.n += 1
+        self.last = ts
+        # token amount, not USD: unpriced tokens still show a repeating size
+        delta = amount - self.amt_mean
+        self.amt_mean += delta / self.n
+        self.amt_m2 += delta * (amount - self.amt_mean)
+
+    def recurring(self) -> bool:
+        if self.n < RECURRING_MIN_N or not self.one_mint:
+            return False
+        if self.a_to_b and self.b_to_a:  # money goes both ways: a relationship, not a bill
+            return False
+        if self.gap_mean < RECURRING_MIN_GAP or self.amt_mean <= 0:
+            return False
+        amount_cv = math.sqrt(self.amt_m2 / self.n) / self.amt_mean
+        gap_cv = math.sqrt(self.gap_m2 / self.gaps) / self.gap_mean
+        return amount_cv <= RECURRING_AMOUNT_CV and gap_cv <= RECURRING_GAP_CV
+
+    def row(self) -> tuple:
+        return (self.a, self.b, self.volume, self.a_to_b, self.b_to_a, self.n,
+                self.first, self.last, int(self.recurring()))
+
+
+def aggregate_edges() -> Dict:
+    """Rebuilds flow_edges from transfers in one pass over idx_transfers_pair."""
+    initialize_flows_db()
+    conn = connect_flows_db()
+    conn.execute("DELETE FROM flow_edges")
+    insert = "INSERT INTO flow_edges VALUES (?,?,?,?,?,?,?,?,?)"
+    edges = recurring = 0
+    buffer = []
+    pair: Optional[_PairStats] = None
+
+    def emit(p: _PairStats) -> None:
+        nonlocal edges, recurring
+        buffer.append(p.row())
+        edges += 1
+        recurring += buffer[-1][-1]
+        if len(buffer) >= EDGE_FLUSH:
+            conn.executemany(insert, buffer)
+            buffer.clear()
+
+    try:
+        rows = conn.execute(
+            """
+            SELECT a_id, b_id, outgoing, ts, mint, amount, value_usd
+            FROM transfers ORDER BY a_id, b_id, ts
+            """
+        )
+        for a, b, outgoing, ts, mint, amount, value in rows:
+            if pair is None or pair.a != a or pair.b != b:
+                if pair is not None:
+                    emit(pair)
+                pair = _PairStats(a, b)
+            pair.add(outgoing, ts, mint, amount, value)
+        if pair is not None:
+            emit(pair)
+        conn.executemany(insert, buffer)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"edges": edges, "recurring": recurring}
+
+
+# ─── cluster ─────────────────────────────────────────────────────────────────
+def _find(parent: array, x: int) -> int:
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def build_clusters(
+    min_volume_usd: float = MIN_VOLUME_USD,
+    min_transfers: int = MIN_TRANSFERS,
+    max_degree: int = MAX_DEGREE,
+    min_size: int = MIN_CLUSTER_SIZE,
+) -> Dict:
+    """Connected components over qualifying edges; replaces clusters / cluster_members."""
+    initialize_flows_db()
+    conn = connect_flows_db()
+    n = (conn.execute("SELECT MAX(wallet_id) FROM flow_wallets").fetchone()[0] or 0) + 1
+    qualifying = (
+        "SELECT a_id, b_id, volume_usd FROM flow_edges "
+        "WHERE recurring = 0 AND volume_usd >= ? AND n >= ?"
+    )
+    params = (min_volume_usd, min_transfers)
+
+    degree = array("i", bytes(4 * n))
+    for a, b, _ in conn.execute(qualifying, params):
+        degree[a] += 1
+        degree[b] += 1
+
+    parent = array("i", range(n))
+    size = array("i", [1]) * n
+    volume = array("d", bytes(8 * n))
+    used = hubs = 0
+    for a, b, v in conn.execute(qualifying, params):
+        if degree[a] > max_degree or degree[b] > max_degree:
+            hubs += 1
+            continue
+        used += 1
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra != rb:
+            if size[ra] < size[rb]:  # union by size keeps trees shallow
+                ra, rb = rb, ra
+            parent[rb] = ra
+            size[ra] += size[rb]
+            volume[ra] += volume[rb]
+        volume[ra] += v
+
+    # cluster id = smallest wallet id in the component (stable across rebuilds)
+    cluster_of: Dict[int, int] = {}
+    now = int(time.time())
+    try:
+        conn.execute("DELETE FROM cluster_members")
+        conn.execute("DELETE FROM clusters")
+
+        def members():
+            for w in range(1, n):
+                root = _find(parent, w)
+                if size[root] >= min_size:
+                    yield w, cluster_of.setdefault(root, w)
+
+        conn.executemany("INSERT INTO cluster_members (wallet_id, cluster_id) VALUES (?, ?)", members())
+        conn.executemany(
+            "INSERT INTO clusters (cluster_id, size, volume_usd, built_at) VALUES (?, ?, ?, ?)",
+            ((cid, size[root], volume[root], now) for root, cid in cluster_of.items()),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"clusters": len(cluster_of), "edges_used": used, "hub_edges_skipped": hubs}
+
+
+# ─── reads ───────────────────────────────────────────────────────────────────
+class Cluster:
+    """One fund-flow cluster as stored by the last build_clusters run."""
+
+    def __init__(self, cluster_id: int, size: int, volume_usd: float, built_at: int):
+        self.cluster_id = cluster_id
+        self.size = size
+        self.volume_usd = volume_usd
+        self.built_at = built_at
+        self._members: Optional[List[str]] = None
+
+    def __repr__(self) -> str:
+        return f"Cluster({self.cluster_id}, size={self.size}, volume_usd={self.volume_usd:,.0f})"
+
+    @classmethod
+    def _from_row(cls, row) -> "Cluster":
+        return cls(row["cluster_id"], row["size"], row["volume_usd"], row["built_at"])
+
+    @classmethod
+    def get(cls, cluster_id: int) -> Optional["Cluster"]:
+        row = connect_flows_db().execute(
+            "SELECT * FROM clusters WHERE cluster_id = ?", (cluster_id,)
+        ).fetchone()
+        return cls._from_row(row) if row else None
+
+    @classmethod
+    def for_wallet(cls, address: str) -> Optional["Cluster"]:
+        row = connect_flows_db().execute(
+            """
+            SELECT c.* FROM flow_wallets w
+            JOIN cluster_members m ON m.wallet_id = w.wallet_id
+            JOIN clusters c ON c.cluster_id = m.cluster_id
+            WHERE w.address = ?
+            """,
+            (address,),
+        ).fetchone()
+        return cls._from_row(row) if row else None
+
+    @classmethod
+    def largest(cls, limit: int = 20) -> List["Cluster"]:
+        rows = connect_flows_db().execute(
+            "SELECT * FROM clusters ORDER BY size DESC, volume_usd DESC LIMIT ?", (limit,)
+        )
+        return [cls._from_row(r) for r in rows]
+
+    @property
+    def members(self) -> List[str]:
+        if self._members is None:
+            rows = connect_flows_db().execute(
+                """
+                SELECT w.address FROM cluster_members m
+                JOIN flow_wallets w ON w.wallet_id = m.wallet_id
+                WHERE m.cluster_id = ? ORDER BY m.wallet_id
+                """,
+                (self.cluster_id,),
+            )
+            self._members = [r[0] for r in rows]
+        return self._members
+
+    def edges(self) -> List[Dict]:
+        """Flow edges between members (including ones below the build thresholds)."""
+        rows = connect_flows_db().execute(
+            """
+            SELECT wa.address AS a, wb.address AS b, e.volume_usd, e.a_to_b_usd,
+                   e.b_to_a_usd, e.n, e.first_ts, e.last_ts, e.recurring
+            FROM cluster_members ma
+            JOIN flow_edges e ON e.a_id = ma.wallet_id
+            JOIN cluster_members mb ON mb.wallet_id = e.b_id AND mb.cluster_id = ma.cluster_id
+            JOIN flow_wallets wa ON wa.wallet_id = e.a_id
+            JOIN flow_wallets wb ON wb.wallet_id = e.b_id
+            WHERE ma.cluster_id = ?
+            ORDER BY e.volume_usd DESC
+            """,
+            (self.cluster_id,),
+        )
+        return [dict(r) for r in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="store transfers of tracked wallets")
+    ingest.add_argument("--member", choices=sorted(MEMBERSHIPS), default="smart")
+    ingest.add_argument("--sol-usd", type=float, required=True)
+    ingest.add_argument("--limit", type=int, default=200, help="transactions per wallet")
+    ingest.add_argument("--concurrency", type=int, default=8)
+    ingest.add_argument("--rpc-url", default=None, help="defaults to Helius")
+    build = sub.add_parser("build", help="aggregate edges and rebuild clusters")
+    build.add_argument("--min-volume", type=float, default=MIN_VOLUME_USD)
+    build.add_argument("--min-transfers", type=int, default=MIN_TRANSFERS)
+    build.add_argument("--max-degree", type=int, default=MAX_DEGREE)
+    show = sub.add_parser("show", help="print the cluster of a wallet")
+    show.add_argument("address")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        wallets = tracked_wallets(args.member)
+        print(f"[INFO] Ingesting transfers for {len(wallets)} {args.member} wallets")
+        asyncio.run(
+            ingest_transfers(
+                wallets, args.sol_usd, limit=args.limit,
+                concurrency=args.concurrency, rpc_url=args.rpc_url,
+            )
+        )
+    elif args.command == "build":
+        start = time.perf_counter()
+        print(f"[INFO] Edges: {aggregate_edges()}")
+        print(f"[INFO] Clusters: {build_clusters(args.min_volume, args.min_transfers, args.max_degree)}")
+        print(f"[INFO] Built in {time.perf_counter() - start:.1f}s; largest: {Cluster.largest(5)}")
+    else:
+        cluster = Cluster.for_wallet(args.address)
+        if cluster is None:
+            print(f"[INFO] {args.address} is in no cluster")
+        else:
+            print(f"[INFO] {cluster}")
+            for member in cluster.members:
+                print(f"  {member}")
+            for e in cluster.edges()[:20]:
+                print(f"  {e['a'][:8]} <-> {e['b'][:8]}  ${e['volume_usd']:,.0f} over {e['n']} transfers")
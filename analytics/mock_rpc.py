@@ -0,0 +1,130 @@
+"""
+analytics/mock_rpc.py
+─────────────────────
+Local JSON-RPC HTTP server that replays recorded transaction fixtures, so
+the decoder / PnL engine can be exercised without Helius.
+
+Serves getSignaturesForAddress and getTransaction (single or batched
+requests) from one or more fixture files (see analytics/pnl.load_fixture),
+and getAssetBatch with the fixtures' "prices" as DAS price_info.
+
+--reject-batches answers every batch with a single JSON-RPC error object,
+--shuffle-batches returns batch replies out of order, like real providers
+are allowed to.
+
+Run:
+    python -m analytics.mock_rpc analytics/fixtures/wallet_swaps.json [--port 8899]
+"""
+
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class FixtureStore:
+    def __init__(self, paths: List[str]):
+        self.by_wallet: Dict[str, List[Dict]] = {}
+        self.by_signature: Dict[str, Dict] = {}
+        self.prices: Dict[str, float] = {}
+        for path in paths:
+            with open(path) as f:
+                fx = json.load(f)
+            txs = sorted(fx["transactions"], key=lambda t: t.get("blockTime") or 0, reverse=True)
+            self.by_wallet.setdefault(fx["wallet"], []).extend(txs)
+            self.prices.update(fx.get("prices") or {})
+            for tx in txs:
+                self.by_signature[tx["transaction"]["signatures"][0]] = tx
+
+    def call(self, method: str, params: List):
+        if method == "getSignaturesForAddress":
+            limit = (params[1] if len(params) > 1 else {}).get("limit", 1000)
+            return [
+                {
+                    "signature": tx["transaction"]["signatures"][0],
+                    "slot": tx.get("slot"),
+                    "blockTime": tx.get("blockTime"),
+                    "err": (tx.get("meta") or {}).get("err"),
+                }
+                for tx in self.by_wallet.get(params[0], [])[:limit]
+            ]
+        if method == "getTransaction":
+            return self.by_signature.get(params[0])
+        if method == "getAssetBatch":
+            return [
+                {"id": mint, "token_info": {"price_info": {"price_per_token": self.prices[mint]}}}
+                if mint in self.prices
+                else None
+                for mint in params["ids"]
+            ]
+        raise KeyError(method)
+
+
+def _make_handler(store: FixtureStore, reject_batches: bool = False, shuffle_batches: bool = False):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, req: Dict) -> Dict:
+            try:
+                result = store.call(req.get("method"), req.get("params") or [])
+                return {"jsonrpc": "2.0", "id": req.get("id"), "result": result}
+            except KeyError:
+                error = {"code": -32601, "message": "Method not found"}
+                return {"jsonrpc": "2.0", "id": req.get("id"), "error": error}
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if not isinstance(body, list):
+                out = self._reply(body)
+            elif reject_batches:
+                error = {"code": -32600, "message": "Batch requests are not supported"}
+                out = {"jsonrpc": "2.0", "id": None, "error": error}
+            else:
+                out = [self._reply(r) for r in body]
+                if shuffle_batches:
+                    random.shuffle(out)
+            data = json.dumps(out).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_rpc(
+    paths: List[str],
+    host: str = "127.0.0.1",
+    port: int = 8899,
+    reject_batches: bool = False,
+    shuffle_batches: bool = False,
+) -> ThreadingHTTPServer:
+    """
+    Starts the server on a daemon thread and returns it (call .shutdown() to
+    stop). port=0 picks a free port: see server.server_address.
+    """
+    handler = _make_handler(FixtureStore(paths), reject_batches, shuffle_batches)
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="+")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--reject-batches", action="store_true")
+    parser.add_argument("--shuffle-batches", action="store_true")
+    args = parser.parse_args()
+    handler = _make_handler(FixtureStore(args.fixtures), args.reject_batches, args.shuffle_batches)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"[INFO] Mock RPC on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
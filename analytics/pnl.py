@@ -0,0 +1,236 @@
+"""
+analytics/pnl.py
+────────────────
+Local PnL engine: average-cost realized/unrealized PnL, ROI per token and
+top wins, computed from decoded fills (analytics/decoder.py) instead of
+BullX pnlStats / GMGN holdings.
+
+Fills are kept column-wise in typed arrays (one FillArrays per wallet):
+compact, append-only and cheap to sort by timestamp.
+
+    load_wallet(wallet)   -> fills + current prices from RPC, Binance and Helius
+    to_pnl_stats(result)  -> BullX-style dict for woi_data.is_wallet_active
+    big_wins(result)      -> same shape as scrapers.gmgn.get_gmgn_big_wins
+
+Live, SOL legs are valued at the SOL/USD close of their own hour
+(scrapers/binance.py) and open positions at Helius' current token price.
+Positions Helius has no price for are listed in result["unpriced"] and
+count as unrealized 0.
+
+Run against recorded fixtures, or a (mock) RPC:
+    python -m analytics.pnl --fixtures analytics/fixtures/wallet_swaps.json
+    python -m analytics.pnl --wallet <address> [--rpc-url http://127.0.0.1:8899] [--sol-usd 150]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from analytics.decoder import SolUsd, decode_transactions
+
+BUY, SELL = 1, -1
+
+
+class FillArrays:
+    """Columnar fill store for one wallet."""
+
+    def __init__(self):
+        self.ts = array("q")
+        self.side = array("b")
+        self.mint_idx = array("l")
+        self.amount = array("d")
+        self.value_usd = array("d")
+        self.mints: List[str] = []
+        self._mint_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def append(self, ts: int, mint: str, side: str, amount: float, value_usd: float) -> None:
+        idx = self._mint_ids.get(mint)
+        if idx is None:
+            idx = self._mint_ids[mint] = len(self.mints)
+            self.mints.append(mint)
+        self.ts.append(int(ts))
+        self.side.append(BUY if side == "buy" else SELL)
+        self.mint_idx.append(idx)
+        self.amount.append(amount)
+        self.value_usd.append(value_usd)
+
+    @classmethod
+    def from_fills(cls, fills: Iterable[Dict]) -> "FillArrays":
+        store = cls()
+        for f in fills:
+            store.append(f["ts"], f["mint"], f["side"], f["amount"], f["value_usd"])
+        return store
+
+
+def compute_pnl(fills: FillArrays, prices: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Average-cost PnL per mint. prices maps mint -> current USD price and is
+    used for unrealized PnL; mints without a price count as unrealized 0.
+    Sells beyond the tracked position (tokens received by transfer) have no
+    known cost, so only the matched part is realized.
+    """
+    prices = prices or {}
+    n_mints = len(fills.mints)
+    position = [0.0] * n_mints
+    cost = [0.0] * n_mints
+    realized = [0.0] * n_mints
+    spent = [0.0] * n_mints
+    revenue = [0.0] * n_mints
+
+    order = sorted(range(len(fills)), key=fills.ts.__getitem__)
+    side, mint_idx, amount, value = fills.side, fills.mint_idx, fills.amount, fills.value_usd
+    for i in order:
+        m, q, v = mint_idx[i], amount[i], value[i]
+        if side[i] == BUY:
+            position[m] += q
+            cost[m] += v
+            spent[m] += v
+        else:
+            revenue[m] += v
+            matched = min(q, position[m])
+            if matched > 0:
+                basis = cost[m] * matched / position[m]
+                realized[m] += v * matched / q - basis
+                position[m] -= matched
+                cost[m] -= basis
+
+    tokens = {}
+    for m, mint in enumerate(fills.mints):
+        price = prices.get(mint)
+        unrealized = position[m] * price - cost[m] if price is not None and position[m] > 0 else 0.0
+        profit = realized[m] + unrealized
+        tokens[mint] = {
+            "realized": realized[m],
+            "unrealized": unrealized,
+            "profit": profit,
+            "roi": profit / spent[m] if spent[m] else 0.0,
+            "spent": spent[m],
+            "revenue": revenue[m],
+            "position": position[m],
+        }
+
+    return {
+        "tokens": tokens,
+        "unpriced": [
+            mint for m, mint in enumerate(fills.mints) if position[m] > 0 and mint not in prices
+        ],
+        "realized": sum(realized),
+        "unrealized": sum(t["unrealized"] for t in tokens.values()),
+        "spent": sum(spent),
+        "revenue": sum(revenue),
+        "fills": len(fills),
+    }
+
+
+async def load_wallet(
+    wallet: str,
+    limit: int = 200,
+    rpc_url: Optional[str] = None,
+    sol_usd: Optional[SolUsd] = None,
+) -> Tuple[FillArrays, Dict[str, float]]:
+    """
+    Fills and current prices for compute_pnl, from the wallet's last `limit`
+    transactions. sol_usd defaults to Binance hourly history over the span
+    of those transactions.
+    """
+    from scrapers.binance import get_sol_usd_history
+    from scrapers.helius_utils import get_token_prices, get_wallet_transactions
+
+    txs = await get_wallet_transactions(wallet, limit=limit, rpc_url=rpc_url)
+    if sol_usd is None:
+        times = [tx["blockTime"] for tx in txs if tx and tx.get("blockTime")]
+        sol_usd = await get_sol_usd_history(min(times), max(times)) if times else 0.0
+    fills = FillArrays.from_fills(decode_transactions(txs, wallet, sol_usd))
+    prices = await get_token_prices(fills.mints, rpc_url=rpc_url) if fills.mints else {}
+    return fills, prices
+
+
+def compute_many(
+    wallet_fills: Dict[str, FillArrays], prices: Optional[Dict[str, float]] = None
+) -> Dict[str, Dict]:
+    """compute_pnl over many wallets with one shared price table."""
+    return {wallet: compute_pnl(fills, prices) for wallet, fills in wallet_fills.items()}
+
+
+def to_pnl_stats(result: Dict) -> Dict:
+    """The BullX pnlStats fields woi_data.is_wallet_active reads."""
+    return {
+        "realizedPnlUsd": result["realized"],
+        "unrealizedPnlUsd": result["unrealized"],
+        "totalRevenueUsd": result["revenue"],
+        "totalSpentUsd": result["spent"],
+    }
+
+
+def big_wins(
+    result: Dict,
+    symbols: Optional[Dict[str, str]] = None,
+    min_profit_usd: float = 5_000,
+    min_roi: float = 0.69,
+    top_n: int = 3,
+) -> Dict:
+    """Same thresholds and output shape as scrapers.gmgn.get_gmgn_big_wins."""
+    symbols = symbols or {}
+    ranked = sorted(result["tokens"].items(), key=lambda kv: kv[1]["profit"], reverse=True)
+    winners = [
+        {"symbol": symbols.get(mint, mint[:6]), "profit_usd": t["profit"], "roi": t["roi"]}
+        for mint, t in ranked
+        if t["profit"] >= min_profit_usd and t["roi"] >= min_roi
+    ]
+    return {"has_big_wins": len(winners) >= top_n, "winners": winners[:top_n]}
+
+
+def load_fixture(path: str) -> Dict:
+    """{"wallet", "sol_usd", "prices", "symbols", "transactions": [getTransaction results]}"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def _report(wallet: str, result: Dict, symbols: Dict[str, str]) -> None:
+    print(f"[INFO] {wallet}: {result['fills']} fills")
+    for mint, t in sorted(result["tokens"].items(), key=lambda kv: -kv[1]["profit"]):
+        print(
+            f"  {symbols.get(mint, mint[:6]):>8}  profit ${t['profit']:>12,.2f}  "
+            f"roi {t['roi']:>7.2%}  realized ${t['realized']:>12,.2f}  "
+            f"unrealized ${t['unrealized']:>12,.2f}"
+        )
+    if result["unpriced"]:
+        names = ", ".join(symbols.get(m, m[:6]) for m in result["unpriced"])
+        print(f"[WARN] No current price for open positions: {names}")
+    print(f"[INFO] pnlStats: {to_pnl_stats(result)}")
+    print(f"[INFO] big wins: {big_wins(result, symbols)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="recorded transactions JSON")
+    parser.add_argument("--wallet")
+    parser.add_argument("--rpc-url", default=None, help="defaults to Helius")
+    parser.add_argument("--limit", type=int, default=200, help="signatures to fetch")
+    parser.add_argument("--sol-usd", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fx = load_fixture(args.fixtures)
+        wallet = fx["wallet"]
+        sol_usd = args.sol_usd or fx["sol_usd"]
+        fills = FillArrays.from_fills(decode_transactions(fx["transactions"], wallet, sol_usd))
+        prices, symbols = fx.get("prices", {}), fx.get("symbols", {})
+    elif args.wallet:
+        wallet = args.wallet
+        fills, prices = asyncio.run(
+            load_wallet(wallet, limit=args.limit, rpc_url=args.rpc_url, sol_usd=args.sol_usd)
+        )
+        symbols = {}
+    else:
+        parser.error("pass --fixtures or --wallet")
+
+    _report(wallet, compute_pnl(fills, prices), symbols)
@@ -0,0 +1,382 @@
+"""
+analytics/similarity.py
+───────────────────────
+Finds wallets that are probably one entity because they appear in almost
+the same set of tokens, using MinHash signatures + LSH banding instead of
+comparing every pair of wallets.
+
+Everything lives in raw_data.db next to the token memberships:
+
+  wallet_minhash       one MinHash signature per wallet (NUM_PERM x uint64)
+  lsh_buckets          (band, bucket) -> wallet; wallets sharing any bucket
+                       are candidate pairs
+  similarity_clusters  wallet -> cluster id (smallest wallet_id in it)
+  similarity_state     high-water mark of wallet_tokens.first_seen
+
+Runs are incremental. Only wallets that gained tokens since the last run
+(first_seen >= watermark) are updated, by folding the new tokens into the
+stored signature. Wallets that lost tokens are re-signed from scratch.
+The watermark trails each run's start by WATERMARK_MARGIN, because ingest
+stamps first_seen before its transaction commits. Pairs are then looked
+up through their buckets only. --rebuild starts over, which also splits
+clusters whose members have drifted apart.
+
+Run:
+    python -m analytics.similarity [--threshold 0.5] [--rebuild]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.raw_data import connect_db
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 4 rows/band -> ~50% Jaccard detection threshold
+THRESHOLD = 0.5  # min estimated Jaccard similarity to link two wallets
+MIN_TOKENS = 3  # wallets in fewer tokens carry too little signal to cluster
+MAX_BUCKET = 200  # skip buckets this crowded (tokens everyone holds)
+CHUNK = 500
+WATERMARK_MARGIN = 600  # s; longer than any ingest transaction stays open
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)  # fixed seed: signatures must be stable across runs
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+
+_token_hashes: Dict[int, Tuple[int, ...]] = {}
+
+
+def init_similarity_tables(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_minhash (
+            wallet_id   INTEGER PRIMARY KEY,
+            token_count INTEGER NOT NULL,
+            signature   BLOB NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lsh_buckets (
+            band      INTEGER NOT NULL,
+            bucket    INTEGER NOT NULL,
+            wallet_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, wallet_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_wallet ON lsh_buckets(wallet_id)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS similarity_clusters (
+            wallet_id  INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_similarity_clusters_cluster ON similarity_clusters(cluster_id)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS similarity_state (key TEXT PRIMARY KEY, value INTEGER)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wallet_tokens_first_seen ON wallet_tokens(first_seen)"
+    )
+    conn.commit()
+
+
+# ─── MinHash / LSH ────────────────────────────────────────────────────────────
+def _hashes(token_id: int) -> Tuple[int, ...]:
+    h = _token_hashes.get(token_id)
+    if h is None:
+        h = _token_hashes[token_id] = tuple((a * token_id + b) % _PRIME for a, b in zip(_A, _B))
+    return h
+
+
+def minhash(token_ids: Iterable[int], signature: Optional[List[int]] = None) -> List[int]:
+    """Signature of token_ids, folded into an existing signature if one is given."""
+    vectors = [_hashes(t) for t in token_ids]
+    if signature is not None:
+        vectors.append(tuple(signature))
+    return list(map(min, *vectors)) if len(vectors) > 1 else list(vectors[0])
+
+
+def band_buckets(signature: List[int]) -> List[int]:
+    """One 63-bit bucket key per band (fits a sqlite INTEGER)."""
+    keys = []
+    for band in range(BANDS):
+        rows = array("Q", signature[band * ROWS : (band + 1) * ROWS]).tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little") >> 1)
+    return keys
+
+
+def estimate_jaccard(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _pack(signature: List[int]) -> bytes:
+    return array("Q", signature).tobytes()
+
+
+def _unpack(blob: bytes) -> List[int]:
+    return array("Q", blob).tolist()
+
+
+# ─── incremental update ──────────────────────────────────────────────────────
+def _changed_wallets(conn, watermark: int) -> Set[int]:
+    changed = {
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT wallet_id FROM wallet_tokens WHERE first_seen >= ?", (watermark,)
+        )
+    }
+    # lost a token (remove_token) since it was signed: min-folding can't undo that
+    changed.update(
+        r[0]
+        for r in conn.execute(
+            """
+            SELECT m.wallet_id FROM wallet_minhash m
+            LEFT JOIN wallets w ON w.wallet_id = m.wallet_id
+            WHERE w.wallet_id IS NULL OR w.token_count < m.token_count
+            """
+        )
+    )
+    return changed
+
+
+def _resign(conn, wallet_ids: List[int], watermark: int) -> Dict[int, List[int]]:
+    """Updates signatures + buckets for wallet_ids; returns the new signatures."""
+    marks = ",".join("?" * len(wallet_ids))
+    counts = {
+        r[0]: r[1]
+        for r in conn.execute(
+            f"SELECT wallet_id, token_count FROM wallets WHERE wallet_id IN ({marks})", wallet_ids
+        )
+    }
+    stored = {
+        r[0]: (r[1], _unpack(r[2]))
+        for r in conn.execute(
+            f"SELECT wallet_id, token_count, signature FROM wallet_minhash WHERE wallet_id IN ({marks})",
+            wallet_ids,
+        )
+    }
+    new_tokens: Dict[int, List[int]] = {}
+    for r in conn.execute(
+        f"SELECT wallet_id, token_id FROM wallet_tokens WHERE first_seen >= ? AND wallet_id IN ({marks})",
+        (watermark, *wallet_ids),
+    ):
+        new_tokens.setdefault(r[0], []).append(r[1])
+
+    signatures: Dict[int, List[int]] = {}
+    rebuild = []
+    for wallet_id in wallet_ids:
+        count = counts.get(wallet_id, 0)
+        if count < MIN_TOKENS:
+            continue
+        old = stored.get(wallet_id)
+        added = new_tokens.get(wallet_id, [])
+        # the first_seen >= watermark overlap can re-add known tokens; min() is idempotent,
+        # but then the count check below can't prove nothing was lost, so re-sign
+        if old and added and old[0] + len(added) == count:
+            signatures[wallet_id] = minhash(added, old[1])
+        else:
+            rebuild.append(wallet_id)
+
+    if rebuild:
+        full: Dict[int, List[int]] = {}
+        marks_r = ",".join("?" * len(rebuild))
+        for r in conn.execute(
+            f"SELECT wallet_id, token_id FROM wallet_tokens WHERE wallet_id IN ({marks_r})", rebuild
+        ):
+            full.setdefault(r[0], []).append(r[1])
+        for wallet_id, tokens in full.items():
+            signatures[wallet_id] = minhash(tokens)
+
+    conn.execute(f"DELETE FROM lsh_buckets WHERE wallet_id IN ({marks})", wallet_ids)
+    # fell below MIN_TOKENS or no longer exists
+    conn.executemany(
+        "DELETE FROM wallet_minhash WHERE wallet_id = ?",
+        ((w,) for w in wallet_ids if w not in signatures),
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO wallet_minhash (wallet_id, token_count, signature) VALUES (?, ?, ?)",
+        ((w, counts[w], _pack(sig)) for w, sig in signatures.items()),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO lsh_buckets (band, bucket, wallet_id) VALUES (?, ?, ?)",
+        (
+            (band, bucket, w)
+            for w, sig in signatures.items()
+            for band, bucket in enumerate(band_buckets(sig))
+        ),
+    )
+    return signatures
+
+
+def _candidate_pairs(conn, signatures: Dict[int, List[int]], threshold: float) -> List[Tuple[int, int]]:
+    pairs: Set[Tuple[int, int]] = set()
+    for wallet_id, sig in signatures.items():
+        for band, bucket in enumerate(band_buckets(sig)):
+            rows = conn.execute(
+                "SELECT wallet_id FROM lsh_buckets WHERE band = ? AND bucket = ? LIMIT ?",
+                (band, bucket, MAX_BUCKET + 1),
+            ).fetchall()
+            if len(rows) > MAX_BUCKET:
+                continue
+            for (other,) in rows:
+                if other != wallet_id:
+                    pairs.add((min(wallet_id, other), max(wallet_id, other)))
+
+    # verify on the signatures: LSH only says "maybe similar"
+    others = {w for pair in pairs for w in pair} - set(signatures)
+    known = dict(signatures)
+    others = list(others)
+    for i in range(0, len(others), CHUNK):
+        chunk = others[i : i + CHUNK]
+        for r in conn.execute(
+            f"SELECT wallet_id, signature FROM wallet_minhash WHERE wallet_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ):
+            known[r[0]] = _unpack(r[1])
+    return [(a, b) for a, b in pairs if estimate_jaccard(known[a], known[b]) >= threshold]
+
+
+def _merge_clusters(conn, pairs: List[Tuple[int, int]]) -> int:
+    """Unions pairs into similarity_clusters; cluster id = smallest wallet_id. Returns merges."""
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    wallets = list({w for pair in pairs for w in pair})
+    existing: Dict[int, int] = {}
+    for i in range(0, len(wallets), CHUNK):
+        chunk = wallets[i : i + CHUNK]
+        for r in conn.execute(
+            f"SELECT wallet_id, cluster_id FROM similarity_clusters WHERE wallet_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ):
+            existing[r[0]] = r[1]
+
+    # an existing cluster joins the component through its id
+    for wallet_id, cluster_id in existing.items():
+        union(wallet_id, cluster_id)
+    for a, b in pairs:
+        union(a, b)
+
+    merges = 0
+    components: Dict[int, Set[int]] = {}
+    for w in list(parent):
+        components.setdefault(find(w), set()).add(w)
+    for root, members in components.items():
+        old_ids = {existing[w] for w in members if w in existing} - {root}
+        if old_ids:
+            merges += len(old_ids)
+            conn.execute(
+                f"UPDATE similarity_clusters SET cluster_id = ? WHERE cluster_id IN ({','.join('?' * len(old_ids))})",
+                (root, *old_ids),
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO similarity_clusters (wallet_id, cluster_id) VALUES (?, ?)",
+            ((w, root) for w in members),
+        )
+    return merges
+
+
+def update_similarity(threshold: float = THRESHOLD, rebuild: bool = False) -> Dict:
+    conn, _ = connect_db()
+    init_similarity_tables(conn)
+    if rebuild:
+        for table in ("wallet_minhash", "lsh_buckets", "similarity_clusters", "similarity_state"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+
+    row = conn.execute("SELECT value FROM similarity_state WHERE key = 'watermark'").fetchone()
+    watermark = row[0] if row else 0
+    # a page stamped before this point may still be uncommitted, so the next
+    # run re-reads that window too (overlapping wallets just get re-signed)
+    next_watermark = int(time.time()) - WATERMARK_MARGIN
+
+    changed = sorted(_changed_wallets(conn, watermark))
+    # drop memberships of wallets that no longer exist
+    conn.execute(
+        "DELETE FROM similarity_clusters WHERE wallet_id NOT IN (SELECT wallet_id FROM wallets)"
+    )
+
+    signed = pairs = merges = 0
+    for i in range(0, len(changed), CHUNK):
+        signatures = _resign(conn, changed[i : i + CHUNK], watermark)
+        linked = _candidate_pairs(conn, signatures, threshold)
+        merges += _merge_clusters(conn, linked)
+        signed += len(signatures)
+        pairs += len(linked)
+        conn.commit()
+
+    conn.execute(
+        "INSERT OR REPLACE INTO similarity_state (key, value) VALUES ('watermark', ?)", (next_watermark,)
+    )
+    conn.commit()
+    return {"changed": len(changed), "signed": signed, "pairs": pairs, "merges": merges}
+
+
+# ─── reads ───────────────────────────────────────────────────────────────────
+def get_cluster(address: str) -> List[str]:
+    """Other wallets clustered with address (empty if it is in no cluster)."""
+    conn, _ = connect_db()
+    init_similarity_tables(conn)
+    rows = conn.execute(
+        """
+        SELECT w2.wallet_address FROM wallets w
+        JOIN similarity_clusters c ON c.wallet_id = w.wallet_id
+        JOIN similarity_clusters c2 ON c2.cluster_id = c.cluster_id
+        JOIN wallets w2 ON w2.wallet_id = c2.wallet_id
+        WHERE w.wallet_address = ? AND w2.wallet_id != w.wallet_id
+        """,
+        (address,),
+    )
+    return [r[0] for r in rows]
+
+
+def list_clusters(min_size: int = 2, limit: int = 50) -> List[Dict]:
+    conn, _ = connect_db()
+    init_similarity_tables(conn)
+    rows = conn.execute(
+        """
+        SELECT cluster_id, COUNT(*) AS size FROM similarity_clusters
+        GROUP BY cluster_id HAVING size >= ?
+        ORDER BY size DESC LIMIT ?
+        """,
+        (min_size, limit),
+    ).fetchall()
+    return [{"cluster_id": r[0], "size": r[1]} for r in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--rebuild", action="store_true", help="recompute every signature")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    stats = update_similarity(threshold=args.threshold, rebuild=args.rebuild)
+    print(f"[INFO] Similarity update: {stats} in {time.perf_counter() - start:.1f}s")
+    print(f"[INFO] Largest clusters: {list_clusters(limit=10)}")
@@ -0,0 +1,336 @@
+"""
+analytics/tagging.py
+────────────────────
+Behavioural tags (smart, bot, whale, flipper, high_frequency, active, ...)
+derived from per-wallet features by declarative rules.
+
+    wallet_features   one row per raw_data wallet, one numeric column per
+                      feature (token activity, woi/smart membership, GMGN
+                      risk ratios, big-win stats, tracker activity,
+                      similarity cluster size) plus the refresh generation
+                      that last changed it
+    RULES             tag -> conditions that must all hold
+
+refresh_features() recomputes features chunk by chunk but only writes
+rows whose values differ, stamping them with a new generation number.
+Time-based features (tokens_7d, active_30d) are part of the row, so a
+wallet going quiet counts as a change too. update_tags() then loads only
+rows from generations it has not evaluated yet into NumPy columns,
+evaluates every rule as one vectorized comparison per condition, and
+replaces the rule-owned tags of those wallets in wallet_tags. Tags added
+by hand (raw_data.add_wallet_tag) with names outside RULES are left
+alone. Editing RULES triggers a full re-evaluation.
+
+Run:
+    python -m analytics.tagging [--rules rules.json] [--full]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.events_data import DB_PATH as EVENTS_DB
+from data.raw_data import connect_db
+from data.wallet_queries import MEMBERSHIPS, attach_db
+
+DAY = 86_400
+CHUNK = 5_000
+
+FEATURES = (
+    "token_count",
+    "tokens_7d",  # tokens first seen in the last 7 days
+    "tokens_30d",
+    "last_seen",  # newest of: token first_seen, tracker event
+    "active_30d",
+    "in_woi",
+    "in_smart",
+    "didnt_buy",  # GMGN risk ratios (smart wallets only)
+    "fast_tx",
+    "sold_gt",
+    "wins_usd",  # sum of the top-3 GMGN wins
+    "best_win_roi",
+    "cluster_size",  # analytics/similarity.py co-occurrence cluster
+)
+
+# tag -> [(feature, op, value), ...], all must hold; a NULL feature never matches
+RULES: Dict[str, List[Tuple[str, str, float]]] = {
+    "smart": [("in_smart", "==", 1)],
+    "bot": [("fast_tx", ">=", 0.3)],
+    "human": [("in_smart", "==", 1), ("fast_tx", "<", 0.05), ("didnt_buy", "<", 0.2)],
+    "whale": [("wins_usd", ">=", 100_000)],
+    "flipper": [("tokens_30d", ">=", 10), ("sold_gt", "<", 0.1)],
+    "high_frequency": [("tokens_7d", ">=", 15)],
+    "active": [("active_30d", "==", 1)],
+    "inactive": [("active_30d", "==", 0)],
+    "previously_active": [("active_30d", "==", 0), ("token_count", ">=", 5)],
+    "clustered": [("cluster_size", ">=", 2)],
+}
+
+OPS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+
+def init_tagging_tables(conn) -> None:
+    columns = ",\n".join(f"{name} REAL" for name in FEATURES)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS wallet_features (
+            wallet_id  INTEGER PRIMARY KEY,
+            {columns},
+            generation INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wallet_features_generation ON wallet_features(generation)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS tagging_state (key TEXT PRIMARY KEY, value TEXT)")
+    conn.commit()
+
+
+def validate_rules(rules: Dict[str, List]) -> None:
+    for tag, conditions in rules.items():
+        if not conditions:
+            raise ValueError(f"rule {tag!r} has no conditions")
+        for feature, op, _ in conditions:
+            if feature not in FEATURES:
+                raise ValueError(f"rule {tag!r}: unknown feature {feature!r}")
+            if op not in OPS:
+                raise ValueError(f"rule {tag!r}: unknown operator {op!r}")
+
+
+def _rules_fingerprint(rules: Dict[str, List]) -> str:
+    return hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+
+def _state(conn, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM tagging_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(conn, key: str, value) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO tagging_state (key, value) VALUES (?, ?)", (key, str(value))
+    )
+
+
+# ─── features ────────────────────────────────────────────────────────────────
+def _feature_query(conn) -> str:
+    """SELECT for one chunk of wallet ids; sources that don't exist yet give NULL."""
+    has_woi = attach_db(conn, *MEMBERSHIPS["woi"][:2])
+    has_smart = attach_db(conn, *MEMBERSHIPS["smart"][:2])
+    has_events = attach_db(conn, "events", EVENTS_DB)
+    has_clusters = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'similarity_clusters'"
+    ).fetchone()
+
+    last_event = (
+        "(SELECT MAX(received_at) FROM events.wallet_events e WHERE e.wallet = w.wallet_address)"
+        if has_events
+        else "NULL"
+    )
+    smart = {
+        "didnt_buy": "s.didnt_buy",
+        "fast_tx": "s.fast_tx",
+        "sold_gt": "s.sold_gt",
+        "wins_usd": "COALESCE(s.win1_usd, 0) + COALESCE(s.win2_usd, 0) + COALESCE(s.win3_usd, 0)",
+        "best_win_roi": "MAX(COALESCE(s.win1_roi, 0), COALESCE(s.win2_roi, 0), COALESCE(s.win3_roi, 0))",
+    }
+    if has_smart:
+        smart = {k: f"CASE WHEN s.wallet IS NULL THEN NULL ELSE {v} END" for k, v in smart.items()}
+    else:
+        smart = dict.fromkeys(smart, "NULL")
+
+    return f"""
+        WITH t AS (
+            SELECT w.wallet_id, w.wallet_address, w.token_count,
+                   SUM(wt.first_seen >= :now - 7 * {DAY})  AS tokens_7d,
+                   SUM(wt.first_seen >= :now - 30 * {DAY}) AS tokens_30d,
+                   MAX(COALESCE(MAX(wt.first_seen), 0), COALESCE({last_event}, 0)) AS last_seen
+            FROM wallets w
+            LEFT JOIN wallet_tokens wt ON wt.wallet_id = w.wallet_id
+            WHERE w.wallet_id > :after
+            GROUP BY w.wallet_id
+            ORDER BY w.wallet_id
+            LIMIT :limit
+        )
+        SELECT t.wallet_id,
+               t.token_count,
+               COALESCE(t.tokens_7d, 0),
+               COALESCE(t.tokens_30d, 0),
+               NULLIF(t.last_seen, 0),
+               t.last_seen >= :now - 30 * {DAY},
+               {"g.wallet IS NOT NULL" if has_woi else "0"},
+               {"s.wallet IS NOT NULL" if has_smart else "0"},
+               {smart["didnt_buy"]},
+               {smart["fast_tx"]},
+               {smart["sold_gt"]},
+               {smart["wins_usd"]},
+               {smart["best_win_roi"]},
+               {'''(SELECT COUNT(*) FROM similarity_clusters c2
+                  WHERE c2.cluster_id = c.cluster_id)''' if has_clusters else "NULL"}
+        FROM t
+        {"LEFT JOIN woi.good_wallets g ON g.wallet = t.wallet_address" if has_woi else ""}
+        {"LEFT JOIN smart.smart_wallets s ON s.wallet = t.wallet_address" if has_smart else ""}
+        {"LEFT JOIN similarity_clusters c ON c.wallet_id = t.wallet_id" if has_clusters else ""}
+        ORDER BY t.wallet_id
+    """
+
+
+def refresh_features(now: Optional[int] = None) -> Dict:
+    """Recomputes every wallet's features; writes (and stamps) only the ones that changed."""
+    conn, _ = connect_db()
+    init_tagging_tables(conn)
+    now = now or int(time.time())
+    generation = int(_state(conn, "generation") or 0) + 1
+    query = _feature_query(conn)
+    columns = ", ".join(FEATURES)
+    upsert = (
+        f"INSERT OR REPLACE INTO wallet_features (wallet_id, {columns}, generation) "
+        f"VALUES ({', '.join('?' * (len(FEATURES) + 2))})"
+    )
+
+    scanned = changed = 0
+    after = 0
+    while True:
+        rows = [tuple(r) for r in conn.execute(query, {"now": now, "after": after, "limit": CHUNK})]
+        if not rows:
+            break
+        after = rows[-1][0]
+        ids = [r[0] for r in rows]
+        stored = {
+            r[0]: tuple(r)
+            for r in conn.execute(
+                f"SELECT wallet_id, {columns} FROM wallet_features "
+                f"WHERE wallet_id BETWEEN ? AND ?",
+                (ids[0], ids[-1]),
+            )
+        }
+        dirty = [r for r in rows if stored.get(r[0]) != r]
+        conn.executemany(upsert, (r + (generation,) for r in dirty))
+        conn.commit()
+        scanned += len(rows)
+        changed += len(dirty)
+
+    conn.execute("DELETE FROM wallet_features WHERE wallet_id NOT IN (SELECT wallet_id FROM wallets)")
+    _set_state(conn, "generation", generation)
+    conn.commit()
+    return {"scanned": scanned, "changed": changed}
+
+
+# ─── rules ───────────────────────────────────────────────────────────────────
+def evaluate_rules(columns: Dict[str, np.ndarray], rules: Dict[str, List]) -> Dict[str, np.ndarray]:
+    """tag -> bool mask over the rows of columns (feature -> float array, NaN = NULL)."""
+    n = len(next(iter(columns.values())))
+    masks = {}
+    for tag, conditions in rules.items():
+        mask = np.ones(n, dtype=bool)
+        for feature, op, value in conditions:
+            col = columns[feature]
+            mask &= OPS[op](col, value) & ~np.isnan(col)
+        masks[tag] = mask
+    return masks
+
+
+def update_tags(rules: Optional[Dict[str, List]] = None, full: bool = False) -> Dict:
+    """Re-evaluates rules for wallets whose features changed since the last run."""
+    rules = rules or RULES
+    validate_rules(rules)
+    conn, _ = connect_db()
+    init_tagging_tables(conn)
+
+    fingerprint = _rules_fingerprint(rules)
+    previous_tags = json.loads(_state(conn, "tags") or "[]")
+    since = int(_state(conn, "evaluated_generation") or 0)
+    if full or _state(conn, "rules") != fingerprint:
+        since = 0
+    generation = int(_state(conn, "generation") or 0)
+    # tags this engine owns: the current rules plus ones a previous rule set had
+    owned = sorted(set(rules) | set(previous_tags))
+    owned_marks = ",".join("?" * len(owned))
+
+    evaluated = 0
+    counts = dict.fromkeys(rules, 0)
+    after = 0
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT wallet_id, {", ".join(FEATURES)} FROM wallet_features
+            WHERE generation > ? AND wallet_id > ?
+            ORDER BY wallet_id LIMIT ?
+            """,
+            (since, after, CHUNK),
+        ).fetchall()
+        if not rows:
+            break
+        after = rows[-1][0]
+        data = np.array([tuple(r) for r in rows], dtype=np.float64)  # None -> NaN
+        ids = data[:, 0].astype(np.int64)
+        columns = {name: data[:, i + 1] for i, name in enumerate(FEATURES)}
+        masks = evaluate_rules(columns, rules)
+
+        conn.execute(
+            f"DELETE FROM wallet_tags WHERE wallet_id BETWEEN ? AND ? AND tag IN ({owned_marks}) "
+            f"AND wallet_id IN (SELECT wallet_id FROM wallet_features WHERE generation > ?)",
+            (int(ids[0]), int(ids[-1]), *owned, since),
+        )
+        pairs = [(int(w), tag) for tag, mask in masks.items() for w in ids[mask]]
+        conn.executemany("INSERT OR IGNORE INTO wallet_tags (wallet_id, tag) VALUES (?, ?)", pairs)
+        conn.commit()
+        evaluated += len(ids)
+        for tag, mask in masks.items():
+            counts[tag] += int(mask.sum())
+
+    if since == 0 and previous_tags:
+        # full pass: tags dropped from the rules must not linger on unchanged wallets
+        retired = sorted(set(previous_tags) - set(rules))
+        if retired:
+            conn.execute(
+                f"DELETE FROM wallet_tags WHERE tag IN ({','.join('?' * len(retired))})", retired
+            )
+    _set_state(conn, "evaluated_generation", generation)
+    _set_state(conn, "rules", fingerprint)
+    _set_state(conn, "tags", json.dumps(sorted(rules)))
+    conn.commit()
+    return {"evaluated": evaluated, "tagged": counts}
+
+
+def tag_counts() -> Dict[str, int]:
+    conn, _ = connect_db()
+    rows = conn.execute("SELECT tag, COUNT(*) FROM wallet_tags GROUP BY tag ORDER BY 2 DESC")
+    return {r[0]: r[1] for r in rows}
+
+
+def run_tagging(rules: Optional[Dict[str, List]] = None, full: bool = False) -> Dict:
+    features = refresh_features()
+    tags = update_tags(rules, full=full)
+    return {**features, **tags}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", help="JSON file: {tag: [[feature, op, value], ...]}")
+    parser.add_argument("--full", action="store_true", help="re-evaluate every wallet")
+    args = parser.parse_args()
+
+    rules = None
+    if args.rules:
+        with open(args.rules) as f:
+            rules = {tag: [tuple(c) for c in conds] for tag, conds in json.load(f).items()}
+    start = time.perf_counter()
+    stats = run_tagging(rules, full=args.full)
+    print(f"[INFO] Tagging: {stats} in {time.perf_counter() - start:.1f}s")
+    print(f"[INFO] Tag counts: {tag_counts()}")
@@ -0,0 +1,79 @@
+"""
+events_data.py - Append-only log of on-chain activity of tracked wallets (events.db).
+
+Rows are only ever inserted, by the tracker through a DBWriter. event_id
+is monotonic, so readers can tail the log with `after_id`.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.storage import get_connection
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "events.db")
+
+
+def initialize_events_db() -> None:
+    conn = get_connection(DB_PATH)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_events (
+            event_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+            wallet      TEXT NOT NULL,
+            signature   TEXT NOT NULL,
+            slot        INTEGER,
+            kind        TEXT NOT NULL,
+            failed      INTEGER NOT NULL DEFAULT 0,
+            received_at REAL NOT NULL,
+            payload     TEXT
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wallet_events_wallet ON wallet_events(wallet, event_id)"
+    )
+    conn.commit()
+
+
+def append_event(conn: sqlite3.Connection, event: Dict) -> None:
+    """DBWriter op. Does not commit."""
+    conn.execute(
+        """
+        INSERT INTO wallet_events (wallet, signature, slot, kind, failed, received_at, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            event["wallet"],
+            event["signature"],
+            event.get("slot"),
+            event["kind"],
+            int(bool(event.get("failed"))),
+            event["received_at"],
+            json.dumps(event.get("logs") or []),
+        ),
+    )
+
+
+def get_events(
+    wallet: Optional[str] = None, after_id: int = 0, limit: int = 100
+) -> List[Dict]:
+    """Events newer than after_id, oldest first."""
+    conn = get_connection(DB_PATH)
+    if wallet:
+        rows = conn.execute(
+            """
+            SELECT * FROM wallet_events WHERE wallet = ? AND event_id > ?
+            ORDER BY event_id LIMIT ?
+            """,
+            (wallet, after_id, limit),
+        )
+    else:
+        rows = conn.execute(
+            "SELECT * FROM wallet_events WHERE event_id > ? ORDER BY event_id LIMIT ?",
+            (after_id, limit),
+        )
+    return [dict(row) for row in rows]
@@ -0,0 +1,121 @@
+"""
+flow_data.py - Fund-flow store (flows.db): wallet-to-wallet transfers and
+the clusters built from them (analytics/fund_flow.py).
+
+Wallets are interned to integer ids (flow_wallets) so the transfer and edge
+tables stay compact. Each transfer is stored once, keyed on (signature, ix),
+under its unordered pair (a_id < b_id) with the direction kept in
+`outgoing`, so per-pair aggregation is a single ordered index scan.
+"""
+
+import os
+import sqlite3
+import sys
+from typing import Dict, Iterable, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.storage import get_connection
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "flows.db")
+
+
+def connect_flows_db() -> sqlite3.Connection:
+    return get_connection(DB_PATH)
+
+
+def initialize_flows_db() -> None:
+    conn = connect_flows_db()
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS flow_wallets (
+            wallet_id INTEGER PRIMARY KEY,
+            address   TEXT NOT NULL UNIQUE
+        );
+
+        -- outgoing = 1 when a_id sent to b_id
+        CREATE TABLE IF NOT EXISTS transfers (
+            signature TEXT NOT NULL,
+            ix        INTEGER NOT NULL,
+            a_id      INTEGER NOT NULL,
+            b_id      INTEGER NOT NULL,
+            outgoing  INTEGER NOT NULL,
+            ts        INTEGER NOT NULL,
+            mint      TEXT NOT NULL,
+            amount    REAL NOT NULL,
+            value_usd REAL NOT NULL,
+            PRIMARY KEY (signature, ix)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_transfers_pair ON transfers(a_id, b_id, ts);
+
+        -- one row per wallet pair, rebuilt from transfers by aggregate_edges
+        CREATE TABLE IF NOT EXISTS flow_edges (
+            a_id       INTEGER NOT NULL,
+            b_id       INTEGER NOT NULL,
+            volume_usd REAL NOT NULL,
+            a_to_b_usd REAL NOT NULL,
+            b_to_a_usd REAL NOT NULL,
+            n          INTEGER NOT NULL,
+            first_ts   INTEGER NOT NULL,
+            last_ts    INTEGER NOT NULL,
+            recurring  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (a_id, b_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS clusters (
+            cluster_id INTEGER PRIMARY KEY,
+            size       INTEGER NOT NULL,
+            volume_usd REAL NOT NULL,
+            built_at   INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS cluster_members (
+            wallet_id  INTEGER PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_cluster_members_cluster ON cluster_members(cluster_id);
+        """
+    )
+    conn.commit()
+
+
+def _wallet_ids(conn: sqlite3.Connection, addresses: Iterable[str]) -> Dict[str, int]:
+    addresses = list(set(addresses))
+    conn.executemany(
+        "INSERT OR IGNORE INTO flow_wallets (address) VALUES (?)", ((a,) for a in addresses)
+    )
+    ids = {}
+    for i in range(0, len(addresses), 500):
+        chunk = addresses[i : i + 500]
+        rows = conn.execute(
+            f"SELECT address, wallet_id FROM flow_wallets WHERE address IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        ids.update((r[0], r[1]) for r in rows)
+    return ids
+
+
+def append_transfers(conn: sqlite3.Connection, transfers: List[Dict]) -> None:
+    """DBWriter op: stores decoded transfers (analytics.decoder.decode_transfers). Does not commit."""
+    if not transfers:
+        return
+    ids = _wallet_ids(conn, (a for t in transfers for a in (t["source"], t["destination"])))
+    rows = []
+    for t in transfers:
+        src, dst = ids[t["source"]], ids[t["destination"]]
+        rows.append(
+            (
+                t["signature"],
+                t["ix"],
+                min(src, dst),
+                max(src, dst),
+                int(src < dst),
+                t["ts"],
+                t["mint"],
+                t["amount"],
+                t["value_usd"],
+            )
+        )
+    conn.executemany("INSERT OR IGNORE INTO transfers VALUES (?,?,?,?,?,?,?,?,?)", rows)
+
+
+def transfer_count() -> int:
+    return connect_flows_db().execute("SELECT COUNT(*) FROM transfers").fetchone()[0]
@@ -0,0 +1,83 @@
+"""
+query_cache.py - In-memory cache for dashboard reads, invalidated by DB changes.
+
+One probe connection per database file reads `PRAGMA data_version`, which
+changes whenever any other connection (a pipeline, the DBWriter thread)
+commits to that file. While every version is unchanged, cached results
+are served from memory. Once one moves, the whole cache is dropped.
+
+The same versions make up the ETag, so a client can revalidate with
+If-None-Match without the query ever running.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+MAX_ENTRIES = 512
+
+# differs per process, so an ETag from before a restart never matches
+_BOOT = f"{os.getpid()}-{time.time()}"
+
+
+class QueryCache:
+    def __init__(self, db_paths: Iterable[str], max_entries: int = MAX_ENTRIES):
+        self.db_paths = [os.path.abspath(str(p)) for p in db_paths]
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._probes = {}
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._versions: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    def _probe(self, path: str) -> Optional[sqlite3.Connection]:
+        conn = self._probes.get(path)
+        if conn is None and os.path.exists(path):
+            # only ever runs PRAGMA data_version, guarded by self._lock
+            conn = sqlite3.connect(path, check_same_thread=False)
+            self._probes[path] = conn
+        return conn
+
+    def versions(self) -> Tuple:
+        """Current data_version of every DB (None for one that does not exist yet)."""
+        with self._lock:
+            versions = []
+            for path in self.db_paths:
+                conn = self._probe(path)
+                versions.append(conn.execute("PRAGMA data_version").fetchone()[0] if conn else None)
+            versions = tuple(versions)
+            if versions != self._versions:
+                self._entries.clear()
+                self._versions = versions
+            return versions
+
+    def etag(self, key: Hashable, versions: Tuple) -> str:
+        raw = repr((_BOOT, versions, key)).encode()
+        return hashlib.sha1(raw).hexdigest()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """Returns (value, etag). compute() runs only when key is not cached for the current versions."""
+        versions = self.versions()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], self.etag(key, versions)
+
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            # a write that landed while computing bumps the versions; don't cache then
+            if versions == self._versions:
+                self._entries[key] = value
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value, self.etag(key, versions)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -1,26 +1,200 @@
 import sqlite3
 import json
+import time
 from datetime import datetime
 import logging
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.storage import get_connection
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "raw_data.db")
 
-# Returns sqlite3 connection and cursor object (basic initialization)
+# wallets        : one row per wallet, token_count is kept in sync by triggers
+# tokens         : one row per token mint (dimension table)
+# wallet_tokens  : wallet <-> token membership, indexed from both sides
+# wallet_tags    : free-form labels per wallet (smart, bot, whale, ...)
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS wallets (
+        wallet_id      INTEGER PRIMARY KEY,
+        wallet_address TEXT NOT NULL UNIQUE,
+        token_count    INTEGER NOT NULL DEFAULT 0,
+        score          REAL DEFAULT 0.0,
+        notes          TEXT DEFAULT ''
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tokens (
+        token_id INTEGER PRIMARY KEY,
+        mint     TEXT NOT NULL UNIQUE,
+        symbol   TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS wallet_tokens (
+        wallet_id  INTEGER NOT NULL REFERENCES wallets(wallet_id),
+        token_id   INTEGER NOT NULL REFERENCES tokens(token_id),
+        first_seen INTEGER,
+        balance    REAL,
+        PRIMARY KEY (wallet_id, token_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_wallet_tokens_token ON wallet_tokens(token_id, wallet_id)",
+    """
+    CREATE TABLE IF NOT EXISTS wallet_tags (
+        wallet_id INTEGER NOT NULL REFERENCES wallets(wallet_id),
+        tag       TEXT NOT NULL,
+        PRIMARY KEY (wallet_id, tag)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_wallets_token_count ON wallets(token_count)",
+    "CREATE INDEX IF NOT EXISTS idx_wallets_score ON wallets(score)",
+    "CREATE INDEX IF NOT EXISTS idx_wallet_tags_tag ON wallet_tags(tag, wallet_id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_wallet_tokens_insert AFTER INSERT ON wallet_tokens
+    BEGIN
+        UPDATE wallets SET token_count = token_count + 1 WHERE wallet_id = NEW.wallet_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_wallet_tokens_delete AFTER DELETE ON wallet_tokens
+    BEGIN
+        UPDATE wallets SET token_count = token_count - 1 WHERE wallet_id = OLD.wallet_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_wallets_delete_tags AFTER DELETE ON wallets
+    BEGIN
+        DELETE FROM wallet_tags WHERE wallet_id = OLD.wallet_id;
+    END
+    """,
+    # A NULL score is stored as the 0.0 default, so score-sorted keyset
+    # pages (data/wallet_queries.py) never skip a wallet
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_wallets_score_insert AFTER INSERT ON wallets
+    WHEN NEW.score IS NULL
+    BEGIN
+        UPDATE wallets SET score = 0.0 WHERE wallet_id = NEW.wallet_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_wallets_score_update AFTER UPDATE OF score ON wallets
+    WHEN NEW.score IS NULL
+    BEGIN
+        UPDATE wallets SET score = 0.0 WHERE wallet_id = NEW.wallet_id;
+    END
+    """,
+    "UPDATE wallets SET score = 0.0 WHERE score IS NULL",  # rows from before the triggers
+]
+
+_schema_ready = False
+
+
+# Returns the shared sqlite3 connection and a fresh cursor (see data/storage.py)
 def connect_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    global _schema_ready
+    conn = get_connection(DB_PATH)
+    if not _schema_ready:
+        initialize_raw_db(conn)
+        _schema_ready = True
     cursor = conn.cursor()
     return conn, cursor
 
 
-# row[0] is address, row[1] = tokens_seen, row[2] = last_seen, row[3] = score, row[4] = notes
+def initialize_raw_db(conn):
+    """
+    Creates the normalized schema. If raw_data.db still has the old
+    JSON-column wallets table, it is migrated once into wallet_tokens.
+    """
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(wallets)")}
+    if columns and "wallet_id" not in columns:
+        _migrate_json_columns(conn, columns)
+    else:
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        conn.commit()
+
+
+def _migrate_json_columns(conn, columns):
+    # Old layout: wallet_address, token_addresses_seen (or tokens_seen),
+    # token_symbols_seen, score, notes, all token lists stored as JSON text
+    addr_col = "token_addresses_seen" if "token_addresses_seen" in columns else "tokens_seen"
+    sym_col = "token_symbols_seen" if "token_symbols_seen" in columns else None
+    score_col = "score" if "score" in columns else "0.0"
+    notes_col = "notes" if "notes" in columns else "''"
+
+    print("[INFO] Migrating raw_data.db JSON token columns into wallet_tokens...")
+    conn.execute("BEGIN")
+    try:
+        conn.execute("ALTER TABLE wallets RENAME TO wallets_legacy")
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        conn.execute(
+            f"""
+            INSERT INTO wallets (wallet_address, score, notes)
+            SELECT wallet_address, COALESCE({score_col}, 0.0), COALESCE({notes_col}, '')
+            FROM wallets_legacy
+            """
+        )
+
+        legacy = conn.execute(
+            f"SELECT wallet_address, {addr_col} AS mints, "
+            f"{sym_col or 'NULL'} AS symbols FROM wallets_legacy"
+        )
+        migrated = 0
+        for row in legacy.fetchall():
+            mints = json.loads(row["mints"] or "[]")
+            symbols = json.loads(row["symbols"] or "[]")
+            wallet_id = _wallet_id(conn, row["wallet_address"])
+            for i, mint in enumerate(mints):
+                symbol = symbols[i] if i < len(symbols) else None
+                token_id = _get_or_create_token_id(conn, mint, symbol)
+                conn.execute(
+                    "INSERT OR IGNORE INTO wallet_tokens (wallet_id, token_id) VALUES (?, ?)",
+                    (wallet_id, token_id),
+                )
+            migrated += 1
+
+        conn.execute("DROP TABLE wallets_legacy")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"[INFO] Migrated {migrated} wallets.")
+
+
+def _wallet_id(cursor, address):
+    row = cursor.execute(
+        "SELECT wallet_id FROM wallets WHERE wallet_address = ?", (address,)
+    ).fetchone()
+    return row["wallet_id"] if row else None
+
+
+def _get_or_create_wallet_id(cursor, address, notes=""):
+    cursor.execute(
+        "INSERT OR IGNORE INTO wallets (wallet_address, notes) VALUES (?, ?)",
+        (address, notes),
+    )
+    return _wallet_id(cursor, address)
+
+
+def _get_or_create_token_id(cursor, mint, symbol=None):
+    cursor.execute(
+        "INSERT OR IGNORE INTO tokens (mint, symbol) VALUES (?, ?)",
+        (mint, symbol or "UNKNOWN"),
+    )
+    row = cursor.execute("SELECT token_id FROM tokens WHERE mint = ?", (mint,)).fetchone()
+    return row["token_id"]
+
+
+# row["wallet_id"], row["wallet_address"], row["token_count"], row["score"], row["notes"]
 # Row factory has been set which means I can access by row name, above is just for reference
 def fetch_wallet_all_info(address):
     conn, cursor = connect_db()
     cursor.execute("SELECT * FROM wallets WHERE wallet_address = ?", (address,))
     row = cursor.fetchone()
-    conn.close()
     if row:
         return row
     else:
@@ -28,10 +202,20 @@ def fetch_wallet_all_info(address):
 
 
 def fetch_wallet_tokens(address):
-    wallet = fetch_wallet_all_info(address)
-    if wallet:
-        tokens = wallet["tokens_seen"]
-        return tokens
+    conn, cursor = connect_db()
+    cursor.execute(
+        """
+        SELECT t.mint
+        FROM wallets w
+        JOIN wallet_tokens wt ON wt.wallet_id = w.wallet_id
+        JOIN tokens t ON t.token_id = wt.token_id
+        WHERE w.wallet_address = ?
+        """,
+        (address,),
+    )
+    rows = cursor.fetchall()
+    if rows:
+        return [row["mint"] for row in rows]
     else:
         return None
 
@@ -58,27 +242,35 @@ def list_all_wallets():
     conn, cursor = connect_db()
     cursor.execute("SELECT wallet_address FROM wallets")
     rows = cursor.fetchall()
-    conn.close()
     return [row["wallet_address"] for row in rows]
 
 
 def delete_wallet(address):
     conn, cursor = connect_db()
-    cursor.execute("DELETE FROM wallets WHERE wallet_address = ?", (address,))
+    wallet_id = _wallet_id(cursor, address)
+    if wallet_id is not None:
+        cursor.execute("DELETE FROM wallet_tokens WHERE wallet_id = ?", (wallet_id,))
+        cursor.execute("DELETE FROM wallets WHERE wallet_id = ?", (wallet_id,))
     conn.commit()
-    conn.close()
 
 
 def get_all_seen_token_addresses():
     conn, cursor = connect_db()
-    cursor.execute("SELECT token_addresses_seen FROM wallets")
+    cursor.execute("SELECT mint FROM tokens")
     rows = cursor.fetchall()
-    conn.close()
-    seen = set()
-    for row in rows:
-        addresses = json.loads(row["token_addresses_seen"] or "[]")
-        seen.update(addresses)
-    return seen
+    return {row["mint"] for row in rows}
+
+
+def get_seen_token_addresses(mints):
+    """Returns the subset of mints already in the tokens table."""
+    mints = [m for m in mints if m]
+    if not mints:
+        return set()
+    conn, cursor = connect_db()
+    rows = cursor.execute(
+        f"SELECT mint FROM tokens WHERE mint IN ({','.join('?' * len(mints))})", mints
+    ).fetchall()
+    return {row["mint"] for row in rows}
 
 
 def insert_wallet(
@@ -87,51 +279,121 @@ def insert_wallet(
 
     conn, cursor = connect_db()
     cursor.execute(
-        """
-        INSERT INTO wallets (wallet_address, token_addresses_seen,          
-                   token_symbols_seen, score, notes)
-        VALUES (?, ?, ?, ?, ?)
-    """,
-        (address, json.dumps(token_addresses), json.dumps(token_symbols), score, notes),
+        "INSERT INTO wallets (wallet_address, score, notes) VALUES (?, ?, ?)",
+        (address, score, notes),
     )
+    wallet_id = cursor.lastrowid
+    now = int(time.time())
+    for i, mint in enumerate(token_addresses):
+        symbol = token_symbols[i] if i < len(token_symbols) else None
+        token_id = _get_or_create_token_id(cursor, mint, symbol)
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO wallet_tokens (wallet_id, token_id, first_seen)
+            VALUES (?, ?, ?)
+            """,
+            (wallet_id, token_id, now),
+        )
     conn.commit()
-    conn.close()
 
 
-def add_or_update_wallet(address, token_mint, token_symbol=None, notes=""):
+def add_or_update_wallet(address, token_mint, token_symbol=None, notes="", balance=None):
     conn, cursor = connect_db()
+    existed = _wallet_id(cursor, address) is not None
+    wallet_id = _get_or_create_wallet_id(cursor, address, notes)
+    token_id = _get_or_create_token_id(cursor, token_mint, token_symbol)
+
     cursor.execute(
-        "SELECT token_addresses_seen, token_symbols_seen FROM wallets WHERE wallet_address = ?",
-        (address,),
+        """
+        INSERT OR IGNORE INTO wallet_tokens (wallet_id, token_id, first_seen, balance)
+        VALUES (?, ?, ?, ?)
+        """,
+        (wallet_id, token_id, int(time.time()), balance),
     )
-    row = cursor.fetchone()
+    added = cursor.rowcount == 1
 
-    if row:
-        addresses = json.loads(row["token_addresses_seen"] or "[]")
-        symbols = json.loads(row["token_symbols_seen"] or "[]")
-
-        if token_mint not in addresses:
-            addresses.append(token_mint)
-            symbols.append(token_symbol or "UNKNOWN")
-            cursor.execute(
-                """
-                UPDATE wallets
-                SET token_addresses_seen = ?, token_symbols_seen = ?, notes = ?
-                WHERE wallet_address = ?
-            """,
-                (json.dumps(addresses), json.dumps(symbols), notes, address),
-            )
-            print(
-                f"Updated wallet: {address} | added token: {token_symbol or token_mint}"
-            )
-    else:
-        insert_wallet(
-            address, [token_mint], [token_symbol or "UNKNOWN"], score=0.0, notes=notes
+    if existed and added:
+        cursor.execute(
+            "UPDATE wallets SET notes = ? WHERE wallet_id = ?", (notes, wallet_id)
         )
+        print(f"Updated wallet: {address} | added token: {token_symbol or token_mint}")
+    elif not existed:
         print(f"Inserted wallet: {address} | token: {token_symbol or token_mint}")
 
     conn.commit()
-    conn.close()
+
+
+def ingest_holders(mint, symbol, holders, notes=""):
+    """
+    Bulk upsert of one page (or a whole list) of token holders in a
+    single transaction. `holders` are Helius token-account dicts
+    (owner, amount). Owners with several token accounts are summed, also
+    across the pages of one crawl: a balance already stored for this token
+    is added to, not replaced.
+
+    Returns {"inserted": new wallets, "updated": existing wallets that
+    gained this token}.
+    """
+    balances = {}
+    for holder in holders:
+        owner = holder.get("owner")
+        if owner:
+            balances[owner] = balances.get(owner, 0) + (holder.get("amount") or 0)
+
+    if not balances:
+        return {"inserted": 0, "updated": 0}
+
+    now = int(time.time())
+    conn, cursor = connect_db()
+    try:
+        token_id = _get_or_create_token_id(cursor, mint, symbol)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO wallets (wallet_address, notes) VALUES (?, ?)",
+            ((address, notes) for address in balances),
+        )
+        inserted = cursor.rowcount
+
+        changes_before = conn.total_changes
+        cursor.executemany(
+            """
+            INSERT INTO wallet_tokens (wallet_id, token_id, first_seen, balance)
+            SELECT wallet_id, ?, ?, ? FROM wallets WHERE wallet_address = ?
+            ON CONFLICT(wallet_id, token_id)
+            DO UPDATE SET balance = IFNULL(balance, 0) + excluded.balance
+            """,
+            ((token_id, now, amount, address) for address, amount in balances.items()),
+        )
+        # rowcount is one per upserted row; total_changes also counts the
+        # token_count trigger, which only fires for a new membership
+        linked = conn.total_changes - changes_before - cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {"inserted": inserted, "updated": linked - inserted}
+
+
+def remove_token(mint):
+    """
+    Drops a token and all of its memberships. Wallets left with no tokens
+    because of it are removed as well.
+    """
+    conn, cursor = connect_db()
+    row = cursor.execute("SELECT token_id FROM tokens WHERE mint = ?", (mint,)).fetchone()
+    if row:
+        token_id = row["token_id"]
+        cursor.execute(
+            """
+            DELETE FROM wallets
+            WHERE token_count = 1
+              AND wallet_id IN (SELECT wallet_id FROM wallet_tokens WHERE token_id = ?)
+            """,
+            (token_id,),
+        )
+        cursor.execute("DELETE FROM wallet_tokens WHERE token_id = ?", (token_id,))
+        cursor.execute("DELETE FROM tokens WHERE token_id = ?", (token_id,))
+    conn.commit()
 
 
 def update_wallet_score(address, new_score):
@@ -145,7 +407,6 @@ def update_wallet_score(address, new_score):
         (new_score, address),
     )
     conn.commit()
-    conn.close()
 
 
 def update_wallet_notes(address, notes):
@@ -159,36 +420,86 @@ def update_wallet_notes(address, notes):
         (notes, address),
     )
     conn.commit()
-    conn.close()
+
+
+def add_wallet_tag(address, tag):
+    conn, cursor = connect_db()
+    wallet_id = _wallet_id(cursor, address)
+    if wallet_id is None:
+        return False
+    cursor.execute(
+        "INSERT OR IGNORE INTO wallet_tags (wallet_id, tag) VALUES (?, ?)", (wallet_id, tag)
+    )
+    conn.commit()
+    return True
+
+
+def remove_wallet_tag(address, tag):
+    conn, cursor = connect_db()
+    cursor.execute(
+        """
+        DELETE FROM wallet_tags
+        WHERE tag = ? AND wallet_id = (SELECT wallet_id FROM wallets WHERE wallet_address = ?)
+        """,
+        (tag, address),
+    )
+    conn.commit()
+
+
+def fetch_wallet_tags(address):
+    conn, cursor = connect_db()
+    cursor.execute(
+        """
+        SELECT wt.tag FROM wallet_tags wt
+        JOIN wallets w ON w.wallet_id = wt.wallet_id
+        WHERE w.wallet_address = ?
+        ORDER BY wt.tag
+        """,
+        (address,),
+    )
+    return [row["tag"] for row in cursor.fetchall()]
 
 
 def get_all_wallets_with_token(token):
     conn, cursor = connect_db()
-    cursor.execute("SELECT wallet_address, tokens_seen FROM wallets")
+    cursor.execute(
+        """
+        SELECT w.wallet_address
+        FROM tokens t
+        JOIN wallet_tokens wt ON wt.token_id = t.token_id
+        JOIN wallets w ON w.wallet_id = wt.wallet_id
+        WHERE t.mint = ?
+        """,
+        (token,),
+    )
     rows = cursor.fetchall()
-    conn.close()
-
-    result = []
-    for row in rows:
-        tokens = json.loads(row["tokens_seen"])
-        if token in tokens:
-            result.append(row["wallet_address"])
-    return result
+    return [row["wallet_address"] for row in rows]
 
 
 def export_all_wallets():
     conn, cursor = connect_db()
-    cursor.execute("SELECT * FROM wallets")
-    rows = cursor.fetchall()
-    conn.close()
+    cursor.execute("SELECT wallet_id, wallet_address, score, notes FROM wallets")
+    wallets = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT wt.wallet_id, t.mint, t.symbol
+        FROM wallet_tokens wt
+        JOIN tokens t ON t.token_id = wt.token_id
+        ORDER BY wt.wallet_id, wt.first_seen
+        """
+    )
+    memberships = {}
+    for row in cursor.fetchall():
+        memberships.setdefault(row["wallet_id"], []).append(row)
 
     result = []
-    for row in rows:
+    for row in wallets:
+        tokens = memberships.get(row["wallet_id"], [])
         result.append(
             {
                 "wallet_address": row["wallet_address"],
-                "token_addresses_seen": json.loads(row["token_addresses_seen"] or "[]"),
-                "token_symbols_seen": json.loads(row["token_symbols_seen"] or "[]"),
+                "token_addresses_seen": [t["mint"] for t in tokens],
+                "token_symbols_seen": [t["symbol"] or "UNKNOWN" for t in tokens],
                 "score": row["score"],
                 "notes": row["notes"],
             }
@@ -196,21 +507,99 @@ def export_all_wallets():
     return result
 
 
-def get_wallets_sorted_by_token_count(top_percent=10):
+def get_top_wallet_count(top_percent=10):
     conn, cursor = connect_db()
-    cursor.execute("SELECT wallet_address, token_addresses_seen FROM wallets")
-    rows = cursor.fetchall()
-    conn.close()
+    total = cursor.execute("SELECT COUNT(*) FROM wallets").fetchone()[0]
+    return max(1, int(total * (top_percent / 100)))
 
-    wallet_token_counts = [
-        (row["wallet_address"], len(json.loads(row["token_addresses_seen"] or "[]")))
-        for row in rows
-    ]
 
-    sorted_wallets = sorted(wallet_token_counts, key=lambda x: x[1], reverse=True)
+def get_wallets_sorted_by_token_count(top_percent=10):
+    conn, cursor = connect_db()
+    top_n = get_top_wallet_count(top_percent)
 
-    top_n = max(1, int(len(sorted_wallets) * (top_percent / 100)))
-    return sorted_wallets[:top_n]
+    # Walks idx_wallets_token_count backwards, no full-table sort
+    cursor.execute(
+        """
+        SELECT wallet_address, token_count
+        FROM wallets
+        ORDER BY token_count DESC
+        LIMIT ?
+        """,
+        (top_n,),
+    )
+    rows = cursor.fetchall()
+    return [(row["wallet_address"], row["token_count"]) for row in rows]
+
+
+def get_wallets_at_token_count(addresses, min_count, exclude_mints=()):
+    """
+    Returns the subset of addresses currently held in at least min_count
+    tokens. Memberships of exclude_mints are not counted.
+    """
+    conn, _ = connect_db()
+    addresses = list(addresses)
+    exclude_mints = list(exclude_mints)
+    excluded = ""
+    if exclude_mints:
+        excluded = f"""
+            AND token_count - (
+                SELECT COUNT(*) FROM wallet_tokens wt JOIN tokens t ON t.token_id = wt.token_id
+                WHERE wt.wallet_id = wallets.wallet_id
+                  AND t.mint IN ({",".join("?" * len(exclude_mints))})
+            ) >= ?
+        """
+    hits = []
+    for i in range(0, len(addresses), 500):
+        chunk = addresses[i : i + 500]
+        params = (min_count, *chunk, *exclude_mints, min_count) if exclude_mints else (min_count, *chunk)
+        rows = conn.execute(
+            f"""
+            SELECT wallet_address FROM wallets
+            WHERE token_count >= ? AND wallet_address IN ({",".join("?" * len(chunk))})
+            {excluded}
+            """,
+            params,
+        ).fetchall()
+        hits.extend(row["wallet_address"] for row in rows)
+    return hits
+
+
+def iter_wallets_by_token_count(top_percent=10, chunk_size=1000):
+    """
+    Same wallets and order as get_wallets_sorted_by_token_count, yielded as
+    lists of (address, token_count) of at most chunk_size rows. Keyset
+    pagination on (token_count, wallet_id), so each chunk is an index seek
+    and only one chunk is in memory at a time.
+    """
+    conn, _ = connect_db()
+    remaining = get_top_wallet_count(top_percent)
+    last = None
+    while remaining > 0:
+        limit = min(chunk_size, remaining)
+        if last is None:
+            rows = conn.execute(
+                """
+                SELECT wallet_id, wallet_address, token_count FROM wallets
+                ORDER BY token_count DESC, wallet_id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT wallet_id, wallet_address, token_count FROM wallets
+                WHERE token_count < ? OR (token_count = ? AND wallet_id < ?)
+                ORDER BY token_count DESC, wallet_id DESC
+                LIMIT ?
+                """,
+                (last[0], last[0], last[1], limit),
+            ).fetchall()
+        if not rows:
+            return
+        remaining -= len(rows)
+        last = (rows[-1]["token_count"], rows[-1]["wallet_id"])
+        yield [(row["wallet_address"], row["token_count"]) for row in rows]
 
 
 if __name__ == "__main__":
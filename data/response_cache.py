@@ -0,0 +1,154 @@
+"""
+response_cache.py - Persistent TTL cache for scraper responses (data/cache.db).
+
+get_or_fetch() returns a fresh cached value if there is one, otherwise runs
+the fetch. Concurrent callers asking for the same key share a single
+in-flight fetch (single-flight). Entries expire per TTL and the table is
+trimmed back to max_entries by least-recent access.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.storage import get_connection
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "cache.db")
+
+MAX_ENTRIES = 500_000
+EVICT_EVERY = 1_000  # writes between eviction passes
+TOUCH_INTERVAL = 60  # seconds; hits refresh last_access at most this often
+
+_MISS = object()
+
+
+def initialize_cache_db() -> None:
+    conn = get_connection(DB_PATH)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            namespace   TEXT NOT NULL,
+            key         TEXT NOT NULL,
+            value       TEXT NOT NULL,
+            expires_at  REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_response_cache_access ON response_cache(last_access)"
+    )
+    conn.commit()
+
+
+class ResponseCache:
+    def __init__(self, namespace: str, max_entries: int = MAX_ENTRIES):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._ready = False
+
+    # ─── sqlite side (runs in worker threads) ────────────────────────────────
+    def _ensure_db(self):
+        if not self._ready:
+            initialize_cache_db()
+            self._ready = True
+
+    def _load(self, key: str) -> Any:
+        self._ensure_db()
+        conn = get_connection(DB_PATH)
+        row = conn.execute(
+            "SELECT value, expires_at, last_access FROM response_cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        now = time.time()
+        if row is None or row["expires_at"] <= now:
+            return _MISS
+        if now - row["last_access"] > TOUCH_INTERVAL:
+            conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            conn.commit()
+        return json.loads(row["value"])
+
+    def _store(self, key: str, value: Any, ttl: float):
+        self._ensure_db()
+        conn = get_connection(DB_PATH)
+        now = time.time()
+        conn.execute(
+            """
+            INSERT INTO response_cache (namespace, key, value, expires_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(namespace, key) DO UPDATE SET
+                value = excluded.value,
+                expires_at = excluded.expires_at,
+                last_access = excluded.last_access
+            """,
+            (self.namespace, key, json.dumps(value), now + ttl, now),
+        )
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self._evict(conn, now)
+        conn.commit()
+
+    def _evict(self, conn, now: float):
+        conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                """
+                DELETE FROM response_cache WHERE rowid IN (
+                    SELECT rowid FROM response_cache ORDER BY last_access LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+
+    # ─── async side ──────────────────────────────────────────────────────────
+    async def get_or_fetch(
+        self,
+        key: str,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]],
+        cache_if: Callable[[Any], bool] = lambda value: value is not None,
+    ) -> Any:
+        """
+        Returns the cached value for key, or awaits fetch() once for all
+        concurrent callers and caches its result for ttl seconds if
+        cache_if(result) holds. ttl <= 0 disables caching but keeps
+        single-flight.
+        """
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        if ttl > 0:
+            value = await asyncio.to_thread(self._load, key)
+            if value is not _MISS:
+                self.hits += 1
+                return value
+            # another caller may have started the fetch while we were reading
+            if key in self._inflight:
+                return await asyncio.shield(self._inflight[key])
+
+        self.misses += 1
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+            if ttl > 0 and cache_if(value):
+                await asyncio.to_thread(self._store, key, value, ttl)
+        finally:
+            self._inflight.pop(key, None)
+        return value
+
+    def stats(self) -> Dict:
+        return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,121 @@
+"""
+run_journal.py - Run journal for the filter pipelines.
+
+Every pipeline run gets a row in pipeline_runs (keyed by run id) and each
+wallet it finishes is appended to run_progress. Both tables live in the
+stage's output DB and are written by the same DBWriter op as the results,
+so every group commit persists results and progress together. An
+interrupted run can then be resumed without redoing the wallets it
+already committed.
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+RUNNING = "running"
+COMPLETED = "completed"
+INTERRUPTED = "interrupted"
+
+
+def init_run_journal(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            run_id      TEXT PRIMARY KEY,
+            stage       TEXT NOT NULL,
+            params      TEXT,
+            started_at  INTEGER NOT NULL,
+            finished_at INTEGER,
+            status      TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS run_progress (
+            run_id TEXT NOT NULL,
+            wallet TEXT NOT NULL,
+            PRIMARY KEY (run_id, wallet)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.commit()
+
+
+def start_run(conn: sqlite3.Connection, stage: str, params: Dict) -> str:
+    run_id = base = f"{stage}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    n = 1
+    while conn.execute("SELECT 1 FROM pipeline_runs WHERE run_id = ?", (run_id,)).fetchone():
+        n += 1
+        run_id = f"{base}-{n}"
+    conn.execute(
+        "INSERT INTO pipeline_runs (run_id, stage, params, started_at, status) VALUES (?, ?, ?, ?, ?)",
+        (run_id, stage, json.dumps(params), int(time.time()), RUNNING),
+    )
+    conn.commit()
+    return run_id
+
+
+def find_resumable_run(
+    conn: sqlite3.Connection, stage: str, run_id: Optional[str] = None
+) -> Optional[Tuple[str, Dict]]:
+    """
+    Returns (run_id, params) of the given run, or of the latest unfinished
+    run of stage when run_id is None. None if there is nothing to resume.
+    """
+    if run_id:
+        row = conn.execute(
+            "SELECT run_id, params, status FROM pipeline_runs WHERE run_id = ? AND stage = ?",
+            (run_id, stage),
+        ).fetchone()
+    else:
+        row = conn.execute(
+            """
+            SELECT run_id, params, status FROM pipeline_runs
+            WHERE stage = ? AND status != ?
+            ORDER BY started_at DESC LIMIT 1
+            """,
+            (stage, COMPLETED),
+        ).fetchone()
+    if row is None or row[2] == COMPLETED:
+        return None
+    conn.execute("UPDATE pipeline_runs SET status = ? WHERE run_id = ?", (RUNNING, row[0]))
+    conn.commit()
+    return row[0], json.loads(row[1] or "{}")
+
+
+def processed_count(conn: sqlite3.Connection, run_id: str) -> int:
+    return conn.execute("SELECT COUNT(*) FROM run_progress WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+
+def filter_unprocessed(conn: sqlite3.Connection, run_id: str, wallets: List[str]) -> List[str]:
+    """Drops the wallets run_id already finished. Expects a chunk, not a full list."""
+    if not wallets:
+        return []
+    rows = conn.execute(
+        f"SELECT wallet FROM run_progress WHERE run_id = ? AND wallet IN ({','.join('?' * len(wallets))})",
+        (run_id, *wallets),
+    ).fetchall()
+    done = {r[0] for r in rows}
+    return [w for w in wallets if w not in done]
+
+
+def mark_processed(conn: sqlite3.Connection, run_id: str, wallet: str) -> None:
+    """Does not commit; the DBWriter does."""
+    conn.execute(
+        "INSERT OR IGNORE INTO run_progress (run_id, wallet) VALUES (?, ?)",
+        (run_id, wallet),
+    )
+
+
+def finish_run(conn: sqlite3.Connection, run_id: str, status: str = COMPLETED) -> None:
+    conn.execute(
+        "UPDATE pipeline_runs SET status = ?, finished_at = ? WHERE run_id = ?",
+        (status, int(time.time()), run_id),
+    )
+    if status == COMPLETED:
+        conn.execute("DELETE FROM run_progress WHERE run_id = ?", (run_id,))
+    conn.commit()
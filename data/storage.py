@@ -0,0 +1,78 @@
+"""
+storage.py - Shared sqlite connection manager for raw_data.db, woi.db and smart.db.
+
+Connections are long-lived and cached per (thread, database file), so hot
+paths never pay connect/close overhead. Every connection runs in WAL mode
+so the dashboard can read while a pipeline writes.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT = 30  # seconds to wait on a locked database before raising
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+
+_local = threading.local()
+
+
+def _connections() -> dict:
+    conns = getattr(_local, "connections", None)
+    if conns is None:
+        conns = _local.connections = {}
+    return conns
+
+
+def get_connection(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """
+    Returns this thread's connection to db_path, opening and tuning it on
+    first use. Callers commit but never close it.
+    """
+    key = os.path.abspath(str(db_path))
+    conns = _connections()
+    conn = conns.get(key)
+    if conn is None:
+        conn = sqlite3.connect(
+            key, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[key] = conn
+    return conn
+
+
+@contextmanager
+def transaction(db_path: Union[str, Path]) -> Iterator[sqlite3.Connection]:
+    """Commits on success, rolls back on any exception."""
+    conn = get_connection(db_path)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def close_connection(db_path: Union[str, Path]) -> None:
+    conn = _connections().pop(os.path.abspath(str(db_path)), None)
+    if conn is not None:
+        conn.close()
+
+
+def close_thread_connections() -> None:
+    """Closes every connection opened by the calling thread."""
+    conns = _connections()
+    while conns:
+        _, conn = conns.popitem()
+        conn.close()
@@ -0,0 +1,85 @@
+"""
+wallet_checks.py - "Last checked" ledger for the WoI and smart filter stages.
+
+Each stage keeps a wallet_checks table in its own output DB (woi.db for
+stage "woi", smart.db for stage "smart") recording when a wallet was last
+analysed, whether it was accepted or rejected, and why. Pipelines only
+re-process wallets that are new or whose last check is older than the
+configured max age.
+"""
+
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+MAX_AGE_DAYS = 30  # re-analyse wallets checked longer ago than this
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+
+_CHUNK = 500  # sqlite host-parameter friendly IN (...) size
+
+
+def init_wallet_checks(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_checks (
+            wallet     TEXT NOT NULL,
+            stage      TEXT NOT NULL,
+            checked_at INTEGER NOT NULL,
+            verdict    TEXT NOT NULL,
+            reason     TEXT,
+            PRIMARY KEY (wallet, stage)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wallet_checks_stage_time ON wallet_checks(stage, checked_at)"
+    )
+    conn.commit()
+
+
+def record_check(
+    conn: sqlite3.Connection,
+    wallet: str,
+    stage: str,
+    verdict: str,
+    reason: Optional[str] = None,
+    checked_at: Optional[int] = None,
+) -> None:
+    """Upserts the ledger row. Does not commit; the caller batches commits."""
+    conn.execute(
+        """
+        INSERT INTO wallet_checks (wallet, stage, checked_at, verdict, reason)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(wallet, stage) DO UPDATE SET
+            checked_at = excluded.checked_at,
+            verdict    = excluded.verdict,
+            reason     = excluded.reason
+        """,
+        (wallet, stage, checked_at or int(time.time()), verdict, reason),
+    )
+
+
+def filter_due(
+    conn: sqlite3.Connection,
+    stage: str,
+    wallets: Iterable[str],
+    max_age_days: float = MAX_AGE_DAYS,
+) -> List[str]:
+    """Returns the wallets never checked for stage, or last checked before max_age_days."""
+    wallets = list(wallets)
+    cutoff = int(time.time() - max_age_days * 86400)
+    fresh = set()
+    for i in range(0, len(wallets), _CHUNK):
+        chunk = wallets[i : i + _CHUNK]
+        rows = conn.execute(
+            f"""
+            SELECT wallet FROM wallet_checks
+            WHERE stage = ? AND checked_at >= ?
+              AND wallet IN ({",".join("?" * len(chunk))})
+            """,
+            (stage, cutoff, *chunk),
+        ).fetchall()
+        fresh.update(r[0] for r in rows)
+    return [w for w in wallets if w not in fresh]
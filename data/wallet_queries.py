@@ -0,0 +1,223 @@
+"""
+wallet_queries.py - Read-only, paginated wallet queries for the web dashboard.
+
+Pages are keyset-paginated on (sort column, wallet_id), so fetching any page
+is an index seek plus `limit` rows, however large raw_data.db grows.
+Token/tag/member filters are joins, never IN lists: a common filter is
+probed by primary key while walking the sort index, a rare one drives the
+query from its own table and only its matches are sorted.
+woi.db and smart.db are ATTACHed to the raw_data connection so membership
+filters run inside one query.
+"""
+
+import math
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.raw_data import connect_db
+
+DATA_DIR = os.path.dirname(__file__)
+WOI_DB = os.path.join(DATA_DIR, "woi.db")
+SMART_DB = os.path.join(DATA_DIR, "smart.db")
+
+SORTS = ("token_count", "score")
+# membership filter -> (attach alias, db file, table, wallet column)
+MEMBERSHIPS = {
+    "woi": ("woi", WOI_DB, "good_wallets", "wallet"),
+    "smart": ("smart", SMART_DB, "smart_wallets", "wallet"),
+}
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def attach_db(conn, alias: str, path: str) -> bool:
+    """ATTACHes path as alias once per connection. False if the file does not exist yet."""
+    attached = {row["name"] for row in conn.execute("PRAGMA database_list")}
+    if alias in attached:
+        return True
+    if not os.path.exists(path):
+        return False
+    conn.execute("ATTACH DATABASE ? AS " + alias, (path,))
+    return True
+
+
+def _attach(conn, member: str) -> bool:
+    alias, path, _, _ = MEMBERSHIPS[member]
+    return attach_db(conn, alias, path)
+
+
+def encode_cursor(value, wallet_id: int) -> str:
+    return f"{value}:{wallet_id}"
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[float, int]:
+    """Raises ValueError on a malformed cursor."""
+    value, wallet_id = cursor.rsplit(":", 1)
+    return (int(value) if sort == "token_count" else float(value)), int(wallet_id)
+
+
+def query_wallets(
+    sort: str = "token_count",
+    token: Optional[str] = None,
+    tag: Optional[str] = None,
+    member: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> Dict:
+    """
+    One page of wallets, highest `sort` first. token filters by mint, tag
+    by wallet_tags, member by woi/smart membership. Pass the returned
+    "next" cursor as `after` to get the following page (None at the end).
+    """
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {SORTS}")
+    if member is not None and member not in MEMBERSHIPS:
+        raise ValueError(f"member must be one of {tuple(MEMBERSHIPS)}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    empty = {"wallets": [], "next": None}
+
+    conn, cursor = connect_db()
+    # (table, its wallet column, matching wallets column, match column, match value)
+    filters = []
+    if token:
+        row = cursor.execute("SELECT token_id FROM tokens WHERE mint = ?", (token,)).fetchone()
+        if row is None:
+            return empty
+        filters.append(("wallet_tokens", "wallet_id", "wallet_id", "token_id", row["token_id"]))
+    if tag:
+        filters.append(("wallet_tags", "wallet_id", "wallet_id", "tag", tag))
+    if member:
+        if not _attach(conn, member):
+            return empty
+        alias, _, table, column = MEMBERSHIPS[member]
+        filters.append((f"{alias}.{table}", column, "wallet_address", None, None))
+
+    driver = _pick_driver(cursor, filters, limit)
+    joins, where, params = [], [], []
+    for i, (table, column, wallet_column, match, value) in enumerate(filters):
+        if match:
+            where.append(f"f{i}.{match} = ?")
+            params.append(value)
+        if i == driver:
+            joins.insert(0, f"{table} f{i} CROSS JOIN wallets w ON w.{wallet_column} = f{i}.{column}")
+        else:
+            joins.append(f"CROSS JOIN {table} f{i} ON f{i}.{column} = w.{wallet_column}")
+    if driver is None:
+        joins.insert(0, "wallets w")
+    if after:
+        # row-value form, so the sort index is entered at the cursor
+        where.append(f"(w.{sort}, w.wallet_id) < (?, ?)")
+        params += decode_cursor(after, sort)
+
+    rows = cursor.execute(
+        f"""
+        SELECT w.wallet_id, w.wallet_address, w.token_count, w.score, w.notes
+        FROM {" ".join(joins)}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY w.{sort} DESC, w.wallet_id DESC
+        LIMIT ?
+        """,
+        (*params, limit + 1),
+    ).fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    wallets = _decorate(conn, rows)
+    next_cursor = encode_cursor(rows[-1][sort], rows[-1]["wallet_id"]) if more else None
+    return {"wallets": wallets, "next": next_cursor}
+
+
+def _pick_driver(cursor, filters, limit: int) -> Optional[int]:
+    """
+    Index of the filter whose table should drive the query, or None to walk
+    the sort index and probe every filter per wallet. The walk reads about
+    limit * wallets / matches rows per page, driving from a filter reads
+    (and sorts) all of its matches: a filter with fewer than
+    sqrt(limit * wallets) matches is the cheaper driver.
+    """
+    if not filters:
+        return None
+    wallets = cursor.execute("SELECT MAX(wallet_id) FROM wallets").fetchone()[0] or 0
+    cap = math.isqrt(limit * wallets)
+    sizes = []
+    for table, _, _, match, value in filters:
+        # counting stops at cap, past that the exact size does not matter
+        sizes.append(
+            cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM {table}"
+                f"{f' WHERE {match} = ?' if match else ''} LIMIT ?)",
+                (value, cap) if match else (cap,),
+            ).fetchone()[0]
+        )
+    smallest = min(range(len(filters)), key=sizes.__getitem__)
+    return smallest if sizes[smallest] < cap else None
+
+
+def get_wallet(address: str) -> Optional[Dict]:
+    conn, cursor = connect_db()
+    row = cursor.execute(
+        """
+        SELECT wallet_id, wallet_address, token_count, score, notes
+        FROM wallets WHERE wallet_address = ?
+        """,
+        (address,),
+    ).fetchone()
+    if row is None:
+        return None
+    return _decorate(conn, [row])[0]
+
+
+def _decorate(conn, rows) -> List[Dict]:
+    """Adds tokens, tags and woi/smart membership for one page of wallet rows."""
+    if not rows:
+        return []
+    ids = [row["wallet_id"] for row in rows]
+    marks = ",".join("?" * len(ids))
+
+    tokens: Dict[int, List[Dict]] = {}
+    for t in conn.execute(
+        f"""
+        SELECT wt.wallet_id, t.mint, t.symbol
+        FROM wallet_tokens wt JOIN tokens t ON t.token_id = wt.token_id
+        WHERE wt.wallet_id IN ({marks})
+        ORDER BY wt.wallet_id, wt.first_seen
+        """,
+        ids,
+    ):
+        tokens.setdefault(t["wallet_id"], []).append(
+            {"mint": t["mint"], "symbol": t["symbol"] or "UNKNOWN"}
+        )
+
+    tags: Dict[int, List[str]] = {}
+    for t in conn.execute(
+        f"SELECT wallet_id, tag FROM wallet_tags WHERE wallet_id IN ({marks}) ORDER BY tag", ids
+    ):
+        tags.setdefault(t["wallet_id"], []).append(t["tag"])
+
+    addresses = [row["wallet_address"] for row in rows]
+    members: Dict[str, set] = {}
+    for member, (alias, _, table, column) in MEMBERSHIPS.items():
+        if _attach(conn, member):
+            found = conn.execute(
+                f"SELECT {column} FROM {alias}.{table} WHERE {column} IN ({marks})",
+                addresses,
+            )
+            members[member] = {r[0] for r in found}
+        else:
+            members[member] = set()
+
+    return [
+        {
+            "wallet_address": row["wallet_address"],
+            "token_count": row["token_count"],
+            "score": row["score"],
+            "notes": row["notes"],
+            "tokens": tokens.get(row["wallet_id"], []),
+            "tags": tags.get(row["wallet_id"], []),
+            "woi": row["wallet_address"] in members["woi"],
+            "smart": row["wallet_address"] in members["smart"],
+        }
+        for row in rows
+    ]
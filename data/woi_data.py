@@ -1,32 +1,25 @@
 """
-woi_data.py - Definitions for WoI DB interaction and async PnL filtering.
+woi_data.py - woi.db queries and upserts, and the PnL activity filter.
+The async pipeline that fills it lives in pipelines/raw_to_woi.py.
 """
 
-import asyncio
-import datetime
 import os
 import sqlite3
 import sys
-import time
 from typing import List, Dict, Optional
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
-from raw_data import get_wallets_sorted_by_token_count
-
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from scrapers.bullx import fetch_pnl_stats
+from data.storage import get_connection
+from data.wallet_checks import init_wallet_checks, record_check, ACCEPTED, REJECTED
+from data.run_journal import init_run_journal, mark_processed
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "woi.db")
-
-# Async params
-CONCURRENCY = 5
-DELAY_BETWEEN_CALLS = 0.05  # seconds
+STAGE = "woi"  # wallet_checks stage name
 MIN_THRESHOLD = 5_000  # USD threshold
 
 
 def connect_woi_db() -> tuple[sqlite3.Connection, sqlite3.Cursor]:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection(DB_PATH)
     return conn, conn.cursor()
 
 
@@ -34,31 +27,53 @@ def initialize_woi_db() -> None:
     conn, cur = connect_woi_db()
     cur.execute("CREATE TABLE IF NOT EXISTS good_wallets (wallet TEXT PRIMARY KEY)")
     conn.commit()
-    conn.close()
+    init_wallet_checks(conn)
+    init_run_journal(conn)
 
 
-def insert_wallet(wallet: str) -> None:
-    conn, cur = connect_woi_db()
-    try:
-        cur.execute("INSERT INTO good_wallets (wallet) VALUES (?)", (wallet,))
+def _accept(conn: sqlite3.Connection, wallet: str) -> None:
+    conn.execute("INSERT OR IGNORE INTO good_wallets (wallet) VALUES (?)", (wallet,))
+    record_check(conn, wallet, STAGE, ACCEPTED, "active")
+
+
+def _reject(conn: sqlite3.Connection, wallet: str, reason: str) -> None:
+    conn.execute("DELETE FROM good_wallets WHERE wallet = ?", (wallet,))
+    record_check(conn, wallet, STAGE, REJECTED, reason)
+
+
+def insert_wallet(wallet: str, commit: bool = True) -> None:
+    conn, _ = connect_woi_db()
+    _accept(conn, wallet)
+    if commit:
         conn.commit()
-    except sqlite3.IntegrityError:
-        pass
-    finally:
-        conn.close()
+
+
+def reject_wallet(wallet: str, reason: str, commit: bool = True) -> None:
+    """Records the rejection and drops the wallet if an earlier run had accepted it."""
+    conn, _ = connect_woi_db()
+    _reject(conn, wallet, reason)
+    if commit:
+        conn.commit()
+
+
+def write_verdict(
+    conn: sqlite3.Connection, run_id: str, wallet: str, active: Optional[bool]
+) -> None:
+    """DBWriter op: verdict + run progress for one wallet, committed together."""
+    if active is True:
+        _accept(conn, wallet)
+    elif active is False:
+        _reject(conn, wallet, "inactive")
+    mark_processed(conn, run_id, wallet)
 
 
 def get_all_wallets() -> List[str]:
     conn, cur = connect_woi_db()
     cur.execute("SELECT wallet FROM good_wallets")
     rows = cur.fetchall()
-    conn.close()
     return [r["wallet"] for r in rows]
 
 
-############################################
-
-
 def is_wallet_active(stats: Dict) -> bool:
     """
     Return True iff:
@@ -86,60 +101,3 @@ def is_wallet_active(stats: Dict) -> bool:
         return False
 
     return True
-
-
-def pretty_elapsed(start: float) -> str:
-    sec = int(time.perf_counter() - start)
-    return str(datetime.timedelta(seconds=sec))
-
-
-async def _validate_and_insert(
-    wallet: str, sem: asyncio.Semaphore, state: Dict[str, int], start: float
-):
-    async with sem:
-        stats = await fetch_pnl_stats(wallet)
-
-    state["processed"] += 1
-    idx = state["processed"]
-    total = state["total"]
-    elapsed = pretty_elapsed(start)
-
-    if stats is None:
-        print(f"[{idx:>5}/{total}] {elapsed} | Skipped (no data): {wallet}")
-    elif is_wallet_active(stats):
-        insert_wallet(wallet)
-        print(f"[{idx:>5}/{total}] {elapsed} | Inserted wallet:     {wallet}")
-    else:
-        print(f"[{idx:>5}/{total}] {elapsed} | Skipped (inactive):  {wallet}")
-
-    await asyncio.sleep(DELAY_BETWEEN_CALLS)
-
-
-# ────────────────────────────────────────────────────────────────────
-# Public async pipeline entrypoint
-# ────────────────────────────────────────────────────────────────────
-async def populate_filtered_woi(top_percent: int = 10) -> None:
-    """
-    1. Initializes woi.db.
-    2. Fetches top_percent wallets from raw_data.
-    3. Validates each via fetch_pnl_stats + is_wallet_active.
-    4. Inserts only active wallets, skipping the rest.
-    """
-    initialize_woi_db()
-
-    top_wallets = [w for w, _ in get_wallets_sorted_by_token_count(top_percent)]
-    existing = set(get_all_wallets())
-    to_process = [w for w in top_wallets if w not in existing]
-
-    total = len(to_process)
-    print(f"Validating {total} new wallets with concurrency={CONCURRENCY}")
-
-    state = {"processed": 0, "total": total}
-    sem = asyncio.Semaphore(CONCURRENCY)
-    start = time.perf_counter()
-
-    # Launch validation tasks
-    tasks = [_validate_and_insert(w, sem, state, start) for w in to_process]
-    await asyncio.gather(*tasks)
-
-    print(f"Done in {pretty_elapsed(start)}")
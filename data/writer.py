@@ -0,0 +1,202 @@
+"""
+writer.py - Dedicated sqlite writer thread for the async pipelines.
+
+The event loop never touches the output DB directly. Pipelines submit
+write ops (plain functions taking the writer's connection as their first
+argument) and carry on with network I/O; one thread applies them in order
+and group-commits every BATCH_ROWS ops or BATCH_SECONDS, whichever comes
+first. Closing the writer flushes whatever is still queued.
+
+Because results, wallet_checks and run_progress rows for a wallet go
+through the same op, every commit persists them together, so a commit is
+also the run's checkpoint.
+
+An op that raises is rolled back on its own. An sqlite failure outside the
+ops (BEGIN or COMMIT hitting "database is locked", disk full) rolls back
+that batch and the thread carries on. Anything else stops the writer, and
+write/flush/close raise it instead of waiting on a dead thread.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data.storage import get_connection, close_connection
+
+BATCH_ROWS = 200  # commit after this many ops...
+BATCH_SECONDS = 2.0  # ...or this long after the first uncommitted op
+QUEUE_SIZE = 10_000  # ops buffered before submitters wait
+
+_STOP = object()
+
+
+class DBWriter:
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        batch_rows: int = BATCH_ROWS,
+        batch_seconds: float = BATCH_SECONDS,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.db_path = db_path
+        self.batch_rows = batch_rows
+        self.batch_seconds = batch_seconds
+        self.written = 0
+        self.commits = 0
+        self.errors = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    # ─── writer thread ───────────────────────────────────────────────────────
+    def _run(self):
+        try:
+            conn = get_connection(self.db_path)
+            self._loop(conn)
+        except BaseException as e:
+            # Not an sqlite error on one batch (those are handled in _loop):
+            # keep the exception for the submitters and turn the thread into
+            # a sink, so a blocked write/flush/close returns and raises it.
+            self._error = e
+            print(f"[ERROR] DB writer for {self.db_path} stopped: {e!r}")
+            self._sink()
+        finally:
+            close_connection(self.db_path)
+
+    def _loop(self, conn: sqlite3.Connection):
+        pending = applied = 0  # ops in the open transaction / how many succeeded
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                pending = applied = self._commit(conn, pending, applied)
+                continue
+
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):  # flush marker
+                pending = applied = self._commit(conn, pending, applied)
+                item.set()
+                continue
+
+            fn, args = item
+            try:
+                # each op in its own savepoint: a failing op is undone on its
+                # own instead of being committed half-applied with the batch
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                conn.execute("SAVEPOINT op")
+                try:
+                    fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    self.errors += 1
+                    print(f"[ERROR] DB write {fn.__name__}{args} failed: {e!r}")
+                else:
+                    applied += 1
+                conn.execute("RELEASE op")
+            except sqlite3.Error as e:
+                # BEGIN/SAVEPOINT/ROLLBACK TO itself failed (locked, disk full):
+                # the whole open batch is lost, the thread carries on
+                self._abort(conn, pending + 1, e)
+                pending = applied = 0
+                continue
+            pending += 1
+            if pending == 1:
+                deadline = time.monotonic() + self.batch_seconds
+            if pending >= self.batch_rows:
+                pending = applied = self._commit(conn, pending, applied)
+
+        self._commit(conn, pending, applied)
+
+    def _commit(self, conn: sqlite3.Connection, pending: int, applied: int) -> int:
+        if pending:
+            try:
+                conn.commit()
+            except sqlite3.Error as e:
+                self._abort(conn, pending, e)
+                return 0
+            self.written += applied
+            self.commits += 1
+        return 0
+
+    def _abort(self, conn: sqlite3.Connection, lost: int, e: Exception) -> None:
+        """Rolls back the open batch after an sqlite failure outside an op."""
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+        self.errors += lost
+        print(f"[ERROR] DB writer batch of {lost} ops rolled back: {e!r}")
+
+    def _sink(self):
+        """Drains the queue after a fatal error: releases flushes, stops on _STOP."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"DB writer for {self.db_path} stopped") from self._error
+
+    # ─── event-loop side ─────────────────────────────────────────────────────
+    def start(self) -> "DBWriter":
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    async def write(self, fn: Callable[..., Any], *args) -> None:
+        """Queues fn(conn, *args). Only waits when the queue is full."""
+        self._check()
+        try:
+            self._queue.put_nowait((fn, args))
+        except queue.Full:
+            await asyncio.to_thread(self._queue.put, (fn, args))
+
+    async def flush(self) -> None:
+        """Returns once everything queued so far is committed."""
+        done = threading.Event()
+        await asyncio.to_thread(self._queue.put, done)
+        await asyncio.to_thread(done.wait)
+        self._check()
+
+    async def close(self) -> None:
+        """Flushes the queue, commits and stops the thread."""
+        if self._thread is None:
+            return
+        await asyncio.to_thread(self._queue.put, _STOP)
+        try:
+            await asyncio.to_thread(self._thread.join)
+        except asyncio.CancelledError:
+            # a second Ctrl-C must not lose the final commit
+            self._thread.join()
+            raise
+        finally:
+            self._thread = None
+        self._check()
+
+    async def __aenter__(self) -> "DBWriter":
+        return self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "commits": self.commits,
+            "errors": self.errors,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+omni.py
+
+Long-running entrypoint. `daemon` schedules the trending scan, the WoI
+refresh, the smart refresh, the wallet similarity update and behavioural
+tagging on fixed intervals inside one process, so the pooled HTTP
+clients, GMGN cloudflare clearance, rate-limiter state, response caches
+and sqlite connections stay warm between cycles.
+
+A job that is still running when its next slot comes up is skipped, not
+started twice. WoI/smart jobs pick up an unfinished run of their stage
+(--resume) before starting a fresh one.
+
+Run:
+    python omni.py daemon [--trending-every 6] [--woi-every 12] [--smart-every 12]
+                          [--similarity-every 6] [--tags-every 6]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from analytics.similarity import update_similarity
+from analytics.tagging import run_tagging
+from pipelines import woi_to_smart
+from pipelines.process_tokens import process_trending_tokens
+from pipelines.raw_to_woi import populate_filtered_woi
+from scrapers.bullx import bullx_session
+from scrapers.gmgn import gmgn_session
+from scrapers.helius_utils import helius_session
+from scrapers.rate_limit import limiter_stats
+
+TICK_SECONDS = 30  # how often the scheduler looks for due jobs
+
+
+class Job:
+    def __init__(self, name: str, every_hours: float, run: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = every_hours * 3600
+        self.run = run
+        self.next_run = time.monotonic()  # every job runs once at startup
+        self.task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_run
+
+    def start(self, now: float) -> None:
+        self.next_run = now + self.interval
+        if self.running:
+            print(f"[SKIP] {self.name} is still running, skipping this slot")
+            return
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        started = time.monotonic()
+        print(f"[INFO] {datetime.now():%Y-%m-%d %H:%M:%S} | starting {self.name}")
+        try:
+            await self.run()
+        except Exception as e:
+            self.failures += 1
+            print(f"[ERROR] {self.name} failed: {e}")
+        finally:
+            self.runs += 1
+        took = timedelta(seconds=int(time.monotonic() - started))
+        every = timedelta(seconds=int(self.interval))
+        print(f"[INFO] {self.name} finished in {took}; next run in {every}")
+
+
+async def run_daemon(jobs: List[Job]) -> None:
+    # Outermost sessions: pipelines open their own nested ones, which then
+    # reuse these pools instead of closing them at the end of each run
+    async with helius_session(), bullx_session(), gmgn_session():
+        try:
+            while True:
+                now = time.monotonic()
+                for job in jobs:
+                    if job.due(now):
+                        job.start(now)
+                wake = min(job.next_run for job in jobs) - time.monotonic()
+                await asyncio.sleep(max(1.0, min(TICK_SECONDS, wake)))
+        finally:
+            running = [job.task for job in jobs if job.running]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for job in jobs:
+                print(f"[INFO] {job.name}: {job.runs} runs, {job.failures} failed")
+            print(f"[INFO] Limiters: {limiter_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="omni")
+    sub = parser.add_subparsers(dest="command", required=True)
+    daemon = sub.add_parser("daemon", help="run the pipelines on a schedule")
+    daemon.add_argument("--trending-every", type=float, default=6, help="hours")
+    daemon.add_argument("--woi-every", type=float, default=12, help="hours")
+    daemon.add_argument("--smart-every", type=float, default=12, help="hours")
+    daemon.add_argument("--similarity-every", type=float, default=6, help="hours")
+    daemon.add_argument("--tags-every", type=float, default=6, help="hours")
+    daemon.add_argument("--token-concurrency", type=int, default=4)
+    daemon.add_argument("--top-percent", type=int, default=10)
+    daemon.add_argument("--smart-concurrency", type=int, default=30)
+    args = parser.parse_args()
+
+    jobs = [
+        Job(
+            "trending",
+            args.trending_every,
+            lambda: process_trending_tokens(token_concurrency=args.token_concurrency),
+        ),
+        Job(
+            "woi",
+            args.woi_every,
+            lambda: populate_filtered_woi(top_percent=args.top_percent, resume=True),
+        ),
+        Job(
+            "smart",
+            args.smart_every,
+            lambda: woi_to_smart.main(concurrency=args.smart_concurrency, resume=True),
+        ),
+        Job(
+            "similarity",
+            args.similarity_every,
+            lambda: asyncio.to_thread(update_similarity),
+        ),
+        Job("tags", args.tags_every, lambda: asyncio.to_thread(run_tagging)),
+    ]
+    try:
+        asyncio.run(run_daemon(jobs))
+    except KeyboardInterrupt:
+        print("[INFO] Daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+pipelines/executor.py
+─────────────────────
+Bounded producer/consumer executor shared by the async pipelines.
+
+A fixed number of worker tasks pull items from a bounded asyncio.Queue.
+The producer only advances the source iterator when there is room in the
+queue, so a 100k-wallet run holds `workers + queue_size` items in memory,
+not 100k pending coroutines.
+
+Sources that page sqlite are wrapped in iter_in_thread, so the queries
+behind each chunk run off the event loop.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def run_workers(
+    source: Union[Iterable[T], AsyncIterable[T]],
+    handler: Callable[[T], Awaitable[None]],
+    workers: int,
+    queue_size: Optional[int] = None,
+) -> int:
+    """
+    Runs `await handler(item)` for every item of source on `workers`
+    concurrent workers. Returns the number of items handled. The first
+    handler exception cancels the remaining work and is re-raised.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or workers * 2)
+    handled = 0
+
+    async def produce():
+        if hasattr(source, "__aiter__"):
+            try:
+                async for item in source:
+                    await queue.put(item)
+            finally:
+                if hasattr(source, "aclose"):
+                    await source.aclose()
+        else:
+            for item in source:
+                await queue.put(item)
+        for _ in range(workers):
+            await queue.put(_DONE)
+
+    async def consume():
+        nonlocal handled
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            await handler(item)
+            handled += 1
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(consume()) for _ in range(workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return handled
+
+
+async def iter_in_thread(source: Iterable[T]) -> AsyncIterator[T]:
+    """
+    Async iterator over a blocking iterable, e.g. a generator of sqlite
+    chunks. Every step runs on one dedicated thread, never on the event
+    loop; one thread, so per-thread connections (data/storage.py) opened
+    by the source stay valid from step to step.
+    """
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="source")
+    iterator = iter(source)
+    try:
+        while True:
+            item = await loop.run_in_executor(pool, next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            # queued behind any step still running, on the same thread
+            pool.submit(iterator.close)
+        pool.shutdown(wait=False)
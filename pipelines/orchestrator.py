@@ -0,0 +1,239 @@
+"""
+pipelines/orchestrator.py
+─────────────────────────
+Streaming discovery → WoI → smart pipeline.
+
+  discovery   crawl holders of new trending tokens into raw_data.db
+      │       (a wallet whose token_count reaches --min-tokens is a WoI candidate)
+      ▼ queue
+  BullX       PnL validation, verdict written to woi.db
+      │       (active wallets only)
+      ▼ queue
+  GMGN        phishing + big-win checks, result written to smart.db
+
+Every stage runs its own worker pool, and the stages are linked by bounded
+queues. A wallet reaches the GMGN checks minutes after the token that
+pushed it over the threshold was crawled. It does not wait for the whole
+discovery batch to finish. Helius, BullX and GMGN are all busy at once,
+each paced by its own limiter.
+
+Wallets checked by either stage within --max-age-days are skipped, using
+the same wallet_checks ledgers as the batch scripts.
+
+Run:
+    python -m pipelines.orchestrator [--min-tokens 3] [--token-concurrency 4]
+                                     [--pnl-concurrency 50] [--gmgn-concurrency 30]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data.raw_data import get_wallets_at_token_count
+from data.storage import get_connection
+from data.wallet_checks import filter_due, MAX_AGE_DAYS
+from data.run_journal import start_run, finish_run, INTERRUPTED
+from data.writer import DBWriter
+from data import woi_data
+from data.woi_data import initialize_woi_db, is_wallet_active, write_verdict
+from pipelines.executor import run_workers
+from pipelines.raw_to_woi import CONCURRENCY as PNL_CONCURRENCY
+from pipelines.process_tokens import get_new_trending_tokens, process_token_safely, run_on_raw_db
+from pipelines.woi_to_smart import init_smart_db, analyse_wallet, write_result
+from pipelines import woi_to_smart
+from scrapers.helius_utils import helius_session, HELIUS_LIMITER
+from scrapers.bullx import PnlBatcher, bullx_session, BULLX_LIMITER
+from scrapers.gmgn import gmgn_session, GMGN_LIMITER, GMGN_CACHE
+
+STAGE = "stream"  # pipeline_runs stage name in woi.db and smart.db
+
+WOI_MIN_TOKENS = 3  # absolute token_count that makes a wallet a WoI candidate
+QUEUE_SIZE = 1_000  # wallets buffered between two stages
+
+_END = object()
+
+
+def _woi_candidates(owners, min_tokens, max_age_days, exclude_mints=()):
+    """
+    Owners at/over the threshold that the WoI stage has not checked recently.
+    Memberships of exclude_mints (tokens still being crawled) are not counted.
+    """
+    hits = get_wallets_at_token_count(owners, min_tokens, exclude_mints)
+    if not hits:
+        return []
+    return filter_due(get_connection(woi_data.DB_PATH), woi_data.STAGE, hits, max_age_days)
+
+
+async def _drain(queue: asyncio.Queue):
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        yield item
+
+
+async def run_orchestrator(
+    min_tokens: int = WOI_MIN_TOKENS,
+    token_concurrency: int = 4,
+    pnl_concurrency: int = PNL_CONCURRENCY,
+    gmgn_concurrency: int = 30,
+    max_age_days: float = MAX_AGE_DAYS,
+):
+    initialize_woi_db()
+    woi_conn = get_connection(woi_data.DB_PATH)
+    smart_conn = init_smart_db()
+    params = {"min_tokens": min_tokens, "max_age_days": max_age_days}
+    woi_run = start_run(woi_conn, STAGE, params)
+    smart_run = start_run(smart_conn, STAGE, params)
+
+    woi_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    smart_q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    queued = set()  # wallets already handed to BullX this run
+    counts = {"tokens": 0, "candidates": 0, "woi": 0, "smart": 0}
+    start = time.time()
+
+    def elapsed() -> str:
+        return str(timedelta(seconds=int(time.time() - start)))
+
+    woi_writer = DBWriter(woi_data.DB_PATH)
+    smart_writer = DBWriter(woi_to_smart.SMART_DB)
+
+    # ─── stage 1: discovery ──────────────────────────────────────────────────
+    # A token that turns out to exceed the holder limit is removed again
+    # (remove_token), which can take wallets back under the threshold. So
+    # candidates are only released once every token they count on has
+    # finished crawling; until then they wait in `held`.
+    crawling = set()  # mints whose crawl is still running
+    held = set()
+    release_lock = asyncio.Lock()
+
+    async def release(pending):
+        async with release_lock:
+            wallets = [w for w in pending | held if w not in queued]
+            if not wallets:
+                return
+            hits = await run_on_raw_db(_woi_candidates, wallets, min_tokens, max_age_days)
+            ready = hits
+            if crawling and hits:
+                ready = await run_on_raw_db(
+                    _woi_candidates, hits, min_tokens, max_age_days, tuple(crawling)
+                )
+            held.clear()
+            held.update(set(hits) - set(ready))
+            for wallet in ready:
+                if wallet not in queued:
+                    queued.add(wallet)
+                    counts["candidates"] += 1
+                    await woi_q.put(wallet)  # blocks discovery while BullX is behind
+
+    async def discover(contract):
+        mint = contract.get("address")
+        pending = set()
+
+        async def on_ingest(owners):
+            # called on the event loop once a page is committed; only the
+            # lookup itself goes to the raw-db thread
+            pending.update(
+                await run_on_raw_db(_woi_candidates, owners, min_tokens, max_age_days)
+            )
+
+        crawling.add(mint)
+        try:
+            await process_token_safely(contract, on_ingest)
+        finally:
+            crawling.discard(mint)
+        counts["tokens"] += 1
+        await release(pending)
+
+    async def discovery():
+        tokens = await asyncio.to_thread(get_new_trending_tokens)
+        print(f"[INFO] Streaming {len(tokens)} new trending tokens (run {woi_run})")
+        await run_workers(tokens, discover, workers=token_concurrency)
+        await woi_q.put(_END)
+
+    # ─── stage 2: BullX PnL ──────────────────────────────────────────────────
+    async def validate(wallet):
+        stats = await batcher.fetch(wallet)
+        active = None if stats is None else is_wallet_active(stats)
+        await woi_writer.write(write_verdict, woi_run, wallet, active)
+        if active:
+            counts["woi"] += 1
+            print(f"[INFO] {elapsed()} | WoI wallet: {wallet}")
+            await smart_q.put(wallet)
+
+    async def pnl_stage():
+        await run_workers(_drain(woi_q), validate, workers=pnl_concurrency)
+        await smart_q.put(_END)
+
+    # ─── stage 3: GMGN ───────────────────────────────────────────────────────
+    async def analyse(wallet):
+        row, reason = await analyse_wallet(wallet)
+        await smart_writer.write(write_result, smart_run, wallet, row, reason)
+        if row:
+            counts["smart"] += 1
+            print(f"[SUCCESS] {elapsed()} | Smart wallet: {wallet}")
+
+    async def smart_stage():
+        await run_workers(_drain(smart_q), analyse, workers=gmgn_concurrency)
+
+    try:
+        async with woi_writer, smart_writer, helius_session(), bullx_session(), gmgn_session():
+            batcher = PnlBatcher()
+            tasks = [
+                asyncio.create_task(discovery()),
+                asyncio.create_task(pnl_stage()),
+                asyncio.create_task(smart_stage()),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+    except BaseException:
+        finish_run(woi_conn, woi_run, INTERRUPTED)
+        finish_run(smart_conn, smart_run, INTERRUPTED)
+        print(f"[WARN] Interrupted after {elapsed()} | {counts}")
+        raise
+
+    finish_run(woi_conn, woi_run)
+    finish_run(smart_conn, smart_run)
+    print(f"[INFO] Pipeline completed in {elapsed()} | {counts}")
+    print(f"[INFO] Helius limiter: {HELIUS_LIMITER.stats()}")
+    print(f"[INFO] BullX limiter: {BULLX_LIMITER.stats()}")
+    print(f"[INFO] GMGN limiter: {GMGN_LIMITER.stats()} | cache: {GMGN_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--min-tokens",
+        type=int,
+        default=WOI_MIN_TOKENS,
+        help="token count at which a wallet becomes a WoI candidate",
+    )
+    parser.add_argument("--token-concurrency", type=int, default=4)
+    parser.add_argument("--pnl-concurrency", type=int, default=PNL_CONCURRENCY)
+    parser.add_argument("--gmgn-concurrency", type=int, default=30)
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=MAX_AGE_DAYS,
+        help="re-check wallets whose last check is older than this",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        run_orchestrator(
+            min_tokens=args.min_tokens,
+            token_concurrency=args.token_concurrency,
+            pnl_concurrency=args.pnl_concurrency,
+            gmgn_concurrency=args.gmgn_concurrency,
+            max_age_days=args.max_age_days,
+        )
+    )
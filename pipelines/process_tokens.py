@@ -1,20 +1,46 @@
 import sys
 import os
 import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from scrapers.defined_fi import get_trending_token_info
-from scrapers.helius_utils import get_token_accounts_rpc
-from data.raw_data import add_or_update_wallet, get_all_seen_token_addresses
-from scrapers.bullx import fetch_pnl_stats
+from scrapers.helius_utils import (
+    iter_token_account_pages,
+    get_top_holders,
+    helius_session,
+    HolderLimitExceeded,
+    HELIUS_LIMITER,
+)
+from data.raw_data import ingest_holders, get_seen_token_addresses, remove_token
+from pipelines.executor import run_workers
 
 
 # Set this flag to False if we want to include tokens with >200k holders
 SKIP_LARGE_HOLDER_TOKENS = True
+LARGE_HOLDER_THRESHOLD = 200_000
+# Oversized tokens still contribute their top N holders by amount (max 20,
+# the getTokenLargestAccounts cap). Set to 0 to skip them entirely.
+LARGE_TOKEN_TOP_HOLDERS = 20
 
+# All raw_data.db writes go through this single thread, so concurrent token
+# crawls never contend for the sqlite write lock
+_db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="raw-db-writer")
 
-def process_token(contract: dict):
+
+async def run_on_raw_db(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_db_writer, fn, *args)
+
+
+async def process_token(contract: dict, on_ingest=None):
+    """
+    Crawls the holders of one token into raw_data.db. on_ingest, if given,
+    is awaited with the owner addresses of every page once it is committed.
+    """
     mint = contract.get("address")
     symbol = contract.get("symbol", "UNKNOWN")
 
@@ -24,25 +50,70 @@ def process_token(contract: dict):
 
     print(f"\n[INFO] Processing token: {symbol} ({mint})")
 
-    holders = get_token_accounts_rpc(mint)
-    holder_count = len(holders)
-    print(f"[INFO] Retrieved {holder_count} holders for token {symbol}")
+    max_holders = LARGE_HOLDER_THRESHOLD if SKIP_LARGE_HOLDER_TOKENS else None
 
-    if SKIP_LARGE_HOLDER_TOKENS and holder_count > 200_000:
-        print(f"[SKIP] {symbol} has too many holders ({holder_count}) — skipping")
+    # Cheap up-front estimate from the trending feed, before any Helius call
+    estimate = contract.get("holders")
+    if max_holders is not None and estimate and estimate > max_holders:
+        print(f"[SKIP] {symbol} reports {estimate} holders — not crawling")
+        await _ingest_top_holders(mint, symbol, on_ingest)
         return
 
-    for holder in holders:
-        wallet = holder.get("owner")
-        if wallet:
-            add_or_update_wallet(wallet, mint, token_symbol=symbol)
+    holder_count = inserted = updated = 0
+
+    # Each page is written (off the event loop) while the next one is in flight
+    try:
+        async with aclosing(
+            iter_token_account_pages(mint, max_holders=max_holders)
+        ) as pages:
+            async for holders in pages:
+                holder_count += len(holders)
+                result = await run_on_raw_db(ingest_holders, mint, symbol, holders)
+                inserted += result["inserted"]
+                updated += result["updated"]
+                if on_ingest:
+                    await on_ingest([h["owner"] for h in holders if h.get("owner")])
+    except HolderLimitExceeded:
+        print(
+            f"[SKIP] {symbol} has too many holders (>{max_holders}) — stopped paging"
+        )
+        await run_on_raw_db(remove_token, mint)
+        await _ingest_top_holders(mint, symbol, on_ingest)
+        return
+    except BaseException:
+        # Pages are committed as they stream: a partial token would count as
+        # seen (get_seen_token_addresses) and never be crawled again
+        print(f"[WARN] Crawl of {symbol} did not finish — dropping its partial holders")
+        await run_on_raw_db(remove_token, mint)
+        raise
+
+    print(
+        f"[INFO] Retrieved {holder_count} holders for token {symbol}: "
+        f"inserted {inserted} wallets, updated {updated} wallets"
+    )
 
 
-def process_trending_tokens():
+async def _ingest_top_holders(mint: str, symbol: str, on_ingest=None):
+    if not LARGE_TOKEN_TOP_HOLDERS:
+        return
+    holders = await get_top_holders(mint, k=LARGE_TOKEN_TOP_HOLDERS)
+    result = await run_on_raw_db(ingest_holders, mint, symbol, holders)
+    if on_ingest:
+        await on_ingest([h["owner"] for h in holders if h.get("owner")])
+    print(
+        f"[INFO] Kept top {len(holders)} holders of {symbol}: "
+        f"inserted {result['inserted']} wallets, updated {result['updated']} wallets"
+    )
+
+
+def get_new_trending_tokens() -> list:
+    """Trending tokens not yet in raw_data.db, deduplicated."""
     trending_contracts = get_trending_token_info()
-    seen_tokens = get_all_seen_token_addresses()
-    print(f"[INFO] Skipping previously seen tokens. Total seen: {len(seen_tokens)}\n")
+    # only look up the trending mints, not the whole tokens table
+    seen_tokens = get_seen_token_addresses([c.get("address") for c in trending_contracts])
+    print(f"[INFO] Skipping previously seen tokens. Trending already seen: {len(seen_tokens)}\n")
 
+    to_process = []
     for contract in trending_contracts:
         mint = contract.get("address")
         if mint in seen_tokens:
@@ -50,12 +121,39 @@ def process_trending_tokens():
                 f"[SKIP] Token already processed: {contract.get('symbol', 'UNKNOWN')} ({mint})"
             )
             continue
+        seen_tokens.add(mint)
+        to_process.append(contract)
+    return to_process
+
+
+async def process_token_safely(contract: dict, on_ingest=None):
+    """process_token that logs failures instead of aborting the whole batch."""
+    try:
+        await process_token(contract, on_ingest)
+    except Exception as e:
+        print(f"[ERROR] Failed to process {contract.get('symbol')}: {e}")
+
+
+async def process_trending_tokens(token_concurrency: int = 4):
+    to_process = await asyncio.to_thread(get_new_trending_tokens)
+
+    # Several mints crawl at once; HELIUS_LIMITER caps the combined request rate
+    start = time.perf_counter()
+    async with helius_session():
+        await run_workers(to_process, process_token_safely, workers=token_concurrency)
 
-        process_token(contract)
+    print(
+        f"[INFO] Processed {len(to_process)} tokens in "
+        f"{time.perf_counter() - start:.1f}s (token concurrency={token_concurrency})"
+    )
+    print(f"[INFO] Helius limiter: {HELIUS_LIMITER.stats()}")
 
 
 if __name__ == "__main__":
     # Toggle the below to True if you want to include large-holder tokens
     # SKIP_LARGE_HOLDER_TOKENS = False
 
-    process_trending_tokens()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(process_trending_tokens(token_concurrency=args.token_concurrency))
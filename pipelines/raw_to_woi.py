@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 """
-pipelines/raw_filter_to_woi.py
+pipelines/raw_to_woi.py
 
-Pipeline entrypoint: repopulates woi.db by running the filtered WoI pipeline.
+Pipeline entrypoint: validates raw_data's top wallets through BullX PnL
+stats and repopulates woi.db with the active ones.
 """
 
+import argparse
 import asyncio
+import datetime
 import os
 import sys
+import time
+from contextlib import aclosing
+from typing import Dict, Optional, Union
 
 # ────────────────────────────────────────────────────────────────────
 # Compute project root (one level up from pipelines/)
@@ -16,9 +22,175 @@ HERE = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(HERE, os.pardir))
 sys.path.insert(0, PROJECT_ROOT)
 
-# Now import from data.woi_data
-from data.woi_data import populate_filtered_woi
+from data.raw_data import get_top_wallet_count, iter_wallets_by_token_count
+from data.run_journal import (
+    start_run,
+    find_resumable_run,
+    processed_count,
+    filter_unprocessed,
+    finish_run,
+    INTERRUPTED,
+)
+from data.wallet_checks import filter_due, MAX_AGE_DAYS
+from data.woi_data import (
+    DB_PATH,
+    STAGE,
+    connect_woi_db,
+    initialize_woi_db,
+    is_wallet_active,
+    write_verdict,
+)
+from data.writer import DBWriter
+from pipelines.executor import iter_in_thread, run_workers
+from scrapers.bullx import PnlBatcher, bullx_session, BATCH_SIZE, BULLX_LIMITER
+
+# Async params
+CONCURRENCY = 5 * BATCH_SIZE  # wallets in flight; ~5 BullX requests once batched
+CHUNK_SIZE = 500  # wallets read from raw_data per query
+
+
+def pretty_elapsed(start: float) -> str:
+    sec = int(time.perf_counter() - start)
+    return str(datetime.timedelta(seconds=sec))
+
+
+async def _validate_and_insert(
+    wallet: str,
+    state: Dict[str, int],
+    start: float,
+    batcher: PnlBatcher,
+    run_id: str,
+    writer: DBWriter,
+):
+    stats = await batcher.fetch(wallet)
+
+    state["processed"] += 1
+    idx = state["processed"]
+    total = state["total"]
+    elapsed = pretty_elapsed(start)
+
+    # No data is a lookup failure, not a verdict: leave it due for the next run
+    active = None if stats is None else is_wallet_active(stats)
+    await writer.write(write_verdict, run_id, wallet, active)
+
+    if active is None:
+        print(f"[{idx:>5}/{total}] {elapsed} | Skipped (no data): {wallet}")
+    elif active:
+        print(f"[{idx:>5}/{total}] {elapsed} | Inserted wallet:     {wallet}")
+    else:
+        print(f"[{idx:>5}/{total}] {elapsed} | Skipped (inactive):  {wallet}")
+
+
+# ────────────────────────────────────────────────────────────────────
+# Public async pipeline entrypoint
+# ────────────────────────────────────────────────────────────────────
+async def populate_filtered_woi(
+    top_percent: int = 10,
+    max_age_days: float = MAX_AGE_DAYS,
+    resume: Optional[Union[bool, str]] = None,
+) -> None:
+    """
+    1. Initializes woi.db and starts (or resumes) a journaled run.
+    2. Streams top_percent wallets from raw_data in chunks.
+    3. Keeps only wallets never checked, or last checked (accepted or
+       rejected) more than max_age_days ago, minus wallets the resumed
+       run already finished.
+    4. Validates each via fetch_pnl_stats + is_wallet_active on a fixed
+       pool of CONCURRENCY workers fed through a bounded queue.
+    5. Inserts only active wallets and records every verdict in
+       wallet_checks, via the DBWriter thread, which group-commits results
+       and run progress together.
+
+    resume=True continues the latest unfinished run; a run id string
+    continues that run. Its original parameters are reused.
+    """
+    initialize_woi_db()
+    conn, _ = connect_woi_db()
+
+    resumed = find_resumable_run(conn, STAGE, None if resume is True else resume) if resume else None
+    if resumed:
+        run_id, params = resumed
+        top_percent = params.get("top_percent", top_percent)
+        max_age_days = params.get("max_age_days", max_age_days)
+        print(f"Resuming run {run_id} ({processed_count(conn, run_id)} wallets already done)")
+    else:
+        if resume:
+            print("No unfinished run to resume, starting a new one")
+        run_id = start_run(
+            conn, STAGE, {"top_percent": top_percent, "max_age_days": max_age_days}
+        )
+
+    def due_chunks():
+        # runs on the source thread, with that thread's own woi.db connection
+        source_conn, _ = connect_woi_db()
+        for chunk in iter_wallets_by_token_count(top_percent, CHUNK_SIZE):
+            wallets = filter_due(source_conn, STAGE, [w for w, _ in chunk], max_age_days)
+            if resumed:
+                wallets = filter_unprocessed(source_conn, run_id, wallets)
+            yield wallets
+
+    async def due_wallets():
+        # streamed chunk by chunk; the executor pulls only as workers free up
+        async with aclosing(iter_in_thread(due_chunks())) as chunks:
+            async for wallets in chunks:
+                for wallet in wallets:
+                    yield wallet
+
+    total = get_top_wallet_count(top_percent)
+    print(
+        f"Validating new/stale wallets of the top {total} "
+        f"with concurrency={CONCURRENCY} (run {run_id})"
+    )
+
+    state = {"processed": 0, "total": total}
+    start = time.perf_counter()
+    writer = DBWriter(DB_PATH)
+
+    # Fixed pool of workers over one pooled BullX client
+    # Concurrent lookups are coalesced into shared multi-wallet requests
+    # All writes go through the writer thread; leaving the block flushes it
+    try:
+        async with writer, bullx_session():
+            batcher = PnlBatcher()
+            await run_workers(
+                due_wallets(),
+                lambda w: _validate_and_insert(w, state, start, batcher, run_id, writer),
+                workers=CONCURRENCY,
+            )
+    except BaseException:
+        finish_run(conn, run_id, INTERRUPTED)
+        print(f"Interrupted; resume with --resume {run_id}")
+        raise
+
+    finish_run(conn, run_id)
+    print(
+        f"Done in {pretty_elapsed(start)} | {state['processed']} validated | "
+        f"writer: {writer.stats()} | BullX limiter: {BULLX_LIMITER.stats()}"
+    )
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
     # Adjust top_percent if you like
-    asyncio.run(populate_filtered_woi(top_percent=10))
+    parser.add_argument("--top-percent", type=int, default=10)
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=MAX_AGE_DAYS,
+        help="re-check wallets whose last check is older than this",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const=True,
+        metavar="RUN_ID",
+        help="continue the latest (or the given) interrupted run",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        populate_filtered_woi(
+            top_percent=args.top_percent,
+            max_age_days=args.max_age_days,
+            resume=args.resume,
+        )
+    )
@@ -6,9 +6,14 @@ pipelines/woi_to_smart.py
       – phishing-safe?      (scrapers.gmgn.is_wallet_safe)
       – has big wins?       (scrapers.gmgn.get_gmgn_big_wins)
 • Insert/update rows in smart.db (table: smart_wallets)
+• Record every verdict in smart.db (table: wallet_checks); wallets checked
+  within --max-age-days are skipped on the next run
+• All writes go through a DBWriter thread that group-commits results +
+  run progress; --resume continues an interrupted run without redoing
+  finished wallets
 
 Run:
-    python -m pipelines.woi_to_smart  [--concurrency 30]
+    python -m pipelines.woi_to_smart  [--concurrency 30] [--max-age-days 30] [--resume [RUN_ID]]
 """
 
 import asyncio
@@ -18,6 +23,7 @@ import argparse
 from pathlib import Path
 import sys, pathlib
 import threading
+from contextlib import aclosing
 from datetime import timedelta
 import random
 
@@ -25,20 +31,47 @@ ROOT = pathlib.Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
 # ─── import gmgn helpers ──────────────────────────────────────────────────────
+from data.storage import get_connection
+from data.wallet_checks import (
+    init_wallet_checks,
+    record_check,
+    filter_due,
+    MAX_AGE_DAYS,
+    ACCEPTED,
+    REJECTED,
+)
+from data.run_journal import (
+    init_run_journal,
+    start_run,
+    find_resumable_run,
+    processed_count,
+    filter_unprocessed,
+    mark_processed,
+    finish_run,
+    INTERRUPTED,
+)
+from data.writer import DBWriter
+from pipelines.executor import iter_in_thread, run_workers
 from scrapers.gmgn import (
     is_wallet_safe,
     get_gmgn_big_wins,
     get_gmgn_risk,
+    gmgn_session,
+    GMGN_LIMITER,
+    GMGN_CACHE,
 )
 
 # ─── file paths ───────────────────────────────────────────────────────────────
 ROOT = Path(__file__).resolve().parents[1]
 WOI_DB = ROOT / "data" / "woi.db"
 SMART_DB = ROOT / "data" / "smart.db"
+STAGE = "smart"  # wallet_checks stage name
+CHUNK_SIZE = 500  # wallets read from woi.db per query
+LOOKUP_FAILED = "lookup failed"  # GMGN returned nothing: no verdict, retried next run
 
 # ─── sqlite helpers ───────────────────────────────────────────────────────────
 def init_smart_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(SMART_DB)
+    conn = get_connection(SMART_DB)
     cur = conn.cursor()
     cur.execute(
         """
@@ -55,31 +88,54 @@ def init_smart_db() -> sqlite3.Connection:
         """
     )
     conn.commit()
+    init_wallet_checks(conn)
+    init_run_journal(conn)
     return conn
 
 
 def load_all_wallets() -> list[str]:
-    conn = sqlite3.connect(WOI_DB)
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT wallet FROM good_wallets")
-        rows = cur.fetchall()
-        return [r[0] for r in rows]
-    finally:
-        conn.close()
+    conn = get_connection(WOI_DB)
+    rows = conn.execute("SELECT wallet FROM good_wallets").fetchall()
+    return [r[0] for r in rows]
+
+
+def count_woi_wallets() -> int:
+    conn = get_connection(WOI_DB)
+    return conn.execute("SELECT COUNT(*) FROM good_wallets").fetchone()[0]
+
+
+def iter_woi_wallets(chunk_size: int = CHUNK_SIZE):
+    """Yields good_wallets in chunks, keyset-paginated on the primary key."""
+    conn = get_connection(WOI_DB)
+    last = ""
+    while True:
+        rows = conn.execute(
+            "SELECT wallet FROM good_wallets WHERE wallet > ? ORDER BY wallet LIMIT ?",
+            (last, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [r[0] for r in rows]
 
 
 # ─── per-wallet async processing ──────────────────────────────────────────────
 async def analyse_wallet(wallet: str):
-    """Return dict to insert, or None if wallet is not smart."""
+    """
+    Return (row, reason): row is the dict to insert, or None if the wallet
+    is not smart, in which case reason says why. reason is LOOKUP_FAILED
+    when GMGN returned no risk data, which says nothing about the wallet.
+    """
+    risk = await get_gmgn_risk(wallet)
+    if not risk:
+        return None, LOOKUP_FAILED
+
     if not await is_wallet_safe(wallet):
-        return None
+        return None, "failed phishing checks"
 
     big = await get_gmgn_big_wins(wallet)
     if not big["has_big_wins"]:
-        return None
-
-    risk = await get_gmgn_risk(wallet)
+        return None, "no big wins"
 
     # pad winners to 3 slots
     winners = big["winners"] + [{}] * (3 - len(big["winners"]))
@@ -92,7 +148,7 @@ async def analyse_wallet(wallet: str):
         "wins": winners,
         "ts": int(time.time()),
     }
-    return row
+    return row, "smart"
 
 
 def upsert_row(conn: sqlite3.Connection, row: dict):
@@ -128,46 +184,121 @@ def upsert_row(conn: sqlite3.Connection, row: dict):
     )
 
 
-# ─── main pipeline ────────────────────────────────────────────────────────────
-async def main(concurrency: int = 30):
-    wallets = load_all_wallets()
-    total = len(wallets)
-    print(f"[INFO] Starting analysis for {total} wallets from woi.db")
+def write_result(conn: sqlite3.Connection, run_id: str, wallet: str, row, reason: str):
+    """DBWriter op: result row, verdict and run progress for one wallet."""
+    if row:
+        upsert_row(conn, row)
+        record_check(conn, wallet, STAGE, ACCEPTED, reason)
+    elif reason != LOOKUP_FAILED:
+        # a re-check can demote a wallet an earlier run accepted
+        conn.execute("DELETE FROM smart_wallets WHERE wallet = ?", (wallet,))
+        record_check(conn, wallet, STAGE, REJECTED, reason)
+    mark_processed(conn, run_id, wallet)
+
 
-    sem = asyncio.Semaphore(concurrency)
+# ─── main pipeline ────────────────────────────────────────────────────────────
+async def main(
+    concurrency: int = 30, max_age_days: float = MAX_AGE_DAYS, resume=None
+):
     conn = init_smart_db()
 
+    resumed = find_resumable_run(conn, STAGE, None if resume is True else resume) if resume else None
+    if resumed:
+        run_id, params = resumed
+        max_age_days = params.get("max_age_days", max_age_days)
+        print(f"[INFO] Resuming run {run_id} ({processed_count(conn, run_id)} wallets already done)")
+    else:
+        if resume:
+            print("[INFO] No unfinished run to resume, starting a new one")
+        run_id = start_run(conn, STAGE, {"max_age_days": max_age_days})
+
+    def due_chunks():
+        # runs on the source thread, with that thread's own smart.db connection
+        source_conn = get_connection(SMART_DB)
+        for chunk in iter_woi_wallets():
+            wallets = filter_due(source_conn, STAGE, chunk, max_age_days)
+            if resumed:
+                wallets = filter_unprocessed(source_conn, run_id, wallets)
+            yield wallets
+
+    async def due_wallets():
+        async with aclosing(iter_in_thread(due_chunks())) as chunks:
+            async for wallets in chunks:
+                for wallet in wallets:
+                    yield wallet
+
+    total = count_woi_wallets()
+    print(
+        f"[INFO] Starting analysis for new/stale wallets "
+        f"of {total} in woi.db (run {run_id})"
+    )
+
+    writer = DBWriter(SMART_DB)
+    processed = 0
+
     start_time = time.time()  # 👆 start-timestamp holder
 
-    async def worker(idx_wallet):
-        idx, w = idx_wallet
-        async with sem:
-            row = await analyse_wallet(w)
-            elapsed = time.time() - start_time
-            hhmmss = str(timedelta(seconds=int(elapsed)))
-
-            if row:
-                upsert_row(conn, row)
-                print(
-                    f"[SUCCESS] [{idx+1}/{total}] Wallet {w} processed successfully | Elapsed: {hhmmss}"
-                )
-            else:
-                print(
-                    f"[SKIP] [{idx+1}/{total}] Wallet {w} did not meet criteria | Elapsed: {hhmmss}"
-                )
-
-    # enumerate so each worker knows its sequence #
-    await asyncio.gather(*(worker(pair) for pair in enumerate(wallets)))
+    async def worker(w):
+        nonlocal processed
+        row, reason = await analyse_wallet(w)
+        await writer.write(write_result, run_id, w, row, reason)
+        processed += 1
+        idx = processed
+        elapsed = time.time() - start_time
+        hhmmss = str(timedelta(seconds=int(elapsed)))
 
-    conn.commit()
-    conn.close()
+        if row:
+            print(
+                f"[SUCCESS] [{idx}/{total}] Wallet {w} processed successfully | Elapsed: {hhmmss}"
+            )
+        elif reason == LOOKUP_FAILED:
+            print(
+                f"[WARN] [{idx}/{total}] No GMGN data for wallet {w}, left for the next run | Elapsed: {hhmmss}"
+            )
+        else:
+            print(
+                f"[SKIP] [{idx}/{total}] Wallet {w} did not meet criteria ({reason}) | Elapsed: {hhmmss}"
+            )
+
+    # fixed pool of `concurrency` workers fed from a bounded queue;
+    # sqlite writes happen on the writer thread, flushed when the block exits
+    try:
+        async with writer, gmgn_session():
+            await run_workers(due_wallets(), worker, workers=concurrency)
+    except BaseException:
+        finish_run(conn, run_id, INTERRUPTED)
+        print(f"[WARN] Interrupted; resume with --resume {run_id}")
+        raise
+
+    finish_run(conn, run_id)
 
     runtime = str(timedelta(seconds=int(time.time() - start_time)))
     print(f"[INFO] Pipeline completed in {runtime}. Output written to data/smart.db")
+    print(f"[INFO] DB writer: {writer.stats()}")
+    print(f"[INFO] GMGN limiter: {GMGN_LIMITER.stats()} | cache: {GMGN_CACHE.stats()}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=MAX_AGE_DAYS,
+        help="re-check wallets whose last check is older than this",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const=True,
+        metavar="RUN_ID",
+        help="continue the latest (or the given) interrupted run",
+    )
     args = parser.parse_args()
-    asyncio.run(main(concurrency=args.concurrency))
+    asyncio.run(
+        main(
+            concurrency=args.concurrency,
+            max_age_days=args.max_age_days,
+            resume=args.resume,
+        )
+    )
@@ -0,0 +1,89 @@
+"""
+scrapers/binance.py
+───────────────────
+Historical SOL/USD from Binance SOLUSDT hourly klines, so SOL-quoted fills
+(analytics/decoder.py) are valued at the price of their own hour instead
+of today's. Uses the public market-data host: no API key, no geo-block.
+"""
+
+import bisect
+import os
+import sys
+from array import array
+from typing import Optional
+
+import httpx
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scrapers.http_client import SharedAsyncClient
+from scrapers.rate_limit import get_limiter
+
+KLINES_URL = "https://data-api.binance.vision/api/v3/klines"
+SYMBOL = "SOLUSDT"
+INTERVAL = "1h"
+HOUR = 3600
+KLINES_PER_REQUEST = 1000  # API maximum, ~41 days of hourly candles
+
+BINANCE_LIMITER = get_limiter(
+    "data-api.binance.vision",
+    rate=5.0,
+    min_rate=1.0,
+    max_rate=10.0,
+    max_in_flight=2,
+)
+
+_http = SharedAsyncClient(timeout=20)
+
+
+class PriceHistory:
+    """
+    Hourly closes as a step function of unix time. Called with a timestamp,
+    returns the close of the hour it falls in (the nearest hour at either
+    end of the range).
+    """
+
+    def __init__(self):
+        self.ts = array("q")
+        self.price = array("d")
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __call__(self, ts: int) -> float:
+        if not self.ts:
+            raise ValueError("empty price history")
+        i = bisect.bisect_right(self.ts, ts) - 1
+        return self.price[max(i, 0)]
+
+
+async def get_sol_usd_history(
+    start_ts: int, end_ts: int, client: Optional[httpx.AsyncClient] = None
+) -> PriceHistory:
+    """SOL/USD hourly closes covering [start_ts, end_ts] (unix seconds)."""
+    client = client or _http.get()
+    history = PriceHistory()
+    start = start_ts - start_ts % HOUR
+    while start <= end_ts:
+        async with BINANCE_LIMITER.slot():
+            res = await client.get(
+                KLINES_URL,
+                params={
+                    "symbol": SYMBOL,
+                    "interval": INTERVAL,
+                    "startTime": start * 1000,
+                    "endTime": end_ts * 1000,
+                    "limit": KLINES_PER_REQUEST,
+                },
+            )
+        res.raise_for_status()
+        BINANCE_LIMITER.on_success()
+        candles = res.json()
+        if not candles:
+            break
+        for candle in candles:  # [open time ms, open, high, low, close, ...]
+            history.ts.append(candle[0] // 1000)
+            history.price.append(float(candle[4]))
+        start = history.ts[-1] + HOUR
+    if not history:
+        raise ValueError(f"no {SYMBOL} klines between {start_ts} and {end_ts}")
+    return history
@@ -5,9 +5,15 @@ import time
 import httpx
 from typing import Dict, List, Optional, Union
 import os
+import sys
 from dotenv import load_dotenv
 import asyncio
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scrapers.http_client import SharedAsyncClient
+from scrapers.rate_limit import get_limiter, parse_retry_after
+from data.response_cache import ResponseCache
+
 load_dotenv()
 
 BULLX_HEADERS = json.loads(os.getenv("BULLX_HEADERS_JSON", "{}"))
@@ -15,34 +21,200 @@ BULLX_COOKIES = json.loads(os.getenv("BULLX_COOKIES_JSON", "{}"))
 HEADERS = BULLX_HEADERS
 COOKIES = BULLX_COOKIES
 
+PORTFOLIO_URL = "https://api-neo.bullx.io/v2/api/getPortfolioV3"
+CHAIN_IDS = [1399811149, 728126428]
+BATCH_SIZE = 10  # wallets packed into one getPortfolioV3 request
+PNL_CACHE_TTL = 12 * 3600  # seconds pnlStats stay fresh
+PNL_CACHE = ResponseCache("bullx_pnl")
+MAX_RETRIES = 3  # attempts per request when throttled
+
+BULLX_LIMITER = get_limiter(
+    "api-neo.bullx.io",
+    rate=10.0,
+    min_rate=1.0,
+    max_rate=40.0,
+    max_in_flight=10,
+    burst=5,
+)
+
+# Flipped off the first time BullX answers a multi-wallet request with
+# aggregate stats only; from then on every wallet is fetched on its own
+_batching_supported = True
+
+# One keep-alive HTTP/2 pool for every BullX call instead of a client per wallet
+_http = SharedAsyncClient(
+    timeout=20,
+    http2=True,
+    headers=HEADERS,
+    cookies=COOKIES,
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+)
+
 
-async def fetch_pnl_stats(wallet: str) -> Optional[Dict]:
+def bullx_session():
+    """`async with bullx_session():` keeps the pooled client open for the block."""
+    return _http.session()
+
+
+async def fetch_pnl_stats(
+    wallet: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[Dict]:
     """
     Fetch pnlStats for one wallet. Returns the stats dict on success, or None on any error.
+    Uses the pooled client unless one is passed in. Successful lookups are
+    cached for PNL_CACHE_TTL.
     """
-    url = "https://api-neo.bullx.io/v2/api/getPortfolioV3"
-    payload = {
+    return await PNL_CACHE.get_or_fetch(
+        wallet, PNL_CACHE_TTL, lambda: _fetch_pnl_stats(wallet, client)
+    )
+
+
+async def _fetch_pnl_stats(
+    wallet: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[Dict]:
+    body = await _post_portfolio([wallet], client)
+    if body is None:
+        return None
+    return body.get("pnlStats", {})
+
+
+def _portfolio_payload(wallets: List[str]) -> Dict:
+    return {
         "name": "getPortfolioV3",
         "data": {
-            "walletAddresses": [wallet],
-            "chainIds": [1399811149, 728126428],
+            "walletAddresses": wallets,
+            "chainIds": CHAIN_IDS,
             "fetchMostProfitablePositions": True,
             "mostProfitablePositionsFilters": {
-                "chainIds": [1399811149, 728126428],
-                "walletAddresses": [wallet],
+                "chainIds": CHAIN_IDS,
+                "walletAddresses": wallets,
             },
         },
     }
 
-    async with httpx.AsyncClient(timeout=20) as client:
+
+async def _post_portfolio(
+    wallets: List[str], client: Optional[httpx.AsyncClient] = None
+) -> Optional[Dict]:
+    client = client or _http.get()
+    try:
+        for attempt in range(1, MAX_RETRIES + 1):
+            async with BULLX_LIMITER.slot():
+                resp = await client.post(PORTFOLIO_URL, json=_portfolio_payload(wallets))
+            if resp.status_code == 429 and attempt < MAX_RETRIES:
+                BULLX_LIMITER.on_throttle(parse_retry_after(resp.headers.get("Retry-After")))
+                continue
+            resp.raise_for_status()
+            BULLX_LIMITER.on_success()
+            return resp.json()
+    except Exception:
+        return None
+
+
+def _split_pnl_stats(body: Dict, wallets: List[str]) -> Optional[Dict[str, Dict]]:
+    """
+    Multi-wallet responses are expected to key pnlStats by wallet address.
+    Returns the wallets that have stats, which may be fewer than were
+    requested. Returns None if no requested wallet is a key, i.e. the
+    response only carries aggregate stats.
+    """
+    stats = body.get("pnlStats") or {}
+    if not any(w in stats for w in wallets):
+        return None
+    return {w: stats[w] for w in wallets if isinstance(stats.get(w), dict)}
+
+
+async def fetch_pnl_stats_many(
+    wallets: List[str],
+    batch_size: int = BATCH_SIZE,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, Optional[Dict]]:
+    """
+    Fetch pnlStats for many wallets, packing up to batch_size wallets into
+    each getPortfolioV3 request. Returns {wallet: stats or None on error}.
+    """
+    wallets = list(dict.fromkeys(wallets))
+    results: Dict[str, Optional[Dict]] = {}
+
+    async def run_batch(batch: List[str]):
+        global _batching_supported
+        if len(batch) > 1 and _batching_supported:
+            body = await _post_portfolio(batch, client)
+            if body is None:
+                results.update({w: None for w in batch})
+                return
+            split = _split_pnl_stats(body, batch)
+            if split is not None:
+                results.update(split)
+                # wallets the batch had no stats for are retried one by one
+                batch = [w for w in batch if w not in split]
+                if not batch:
+                    return
+            elif _batching_supported:
+                print("[WARN] BullX returned aggregate pnlStats only; disabling batching")
+                _batching_supported = False
+
+        stats = await asyncio.gather(*(_fetch_pnl_stats(w, client) for w in batch))
+        results.update(zip(batch, stats))
+
+    step = batch_size if _batching_supported else 1
+    await asyncio.gather(
+        *(run_batch(wallets[i : i + step]) for i in range(0, len(wallets), step))
+    )
+    return results
+
+
+class PnlBatcher:
+    """
+    Micro-batching collector: concurrent fetch() calls made within max_wait
+    seconds of each other are coalesced into one fetch_pnl_stats_many
+    request of up to batch_size wallets.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, max_wait: float = 0.05):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+
+    async def fetch(self, wallet: str) -> Optional[Dict]:
+        # cache hits and duplicate in-flight wallets never reach a batch
+        return await PNL_CACHE.get_or_fetch(
+            wallet, PNL_CACHE_TTL, lambda: self._enqueue(wallet)
+        )
+
+    async def _enqueue(self, wallet: str) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((wallet, fut))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[tuple]):
         try:
-            resp = await client.post(
-                url, headers=HEADERS, cookies=COOKIES, json=payload
+            results = await fetch_pnl_stats_many(
+                [w for w, _ in batch], batch_size=len(batch)
             )
-            resp.raise_for_status()
-            return resp.json().get("pnlStats", {})
         except Exception:
-            return None
+            results = {}
+        for wallet, fut in batch:
+            if not fut.done():
+                fut.set_result(results.get(wallet))
 
 
 if __name__ == "__main__":
@@ -50,7 +222,8 @@ if __name__ == "__main__":
     test_wallet = "H1UsuH1T32cKbdWpnkuYg5DCFfSgxDj4WMLD9jAZPJuB"
 
     async def main():
-        stats = await fetch_pnl_stats(test_wallet)
+        async with bullx_session():
+            stats = await fetch_pnl_stats(test_wallet)
         print(json.dumps(stats, indent=2))
 
     asyncio.run(main())
@@ -2,12 +2,23 @@ import cloudscraper
 import json
 
 
+_scraper = None
+
+
+def _get_scraper():
+    # one scraper per process keeps its cloudflare cookies between calls
+    global _scraper
+    if _scraper is None:
+        _scraper = cloudscraper.create_scraper(
+            browser={"browser": "chrome", "platform": "windows", "mobile": False}
+        )
+    return _scraper
+
+
 def get_trending_tokens_from_defined(limit=20):
     url = "https://www.defined.fi/api"
 
-    scraper = cloudscraper.create_scraper(
-        browser={"browser": "chrome", "platform": "windows", "mobile": False}
-    )
+    scraper = _get_scraper()
 
     query = """
     query FilterTokens($filters: TokenFilters, $statsType: TokenPairStatisticsType, $phrase: String, $tokens: [String], $rankings: [TokenRanking], $limit: Int, $offset: Int) {
@@ -37,6 +48,7 @@ def get_trending_tokens_from_defined(limit=20):
           marketCap
           volume24
           change24
+          holders
         }
       }
     }
@@ -76,12 +88,13 @@ def get_trending_tokens_from_defined(limit=20):
         return []
 
 
-def get_trending_token_info():  # address and symbol only
+def get_trending_token_info():  # address, symbol and holder count estimate
     tokens = get_trending_tokens_from_defined()
     contract_info_list = [
         {
             "address": token["token"].get("address"),
             "symbol": token["token"].get("symbol", "UNKNOWN"),
+            "holders": token.get("holders"),
         }
         for token in tokens
         if token.get("token") and token["token"].get("address")
@@ -1,16 +1,33 @@
 import time
 import asyncio
 import cloudscraper
+import httpx
 from dotenv import load_dotenv
 import os
+import sys
 import json
-import threading
 import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scrapers.http_client import SharedAsyncClient
+from scrapers.rate_limit import get_limiter, parse_retry_after
+from data.response_cache import ResponseCache
 
 load_dotenv()
 scraper = cloudscraper.create_scraper()
 GMGN_HEADERS = json.loads(os.getenv("GMGN_HEADERS_JSON", "{}"))
 HEADERS = GMGN_HEADERS
+GMGN_BASE_URL = "https://gmgn.ai"
+
+# Seconds a response stays fresh, per endpoint. Endpoints not listed are never cached.
+CACHE_TTL = {
+    "/api/v1/wallet_stat/sol/{wallet}/7d": 6 * 3600,
+    "/api/v1/wallet_holdings/sol/{wallet}": 6 * 3600,
+}
+GMGN_CACHE = ResponseCache("gmgn")
 
 
 def get_base_params(**extra) -> dict:
@@ -31,12 +48,6 @@ def get_base_params(**extra) -> dict:
     return p
 
 
-async def fetch_gmgn_data(
-    endpoint_path: str, wallet: str, params_override: dict | None = None
-) -> dict:
-    return await asyncio.to_thread(_sync_fetch, endpoint_path, wallet, params_override)
-
-
 async def get_gmgn_risk(wallet: str) -> dict:
     """
     Return phishing-risk ratios.
@@ -113,54 +124,230 @@ MAX_DELAY = 1.00  # never above 1 s   (can still rise via back-off)
 ADJUST_FACTOR = 1.15  # how aggressively to slow/speed
 SUCCESS_WINDOW = 50  # successes needed before speeding back up
 
-_lock = threading.Lock()
-_next_time = 0.0
-_delay = 1.0 / TARGET_QPS
-_success = 0  # rolling counter
+MAX_IN_FLIGHT = 30  # concurrent GMGN requests on the shared pool
+MAX_CLEARANCE_RETRIES = 3  # fresh clearances rejected in a row before switching to cloudscraper
+CHALLENGE_BACKOFF_MAX = 60  # seconds
+FALLBACK_THREADS = 4  # cloudscraper is blocking: it gets a few threads of its own
+PROBE_INTERVAL = 60  # seconds in fallback before httpx is tried again...
+PROBE_INTERVAL_MAX = 15 * 60  # ...doubling up to this while it keeps being challenged
+
+# Async pacing: waiting for a slot parks a coroutine, never a thread
+GMGN_LIMITER = get_limiter(
+    "gmgn.ai",
+    rate=TARGET_QPS,
+    min_rate=1.0 / MAX_DELAY,
+    max_rate=1.0 / MIN_DELAY,
+    max_in_flight=MAX_IN_FLIGHT,
+    increase_step=TARGET_QPS * (ADJUST_FACTOR - 1),
+    decrease_factor=ADJUST_FACTOR,
+    success_window=SUCCESS_WINDOW,
+)
+
+_http = SharedAsyncClient(
+    timeout=20,
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=MAX_IN_FLIGHT, max_keepalive_connections=MAX_IN_FLIGHT
+    ),
+)
+
+
+def gmgn_session():
+    """`async with gmgn_session():` keeps the pooled client open for the block."""
+    return _http.session()
+
+
+# ─── Cloudflare clearance ────────────────────────────────────────────────────
+# cloudscraper solves the challenge once (in a thread); the resulting cookies
+# and user agent are then replayed on the async httpx pool.
+_clearance: dict | None = None
+_clearance_lock: asyncio.Lock | None = None
+_clearance_loop = None
+
+
+def _solve_clearance() -> dict:
+    resp = scraper.get(GMGN_BASE_URL + "/", headers=HEADERS)
+    cookies = "; ".join(f"{k}={v}" for k, v in scraper.cookies.get_dict().items())
+    headers = dict(HEADERS)
+    headers["User-Agent"] = scraper.headers.get("User-Agent", headers.get("User-Agent", ""))
+    if cookies:
+        existing = headers.pop("cookie", None) or headers.pop("Cookie", None)
+        headers["Cookie"] = f"{existing}; {cookies}" if existing else cookies
+    print(f"[INFO] Solved GMGN cloudflare clearance (HTTP {resp.status_code})")
+    return {"headers": headers, "generation": time.time()}
+
+
+async def _get_clearance(stale: dict | None = None) -> dict:
+    """
+    Returns current clearance. Passing the clearance that just got
+    challenged forces one re-solve, shared by every coroutine that saw it.
+    """
+    global _clearance, _clearance_lock, _clearance_loop
+    loop = asyncio.get_running_loop()
+    if _clearance_loop is not loop:
+        _clearance_lock, _clearance_loop = asyncio.Lock(), loop
+
+    async with _clearance_lock:
+        if _clearance is None or _clearance is stale:
+            _clearance = await asyncio.to_thread(_solve_clearance)
+    return _clearance
+
+
+# ─── Transport mode ──────────────────────────────────────────────────────────
+# Cloudflare can tie cf_clearance to the TLS/HTTP fingerprint of the client
+# that solved it, in which case httpx keeps getting 403s however often the
+# cookie is refreshed. When MAX_CLEARANCE_RETRIES clearances in a row are
+# rejected, the whole host switches to cloudscraper; one request at a time
+# re-probes httpx every probe_interval seconds and switches back once it
+# gets through.
+_fallback_pool = ThreadPoolExecutor(max_workers=FALLBACK_THREADS, thread_name_prefix="gmgn-cf")
+
+
+class _Transport:
+    def __init__(self):
+        self.fallback = False
+        self.challenges = 0  # clearances rejected in a row over httpx
+        self.blocked = 0  # 403s in a row over cloudscraper
+        self.probe_interval = PROBE_INTERVAL
+        self.probe_at = 0.0
+        self.probing = False
+        self.rejected = None  # last clearance httpx got a 403 with
+
+    def pick(self) -> str:
+        """"httpx", "probe" (httpx while in fallback) or "cloudscraper"."""
+        if not self.fallback:
+            return "httpx"
+        if not self.probing and time.monotonic() >= self.probe_at:
+            self.probing = True
+            return "probe"
+        return "cloudscraper"
+
+    def httpx_passed(self, route: str) -> None:
+        self.challenges = 0
+        if route == "probe" and self.fallback:
+            self.fallback = False
+            self.probe_interval = PROBE_INTERVAL
+            print("[INFO] GMGN accepts httpx again, leaving the cloudscraper fallback")
+
+    def httpx_challenged(self, route: str, clearance: dict) -> bool:
+        """Records a 403 over httpx; True if it counted as a new rejection."""
+        if route == "probe":
+            self.probe_interval = min(PROBE_INTERVAL_MAX, self.probe_interval * 2)
+            self.probe_at = time.monotonic() + self.probe_interval
+            return False
+        # every request that was in flight with this clearance sees the same
+        # 403; it counts once, and an already replaced clearance not at all
+        if clearance is self.rejected or clearance is not _clearance:
+            return False
+        self.rejected = clearance
+        self.challenges += 1
+        if not self.fallback and self.challenges >= MAX_CLEARANCE_RETRIES:
+            self.fallback = True
+            self.probe_at = time.monotonic() + self.probe_interval
+            print(
+                f"[WARN] GMGN rejected {self.challenges} clearances over httpx, "
+                f"switching to cloudscraper (re-probing in {self.probe_interval}s)"
+            )
+        return True
+
 
-REQUEST_DELAY = 0.2
-_lock = threading.Lock()
-_next_allowed = 0.0
+_transport = _Transport()
 
 
-def _wait_slot():
-    global _next_allowed
-    with _lock:
-        now = time.time()
-        if now < _next_allowed:
-            time.sleep(_next_allowed - now)
-        _next_allowed = time.time() + REQUEST_DELAY
+async def _send(route: str, url: str, headers: dict, params: dict):
+    if route == "cloudscraper":
+        return await asyncio.get_running_loop().run_in_executor(
+            _fallback_pool, partial(scraper.get, url, headers=headers, params=params, timeout=20)
+        )
+    return await _http.get().get(url, headers=headers, params=params)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 
 
-def _sync_fetch(
+async def fetch_gmgn_data(
     endpoint_path: str, wallet: str, params_override: dict | None = None
 ) -> dict:
+    """
+    Cached front for _fetch_gmgn_data. Identical concurrent requests share
+    one network call; responses are kept for CACHE_TTL[endpoint_path].
+    """
+    params = params_override or get_base_params()
+    # "_" is the cache-busting timestamp, so it must not be part of the key
+    key = endpoint_path.format(wallet=wallet) + "?" + urlencode(
+        sorted((k, v) for k, v in params.items() if k != "_")
+    )
+    return await GMGN_CACHE.get_or_fetch(
+        key,
+        CACHE_TTL.get(endpoint_path, 0),
+        lambda: _fetch_gmgn_data(endpoint_path, wallet, params),
+        cache_if=bool,  # an empty reply is a failed lookup, not an answer
+    )
+
+
+async def _fetch_gmgn_data(endpoint_path: str, wallet: str, params: dict) -> dict:
     """
     Guaranteed-return version: will loop forever until GMGN
     replies with data (code == 0).  NO wallet is ever skipped.
+    Every wait (rate limit, back-off) is an asyncio sleep.
     """
-    url = "https://gmgn.ai" + endpoint_path.format(wallet=wallet)
-    params = params_override or get_base_params()
+    url = GMGN_BASE_URL + endpoint_path.format(wallet=wallet)
     attempt = 0
 
     while True:
         attempt += 1
-        _wait_slot()
+        route = None
 
         try:
-            resp = scraper.get(url, headers=HEADERS, params=params)
+            try:
+                async with GMGN_LIMITER.slot():
+                    # route and clearance are picked once the slot is ours, so
+                    # requests queued behind a 403 don't replay what just got
+                    # rejected; a rejected clearance is re-solved once, for all
+                    route = _transport.pick()
+                    clearance = await _get_clearance(
+                        None if route == "cloudscraper" else _transport.rejected
+                    )
+                    resp = await _send(route, url, clearance["headers"], params)
+            finally:
+                if route == "probe":
+                    _transport.probing = False
+
             if resp.status_code == 429:
-                # hard rate-limit: sleep a bit longer and retry
-                sleep_for = 3 + random.uniform(0, 2)  # 3-5 s
+                # hard rate-limit: slow the whole host down, then retry
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                sleep_for = retry_after or 3 + random.uniform(0, 2)  # 3-5 s
+                GMGN_LIMITER.on_throttle(sleep_for)
                 print(
                     f"[WARN] Received HTTP 429 for wallet {wallet} (attempt {attempt}). Retrying in {sleep_for:.1f} seconds."
                 )
-                time.sleep(sleep_for)
+                continue  # the limiter holds every gmgn request until the pause ends
+
+            if resp.status_code == 403:
+                if route != "cloudscraper":
+                    # replayed clearance rejected: note it host-wide and retry
+                    # with a fresh one (or through cloudscraper, if that was
+                    # the last straw)
+                    if _transport.httpx_challenged(route, clearance):
+                        GMGN_LIMITER.on_throttle()
+                    continue
+                # cloudscraper itself is challenged: back off, then solve again
+                GMGN_LIMITER.on_throttle()
+                _transport.blocked += 1
+                sleep_for = min(CHALLENGE_BACKOFF_MAX, 2 ** _transport.blocked) * random.uniform(0.5, 1.5)
+                print(
+                    f"[WARN] Cloudflare challenge for wallet {wallet} (attempt {attempt}). "
+                    f"Refreshing clearance in {sleep_for:.1f} seconds."
+                )
+                await asyncio.sleep(sleep_for)
+                await _get_clearance(stale=clearance)
                 continue
 
+            if route == "cloudscraper":
+                _transport.blocked = 0
+            else:
+                _transport.httpx_passed(route)
+
             resp.raise_for_status()
 
             payload = resp.json()
@@ -170,20 +357,24 @@ def _sync_fetch(
                 print(
                     f"[INFO] GMGN API returned non-zero code for wallet {wallet}. Retrying in {sleep_for:.1f} seconds. Response code: {payload.get('code')}"
                 )
+                GMGN_LIMITER.on_throttle()
 
-                time.sleep(sleep_for)
+                await asyncio.sleep(sleep_for)
                 continue
 
+            GMGN_LIMITER.on_success()
             return payload.get("data", {})
 
         except (json.JSONDecodeError, ValueError):
             print(
                 f"[ERROR] Failed to parse JSON response for wallet {wallet}. Retrying in 2 seconds."
             )
+            await asyncio.sleep(2)
         except Exception as e:
             print(
                 f"[ERROR] Exception encountered while fetching data for wallet {wallet}: {e}. Retrying in 5 seconds."
             )
+            await asyncio.sleep(5)
 
 
 async def get_gmgn_big_wins(
@@ -1,24 +1,90 @@
 import os
-import requests
-import time
-from typing import List, Dict, Optional
+import sys
+import asyncio
+import httpx
+from typing import Any, AsyncIterator, List, Dict, Optional, Union
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scrapers.http_client import SharedAsyncClient
+from scrapers.rate_limit import get_limiter, parse_retry_after
+
 load_dotenv()
 HELIUS_API_KEY = os.getenv("HELIUS_API_KEY")
 RPC_URL = f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
 
+# One Helius budget for the whole process, shared by concurrent token crawls
+HELIUS_LIMITER = get_limiter(
+    "mainnet.helius-rpc.com",
+    rate=10.0,
+    min_rate=1.0,
+    max_rate=50.0,
+    max_in_flight=10,
+    burst=5,
+)
+MAX_RETRIES = 5  # attempts per RPC call when throttled
+TX_BATCH_SIZE = 50  # getTransaction calls per JSON-RPC batch request
 
-def get_token_accounts_rpc(
+_http = SharedAsyncClient(
+    timeout=30,
+    headers={"Content-Type": "application/json"},
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+)
+
+
+class HolderLimitExceeded(Exception):
+    """Raised by iter_token_account_pages once a token passes max_holders."""
+
+    def __init__(self, mint_address: str, seen: int, max_holders: int):
+        super().__init__(
+            f"{mint_address} has more than {max_holders} holders (stopped at {seen})"
+        )
+        self.mint_address = mint_address
+        self.seen = seen
+        self.max_holders = max_holders
+
+
+async def _rpc_post(client: httpx.AsyncClient, url: str, payload: Union[Dict, List]) -> Any:
+    """
+    POSTs one JSON-RPC call (or a batch, as a list) through HELIUS_LIMITER,
+    retrying on HTTP 429.
+    """
+    for attempt in range(1, MAX_RETRIES + 1):
+        async with HELIUS_LIMITER.slot():
+            res = await client.post(url, json=payload)
+        if res.status_code == 429 and attempt < MAX_RETRIES:
+            HELIUS_LIMITER.on_throttle(parse_retry_after(res.headers.get("Retry-After")))
+            continue
+        res.raise_for_status()
+        HELIUS_LIMITER.on_success()
+        return res.json()
+
+
+def helius_session():
+    """`async with helius_session():` keeps one pooled client open for the block."""
+    return _http.session()
+
+
+async def iter_token_account_pages(
     mint_address: str,
     api_key: Optional[str] = None,
     limit: int = 1000,
-    delay: float = 0.2,
-) -> List[Dict]:
+    delay: float = 0.0,
+    client: Optional[httpx.AsyncClient] = None,
+    max_holders: Optional[int] = None,
+) -> AsyncIterator[List[Dict]]:
     """
-    Fetches all token holders (token accounts) from Helius RPC using pagination.
-    Returns:
-        List[Dict]: List of token account dicts (owner, amount, etc).
+    Async generator over token holder pages (token accounts) from Helius RPC.
+    The request for page N+1 is already in flight while the caller handles
+    page N, and only one page is held in memory at a time. Requests are
+    paced by HELIUS_LIMITER; `delay` adds an extra pause between pages.
+
+    If max_holders is set, paging stops and HolderLimitExceeded is raised
+    as soon as the running total passes it (the overflowing page is not
+    yielded). A page that still fails after retries raises as well, so a
+    cut-short crawl is never mistaken for the end of the holder list.
+    Yields:
+        List[Dict]: One page of token account dicts (owner, amount, etc).
     """
     api_key = api_key or HELIUS_API_KEY
     if not api_key:
@@ -27,13 +93,11 @@ def get_token_accounts_rpc(
         )
 
     url = f"https://mainnet.helius-rpc.com/?api-key={api_key}"
-    headers = {"Content-Type": "application/json"}
-
-    holders = []
-    cursor = None
-    page = 1
+    client = client or _http.get()
 
-    while True:
+    async def fetch_page(page: int, cursor: Optional[str]) -> Dict:
+        if page > 1 and delay:
+            await asyncio.sleep(delay)
         payload = {
             "jsonrpc": "2.0",
             "id": str(page),
@@ -44,33 +108,256 @@ def get_token_accounts_rpc(
                 "options": {"showZeroBalance": False},
             },
         }
-
         if cursor:
             payload["params"]["cursor"] = cursor
 
-        try:
-            res = requests.post(url, json=payload, headers=headers)
-            res.raise_for_status()
-            result = res.json()["result"]
+        return (await _rpc_post(client, url, payload))["result"]
+
+    page = 1
+    total = 0
+    pending = asyncio.create_task(fetch_page(page, None))
+    try:
+        while pending is not None:
+            try:
+                result = await pending
+            except Exception as e:
+                print(f"Error on page {page}: {e}")
+                raise
 
             accounts = result.get("token_accounts", [])
-            holders.extend(accounts)
+            total += len(accounts)
             print(f"→ Page {page}: {len(accounts)} accounts")
 
-            if not accounts or "cursor" not in result:
-                break
+            if max_holders is not None and total > max_holders:
+                raise HolderLimitExceeded(mint_address, total, max_holders)
+
+            pending = None
+            if accounts and "cursor" in result:
+                pending = asyncio.create_task(fetch_page(page + 1, result["cursor"]))
 
-            cursor = result["cursor"]
+            if accounts:
+                yield accounts
             page += 1
-            time.sleep(delay)
-        except Exception as e:
-            print(f"Error on page {page}: {e}")
-            break
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+    print(f"\nTotal holders for {mint_address}: {total}")
+
+
+async def get_top_holders(
+    mint_address: str,
+    k: int = 20,
+    api_key: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
+    """
+    Returns the k largest token accounts of a mint, without crawling every
+    holder. Uses getTokenLargestAccounts (capped at 20 by the RPC) and
+    resolves each account's owner with one getMultipleAccounts call.
+    Returns:
+        List[Dict]: Token account dicts (address, owner, amount), largest first.
+    """
+    api_key = api_key or HELIUS_API_KEY
+    if not api_key:
+        raise ValueError(
+            "Missing Helius API key. Set it in .env or pass it explicitly."
+        )
+
+    url = f"https://mainnet.helius-rpc.com/?api-key={api_key}"
+    client = client or _http.get()
 
-    print(f"\nTotal holders for {mint_address}: {len(holders)}")
+    try:
+        body = await _rpc_post(
+            client,
+            url,
+            {
+                "jsonrpc": "2.0",
+                "id": "largest",
+                "method": "getTokenLargestAccounts",
+                "params": [mint_address],
+            },
+        )
+        largest = body["result"]["value"][:k]
+        if not largest:
+            return []
+
+        body = await _rpc_post(
+            client,
+            url,
+            {
+                "jsonrpc": "2.0",
+                "id": "owners",
+                "method": "getMultipleAccounts",
+                "params": [
+                    [acc["address"] for acc in largest],
+                    {"encoding": "jsonParsed"},
+                ],
+            },
+        )
+        infos = body["result"]["value"]
+    except Exception as e:
+        print(f"Error fetching top holders for {mint_address}: {e}")
+        return []
+
+    holders = []
+    for acc, info in zip(largest, infos):
+        try:
+            owner = info["data"]["parsed"]["info"]["owner"]
+        except (TypeError, KeyError):
+            continue
+        holders.append(
+            {
+                "address": acc["address"],
+                "mint": mint_address,
+                "owner": owner,
+                "amount": int(acc["amount"]),
+            }
+        )
     return holders
 
 
+async def get_wallet_transactions(
+    wallet: str,
+    limit: int = 100,
+    api_key: Optional[str] = None,
+    rpc_url: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[Dict]:
+    """
+    Returns the wallet's `limit` most recent transactions (jsonParsed
+    getTransaction results, newest first). Signatures come from
+    getSignaturesForAddress; the transactions are then fetched with batched
+    JSON-RPC requests, TX_BATCH_SIZE per POST. rpc_url overrides Helius
+    (e.g. analytics/mock_rpc.py).
+    """
+    if rpc_url is None:
+        api_key = api_key or HELIUS_API_KEY
+        if not api_key:
+            raise ValueError(
+                "Missing Helius API key. Set it in .env or pass it explicitly."
+            )
+        rpc_url = f"https://mainnet.helius-rpc.com/?api-key={api_key}"
+    client = client or _http.get()
+
+    body = await _rpc_post(
+        client,
+        rpc_url,
+        {
+            "jsonrpc": "2.0",
+            "id": "sigs",
+            "method": "getSignaturesForAddress",
+            "params": [wallet, {"limit": limit}],
+        },
+    )
+    signatures = [s["signature"] for s in body.get("result") or [] if s.get("err") is None]
+
+    txs = []
+    for i in range(0, len(signatures), TX_BATCH_SIZE):
+        batch = [
+            {
+                "jsonrpc": "2.0",
+                "id": j,
+                "method": "getTransaction",
+                "params": [
+                    sig,
+                    {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0},
+                ],
+            }
+            for j, sig in enumerate(signatures[i : i + TX_BATCH_SIZE])
+        ]
+        replies = await _rpc_post(client, rpc_url, batch)
+        if not isinstance(replies, list):
+            # batch rejected as a whole (JSON-RPC error object): one call per signature
+            print(f"[WARN] Helius batch rejected for {wallet}: {replies!r}; fetching singly")
+            replies = [await _rpc_post(client, rpc_url, call) for call in batch]
+            if all("error" in r for r in replies if isinstance(r, dict)):
+                raise RuntimeError(
+                    f"getTransaction failed for {wallet}: {replies[0].get('error')!r}"
+                )
+        # match by id - replies may come back in any order, and error replies
+        # can carry "id": null
+        by_id = {r.get("id"): r for r in replies if isinstance(r, dict)}
+        for call in batch:
+            reply = by_id.get(call["id"]) or {}
+            if "error" in reply:
+                print(f"[WARN] getTransaction {call['params'][0]} failed: {reply['error']}")
+            elif reply.get("result"):
+                txs.append(reply["result"])
+    return txs
+
+
+ASSET_BATCH_SIZE = 1000  # ids per getAssetBatch call (DAS limit)
+
+
+async def get_token_prices(
+    mints: List[str],
+    api_key: Optional[str] = None,
+    rpc_url: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, float]:
+    """
+    Current USD price per mint, from the DAS getAssetBatch price_info.
+    Helius only prices tokens with enough recent volume; mints it has no
+    price for are left out of the result.
+    """
+    if rpc_url is None:
+        api_key = api_key or HELIUS_API_KEY
+        if not api_key:
+            raise ValueError(
+                "Missing Helius API key. Set it in .env or pass it explicitly."
+            )
+        rpc_url = f"https://mainnet.helius-rpc.com/?api-key={api_key}"
+    client = client or _http.get()
+
+    prices = {}
+    mints = list(dict.fromkeys(mints))
+    for i in range(0, len(mints), ASSET_BATCH_SIZE):
+        body = await _rpc_post(
+            client,
+            rpc_url,
+            {
+                "jsonrpc": "2.0",
+                "id": "prices",
+                "method": "getAssetBatch",
+                "params": {"ids": mints[i : i + ASSET_BATCH_SIZE]},
+            },
+        )
+        for asset in body.get("result") or []:
+            price = ((asset or {}).get("token_info") or {}).get("price_info", {}).get("price_per_token")
+            if price is not None:
+                prices[asset["id"]] = float(price)
+    return prices
+
+
+def get_token_accounts_rpc(
+    mint_address: str,
+    api_key: Optional[str] = None,
+    limit: int = 1000,
+    delay: float = 0.0,
+    max_holders: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Fetches all token holders (token accounts) from Helius RPC using pagination.
+    Thin blocking wrapper around iter_token_account_pages (raises
+    HolderLimitExceeded if max_holders is passed, or the page error if a
+    page cannot be fetched, instead of returning a truncated list).
+    Returns:
+        List[Dict]: List of token account dicts (owner, amount, etc).
+    """
+
+    async def collect() -> List[Dict]:
+        holders = []
+        async with helius_session() as client:
+            async for accounts in iter_token_account_pages(
+                mint_address, api_key, limit, delay, client=client, max_holders=max_holders
+            ):
+                holders.extend(accounts)
+        return holders
+
+    return asyncio.run(collect())
+
+
 if __name__ == "__main__":
     token = "J27UYHX5oeaG1YbUGQc8BmJySXDjNWChdGB2Pi2TMDAq"
     holders = get_token_accounts_rpc(token)
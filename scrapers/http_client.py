@@ -0,0 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+
+class SharedAsyncClient:
+    """
+    Lazily-built httpx.AsyncClient that is reused by every call made on the
+    same event loop, so requests share one keep-alive connection pool.
+
+    A client is bound to the loop it was created on; if a later
+    asyncio.run() asks for one, a fresh client is built for that loop.
+    Sessions nest: only the outermost one closes the client, so a
+    long-lived caller (the daemon) keeps the pool warm across runs.
+    """
+
+    def __init__(self, **client_kwargs):
+        self._kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._depth = 0
+
+    def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(**self._kwargs)
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        client, loop = self._client, self._loop
+        self._client = self._loop = None
+        if client is not None and not client.is_closed and loop is asyncio.get_running_loop():
+            await client.aclose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Opens the pooled client for the duration of the block, then closes it."""
+        client = self.get()
+        self._depth += 1
+        try:
+            yield client
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                await self.aclose()
@@ -0,0 +1,138 @@
+"""
+rate_limit.py - Adaptive per-host rate limiting shared by every scraper.
+
+Each scraper declares its host budget once with get_limiter(). The limiter
+is a token bucket whose refill rate follows AIMD: it creeps up after a
+window of clean responses and is cut multiplicatively on a 429 (or any
+other throttle signal), honoring Retry-After when the server sends one.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+
+class AdaptiveRateLimiter:
+    def __init__(
+        self,
+        host: str,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        max_in_flight: int = 10,
+        burst: float = 1.0,
+        increase_step: Optional[float] = None,
+        decrease_factor: float = 2.0,
+        success_window: int = 50,
+    ):
+        self.host = host
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_in_flight = max_in_flight
+        self.burst = burst
+        self.increase_step = increase_step if increase_step is not None else rate * 0.1
+        self.decrease_factor = decrease_factor
+        self.success_window = success_window
+
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._streak = 0
+        self._in_flight = 0
+        self.requests = 0
+        self.throttles = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind(self):
+        # asyncio primitives belong to one loop; rebuild them for a new asyncio.run()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.max_in_flight)
+            self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        """Waits until the bucket has a token (and any Retry-After pause is over)."""
+        self._bind()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator["AdaptiveRateLimiter"]:
+        """`async with limiter.slot():` around a single request."""
+        self._bind()
+        async with self._sem:
+            await self.acquire()
+            self._in_flight += 1
+            try:
+                yield self
+            finally:
+                self._in_flight -= 1
+
+    def on_success(self):
+        self._streak += 1
+        if self._streak >= self.success_window:
+            self._streak = 0
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self._streak = 0
+        self.throttles += 1
+        self.rate = max(self.min_rate, self.rate / self.decrease_factor)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict:
+        return {
+            "host": self.host,
+            "rate": round(self.rate, 3),
+            "in_flight": self._in_flight,
+            "requests": self.requests,
+            "throttles": self.throttles,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_limiter(host: str, **budget) -> AdaptiveRateLimiter:
+    """Returns the process-wide limiter for host, creating it from budget on first use."""
+    if host not in _limiters:
+        _limiters[host] = AdaptiveRateLimiter(host, **budget)
+    return _limiters[host]
+
+
+def limiter_stats() -> List[Dict]:
+    return [limiter.stats() for limiter in _limiters.values()]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from analytics.backtest import build_subsets, sweep, synthetic_market
+
+SIZES = [25.0, 100.0, 500.0]
+HOLDS = [300, 3600, 6 * 3600, 86_400]
+
+
+@pytest.fixture(scope="module")
+def market():
+    return synthetic_market(n_wallets=40, n_tokens=200, n_buys=20_000, ticks_per_token=200, seed=7)
+
+
+def _skill_subsets(market, k=10):
+    """Row 0: the k most skilled wallets, row 1: the k least, then one row per wallet."""
+    order = np.argsort(market.skill)
+    n = len(market.wallets)
+    top, bottom = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+    top[order[-k:]] = True
+    bottom[order[:k]] = True
+    each, _ = build_subsets("each", n)
+    return np.vstack([top, bottom, each])
+
+
+def test_sweep_ranks_skilled_wallets_first(market):
+    subsets = _skill_subsets(market)
+    results = sweep(market, SIZES, HOLDS, subsets, workers=1)
+    rank = {}
+    for i, r in enumerate(results):
+        rank.setdefault(int(r["subset"]), i)  # best position of each subset
+
+    assert rank[0] < rank[1]
+    assert results[0]["subset"] != 1
+
+    # per-wallet: roi of a fixed config follows the hidden skill
+    cfg = results[(results["hold"] == 3600) & (results["size_usd"] == 100.0) & (results["subset"] >= 2)]
+    roi = np.empty(len(market.wallets))
+    roi[cfg["subset"] - 2] = cfg["roi"]
+    assert np.corrcoef(market.skill, roi)[0, 1] > 0.5
+
+
+def test_sweep_workers_give_identical_results(market):
+    subsets = _skill_subsets(market)
+    # an empty subset ties on roi with every other 0-trade row
+    subsets = np.vstack([subsets, np.zeros(len(market.wallets), dtype=bool)])
+    single = sweep(market, SIZES, HOLDS, subsets, workers=1)
+    pooled = sweep(market, SIZES, HOLDS, subsets, workers=3)
+    assert single.dtype == pooled.dtype
+    for field in single.dtype.names:
+        np.testing.assert_array_equal(single[field], pooled[field], err_msg=field)
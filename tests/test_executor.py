@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+from contextlib import aclosing
+
+import pytest
+
+from data.storage import get_connection
+from pipelines.executor import iter_in_thread, run_workers
+
+
+def test_iter_in_thread_keeps_the_loop_free(tmp_path):
+    db = tmp_path / "source.db"
+    conn = get_connection(db)
+    conn.execute("CREATE TABLE items (n INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT INTO items VALUES (?)", ((n,) for n in range(100)))
+    conn.commit()
+    threads = set()
+
+    def chunks():
+        # one connection for the whole iteration: sqlite refuses it on another thread
+        source_conn = get_connection(db)
+        for start in range(0, 100, 10):
+            threads.add(threading.get_ident())
+            time.sleep(0.02)  # a slow query
+            yield [r[0] for r in source_conn.execute(
+                "SELECT n FROM items WHERE n >= ? ORDER BY n LIMIT 10", (start,)
+            )]
+
+    async def go():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(tick())
+        got = [chunk async for chunk in iter_in_thread(chunks())]
+        ticker.cancel()
+        return got, ticks
+
+    got, ticks = asyncio.run(go())
+    assert [n for chunk in got for n in chunk] == list(range(100))
+    assert threads and threading.get_ident() not in threads and len(threads) == 1
+    assert ticks > 20  # the loop kept running while the source slept
+
+
+def test_run_workers_closes_an_async_source_on_failure():
+    closed = threading.Event()
+
+    def items():
+        try:
+            yield from range(1000)
+        finally:
+            closed.set()
+
+    async def source():
+        async with aclosing(iter_in_thread(items())) as chunks:
+            async for item in chunks:
+                yield item
+
+    async def handler(item):
+        if item == 5:
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_workers(source(), handler, workers=2))
+    assert closed.wait(2)
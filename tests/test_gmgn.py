@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from scrapers import gmgn
+from scrapers.http_client import SharedAsyncClient
+
+
+class _ScraperResponse:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"code": 0, "data": {"via": "cloudscraper"}}
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    """httpx answers every request with `state["status"]`; cloudscraper always gets through."""
+    state = {"status": 403, "httpx": 0, "cloudscraper": 0, "solves": 0}
+
+    def handler(request):
+        state["httpx"] += 1
+        if state["status"] == 403:
+            return httpx.Response(403, text="challenge")
+        return httpx.Response(200, json={"code": 0, "data": {"via": "httpx"}})
+
+    def scraper_get(url, **kwargs):
+        state["cloudscraper"] += 1
+        time.sleep(0.01)
+        return _ScraperResponse()
+
+    def solve():
+        state["solves"] += 1
+        return {"headers": {}, "generation": time.time()}
+
+    monkeypatch.setattr(gmgn, "_http", SharedAsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(gmgn.scraper, "get", scraper_get)
+    monkeypatch.setattr(gmgn, "_solve_clearance", solve)
+    monkeypatch.setattr(gmgn, "_clearance", None)
+    monkeypatch.setattr(gmgn, "_transport", gmgn._Transport())
+    limiter = gmgn.GMGN_LIMITER
+    # min_rate stays as configured: throttling on every 403 would show up as
+    # a collapsed rate
+    for attr, value in (("rate", 1000.0), ("max_rate", 1000.0), ("burst", 30.0)):
+        monkeypatch.setattr(limiter, attr, value)
+    return state
+
+
+def _fetch_all(n):
+    async def go():
+        return await asyncio.gather(
+            *(gmgn._fetch_gmgn_data("/api/v1/wallet_stat/sol/{wallet}/7d", f"w{i}", {}) for i in range(n))
+        )
+
+    return asyncio.run(go())
+
+
+def test_challenged_httpx_switches_the_host_to_cloudscraper(stubbed, capsys):
+    start = time.monotonic()
+    results = _fetch_all(200)
+    elapsed = time.monotonic() - start
+
+    assert all(r == {"via": "cloudscraper"} for r in results)
+    assert gmgn._transport.fallback
+    # only the requests in flight before the switch tried httpx, and no wallet
+    # sat out a back-off (2 + 4 + 8 s each, before this fix)
+    assert stubbed["httpx"] <= gmgn.MAX_IN_FLIGHT * gmgn.MAX_CLEARANCE_RETRIES
+    assert stubbed["cloudscraper"] == 200
+    assert stubbed["solves"] <= gmgn.MAX_CLEARANCE_RETRIES
+    assert "Cloudflare challenge for wallet" not in capsys.readouterr().out
+    assert gmgn.GMGN_LIMITER.rate > 500
+    assert elapsed < 5
+
+    # later wallets go straight to cloudscraper, without touching httpx
+    before = stubbed["httpx"]
+    _fetch_all(50)
+    assert stubbed["httpx"] == before
+
+
+def test_probe_returns_to_httpx_once_it_gets_through(stubbed, monkeypatch):
+    _fetch_all(20)
+    assert gmgn._transport.fallback
+
+    # still challenged: the probe fails and the interval backs off
+    gmgn._transport.probe_at = 0.0
+    _fetch_all(5)
+    assert gmgn._transport.fallback
+    assert gmgn._transport.probe_interval == 2 * gmgn.PROBE_INTERVAL
+
+    stubbed["status"] = 200
+    gmgn._transport.probe_at = 0.0
+    _fetch_all(5)
+    assert not gmgn._transport.fallback
+    assert _fetch_all(10) == [{"via": "httpx"}] * 10
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+import pytest
+
+from analytics.mock_rpc import start_mock_rpc
+from analytics.pnl import compute_pnl, load_fixture, load_wallet
+from scrapers import helius_utils
+from scrapers.helius_utils import get_wallet_transactions, helius_session
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "analytics", "fixtures", "wallet_swaps.json")
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+
+
+@pytest.fixture(scope="module")
+def fx():
+    return load_fixture(FIXTURE)
+
+
+@pytest.fixture
+def rpc(request, monkeypatch):
+    # small batches, so one wallet takes several batch requests
+    monkeypatch.setattr(helius_utils, "TX_BATCH_SIZE", 3)
+    server = start_mock_rpc([FIXTURE], port=0, **getattr(request, "param", {}))
+    host, port = server.server_address
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _run(coro):
+    async def go():
+        async with helius_session():
+            return await coro
+
+    return asyncio.run(go())
+
+
+@pytest.mark.parametrize(
+    "rpc",
+    [{}, {"shuffle_batches": True}, {"reject_batches": True}],
+    ids=["batched", "out-of-order", "batch-rejected"],
+    indirect=True,
+)
+def test_wallet_transactions_in_signature_order(fx, rpc):
+    expected = [
+        t["transaction"]["signatures"][0]
+        for t in sorted(fx["transactions"], key=lambda t: t["blockTime"], reverse=True)
+        if t["meta"].get("err") is None
+    ]
+    txs = _run(get_wallet_transactions(fx["wallet"], limit=100, rpc_url=rpc))
+    assert [t["transaction"]["signatures"][0] for t in txs] == expected
+
+
+def test_load_wallet_from_rpc(fx, rpc):
+    fills, prices = _run(load_wallet(fx["wallet"], rpc_url=rpc, sol_usd=fx["sol_usd"]))
+    assert prices == {m: p for m, p in fx["prices"].items() if m in fills.mints}
+    result = compute_pnl(fills, prices)
+    assert result["tokens"][BONK]["realized"] == pytest.approx(5625.0)
+    assert result["tokens"][BONK]["unrealized"] == pytest.approx(375.0)
+    assert result["realized"] == pytest.approx(7125.0)
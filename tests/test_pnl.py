@@ -0,0 +1,127 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from analytics.decoder import decode_transaction, decode_transactions
+from analytics.pnl import FillArrays, compute_pnl, load_fixture, to_pnl_stats
+from scrapers import binance
+from scrapers.binance import PriceHistory, get_sol_usd_history
+from scrapers.helius_utils import get_token_prices
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "analytics", "fixtures", "wallet_swaps.json")
+
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+WIF = "EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm"
+POPCAT = "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hr"
+
+
+@pytest.fixture(scope="module")
+def fx():
+    return load_fixture(FIXTURE)
+
+
+def _tx(fx, prefix):
+    return next(t for t in fx["transactions"] if t["transaction"]["signatures"][0].startswith(prefix))
+
+
+def test_fixture_pnl(fx):
+    fills = decode_transactions(fx["transactions"], fx["wallet"], fx["sol_usd"])
+    result = compute_pnl(FillArrays.from_fills(fills), fx["prices"])
+
+    assert len(fills) == 5
+    assert POPCAT not in result["tokens"]
+    bonk, wif = result["tokens"][BONK], result["tokens"][WIF]
+    assert bonk["realized"] == pytest.approx(5625.0)
+    assert bonk["unrealized"] == pytest.approx(375.0)
+    assert bonk["roi"] == pytest.approx(4 / 3)
+    assert wif["realized"] == pytest.approx(1500.0)
+    assert wif["unrealized"] == 0.0
+    assert wif["roi"] == pytest.approx(1.5)
+    assert result["unpriced"] == []
+    assert to_pnl_stats(result) == {
+        "realizedPnlUsd": pytest.approx(7125.0),
+        "unrealizedPnlUsd": pytest.approx(375.0),
+        "totalRevenueUsd": pytest.approx(11500.0),
+        "totalSpentUsd": pytest.approx(5500.0),
+    }
+
+
+@pytest.mark.parametrize(
+    "prefix",
+    [
+        "lor4leppGOgC",  # failed POPCAT buy
+        "vUj3rYiF5mqF",  # POPCAT transfer in, no quote leg
+        "sLJ0lCWmyHLQ",  # BONK -> WIF, token for token
+    ],
+)
+def test_non_swaps_produce_no_fill(fx, prefix):
+    assert decode_transaction(_tx(fx, prefix), fx["wallet"], fx["sol_usd"]) is None
+
+
+def test_open_position_without_price_is_reported(fx):
+    fills = decode_transactions(fx["transactions"], fx["wallet"], fx["sol_usd"])
+    result = compute_pnl(FillArrays.from_fills(fills), {})
+    assert result["unpriced"] == [BONK]
+    assert result["unrealized"] == 0.0
+
+
+def test_sol_legs_use_the_price_of_their_own_hour(fx):
+    # BONK is bought and sold against SOL, WIF against USDC
+    history = PriceHistory()
+    for ts, price in ((1716998400, 100.0), (1717002000, 200.0)):
+        history.ts.append(ts)
+        history.price.append(price)
+
+    fills = {f["signature"][:12]: f for f in decode_transactions(fx["transactions"], fx["wallet"], history)}
+    assert fills["fsEvBLeFkv5A"]["value_usd"] == pytest.approx(1000.0)  # 10 SOL at 100
+    assert fills["WgIprVFIV4BL"]["value_usd"] == pytest.approx(4000.0)  # 20 SOL at 200
+    assert fills["KVSErMiZSFAR"]["value_usd"] == pytest.approx(12000.0)  # 60 SOL at 200
+    assert fills["cWo5OshpNRge"]["value_usd"] == pytest.approx(1000.0)  # USDC, unchanged
+
+
+def test_sol_usd_history_pages_hourly_klines(monkeypatch):
+    requests = []
+
+    def handler(request):
+        start = int(request.url.params["startTime"]) // 1000
+        end = int(request.url.params["endTime"]) // 1000
+        limit = int(request.url.params["limit"])
+        requests.append(start)
+        hours = range(start, min(end, start + (limit - 1) * 3600) + 1, 3600)
+        return httpx.Response(200, json=[[h * 1000, "0", "0", "0", str(h // 3600 % 1000), "0"] for h in hours])
+
+    monkeypatch.setattr(binance.BINANCE_LIMITER, "rate", 1e6)
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await get_sol_usd_history(1717000000, 1717000000 + 1500 * 3600, client=client)
+
+    history = asyncio.run(go())
+    assert len(requests) == 2
+    assert len(history) == 1501
+    ts = 1717000000 + 1234 * 3600 + 59
+    assert history(ts) == float((ts - ts % 3600) // 3600 % 1000)
+    assert history(0) == history.price[0]
+
+
+def test_token_prices_from_asset_batch():
+    def handler(request):
+        assert b"getAssetBatch" in request.content
+        return httpx.Response(
+            200,
+            json={
+                "result": [
+                    {"id": BONK, "token_info": {"price_info": {"price_per_token": 0.003}}},
+                    {"id": POPCAT, "token_info": {}},
+                    None,
+                ]
+            },
+        )
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await get_token_prices([BONK, POPCAT, WIF], rpc_url="http://rpc", client=client)
+
+    assert asyncio.run(go()) == {BONK: 0.003}
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from data import raw_data
+from pipelines import process_tokens
+from scrapers import helius_utils
+from scrapers.http_client import SharedAsyncClient
+
+MINT = "mint1111"
+PAGES = {
+    None: {"token_accounts": [{"owner": "a", "amount": 1}, {"owner": "b", "amount": 2}], "cursor": "p2"},
+    "p2": {"token_accounts": [{"owner": "c", "amount": 3}], "cursor": "p3"},
+    "p3": {"token_accounts": []},
+}
+
+
+@pytest.fixture
+def helius(tmp_path, monkeypatch):
+    """Serves PAGES; `state["fail"]` is the cursor answered with a 500, `state["hang"]` one that never answers."""
+    state = {"fail": "-", "hang": "-"}
+
+    async def handler(request):
+        cursor = json.loads(request.content)["params"].get("cursor")
+        if cursor == state["fail"]:
+            return httpx.Response(500)
+        if cursor == state["hang"]:
+            await asyncio.Event().wait()
+        return httpx.Response(200, json={"result": PAGES[cursor]})
+
+    monkeypatch.setattr(raw_data, "DB_PATH", str(tmp_path / "raw_data.db"))
+    monkeypatch.setattr(raw_data, "_schema_ready", False)
+    monkeypatch.setattr(helius_utils, "HELIUS_API_KEY", "test")
+    monkeypatch.setattr(helius_utils, "_http", SharedAsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(helius_utils.HELIUS_LIMITER, "rate", 1e6)
+    return state
+
+
+def _holders():
+    conn, cursor = raw_data.connect_db()
+    return dict(cursor.execute(
+        "SELECT w.wallet_address, wt.balance FROM wallet_tokens wt JOIN wallets w USING (wallet_id)"
+    ).fetchall())
+
+
+def test_full_crawl_is_seen(helius):
+    asyncio.run(process_tokens.process_token({"address": MINT, "symbol": "T"}))
+    assert raw_data.get_seen_token_addresses([MINT]) == {MINT}
+    assert _holders() == {"a": 1, "b": 2, "c": 3}
+
+
+def test_failed_page_drops_the_partial_token(helius):
+    helius["fail"] = "p2"
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(process_tokens.process_token({"address": MINT, "symbol": "T"}))
+    assert raw_data.get_seen_token_addresses([MINT]) == set()
+    assert _holders() == {}
+
+    # the next run crawls it from scratch
+    helius["fail"] = "-"
+    asyncio.run(process_tokens.process_token({"address": MINT, "symbol": "T"}))
+    assert _holders() == {"a": 1, "b": 2, "c": 3}
+
+
+def test_cancelled_crawl_drops_the_partial_token(helius):
+    helius["hang"] = "p2"
+
+    async def go():
+        first_page = asyncio.Event()
+
+        async def on_ingest(owners):
+            first_page.set()
+
+        task = asyncio.create_task(
+            process_tokens.process_token({"address": MINT, "symbol": "T"}, on_ingest)
+        )
+        await first_page.wait()
+        assert _holders() == {"a": 1, "b": 2}  # page 1 was committed
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(go())
+    assert raw_data.get_seen_token_addresses([MINT]) == set()
+    assert _holders() == {}
+
+
+def test_blocking_wrapper_raises_instead_of_truncating(helius):
+    helius["fail"] = "p2"
+    with pytest.raises(httpx.HTTPStatusError):
+        helius_utils.get_token_accounts_rpc(MINT)
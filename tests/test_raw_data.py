@@ -0,0 +1,40 @@
+import pytest
+
+from data import raw_data
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(raw_data, "DB_PATH", str(tmp_path / "raw_data.db"))
+    monkeypatch.setattr(raw_data, "_schema_ready", False)
+    conn, _ = raw_data.connect_db()
+    return conn
+
+
+def _balances(conn, mint):
+    return dict(
+        conn.execute(
+            """
+            SELECT w.wallet_address, wt.balance FROM wallet_tokens wt
+            JOIN wallets w USING (wallet_id) JOIN tokens t USING (token_id)
+            WHERE t.mint = ?
+            """,
+            (mint,),
+        ).fetchall()
+    )
+
+
+def test_ingest_holders_sums_pages_of_one_crawl(db):
+    raw_data.ingest_holders("old", "OLD", [{"owner": "c", "amount": 1}])
+
+    # a's two token accounts land on different pages, c already holds another token
+    first = raw_data.ingest_holders("m", "M", [{"owner": "a", "amount": 1}, {"owner": "b", "amount": 2}])
+    second = raw_data.ingest_holders(
+        "m", "M", [{"owner": "a", "amount": 4}, {"owner": "c", "amount": 3}, {"owner": "c", "amount": 5}]
+    )
+
+    assert first == {"inserted": 2, "updated": 0}
+    assert second == {"inserted": 0, "updated": 1}
+    assert _balances(db, "m") == {"a": 5, "b": 2, "c": 8}
+    counts = dict(db.execute("SELECT wallet_address, token_count FROM wallets"))
+    assert counts == {"a": 1, "b": 1, "c": 2}
@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+
+from websockets.asyncio.server import serve
+
+from data import events_data
+from tracker import tracker as tracker_mod
+from tracker.mock_rpc import MockRpc
+from tracker.tracker import WalletTracker
+
+WALLETS = [f"wallet{i:02d}" for i in range(10)]
+
+
+def test_tracker_resubscribes_after_drops(tmp_path, monkeypatch):
+    monkeypatch.setattr(events_data, "DB_PATH", str(tmp_path / "events.db"))
+    monkeypatch.setattr(tracker_mod, "BACKOFF_BASE", 0.01)
+
+    mock = MockRpc(rate=400, drop_every=25)
+    connections = []
+    subscribed = []
+
+    async def handler(ws):
+        connections.append(ws)
+        await mock.handler(ws)
+
+    real_subscribe = WalletTracker._subscribe
+
+    async def counting_subscribe(self, ws, wallets):
+        subs = await real_subscribe(self, ws, wallets)
+        subscribed.append(sorted(subs.values()))
+        return subs
+
+    monkeypatch.setattr(WalletTracker, "_subscribe", counting_subscribe)
+
+    async def go():
+        async with serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            tracker = WalletTracker(WALLETS, ws_url=f"ws://127.0.0.1:{port}", batch_size=5)
+            await tracker.run(duration=1.5)
+            return tracker
+
+    tracker = asyncio.run(go())
+
+    # every connection, first or re-opened, carried the whole batch again
+    # (2 first connections + one per reconnect, less any still backing off)
+    assert tracker.reconnects >= 4
+    assert len(subscribed) == len(connections)
+    assert tracker.reconnects <= len(connections) <= tracker.reconnects + 2
+    assert all(subs in (WALLETS[:5], WALLETS[5:]) for subs in subscribed)
+    assert subscribed.count(WALLETS[:5]) >= 3 and subscribed.count(WALLETS[5:]) >= 3
+
+    # everything received made it into wallet_events, across the drops
+    conn = sqlite3.connect(events_data.DB_PATH)
+    rows = conn.execute("SELECT wallet, kind FROM wallet_events").fetchall()
+    assert tracker.dropped == 0
+    assert len(rows) == tracker.received > 2 * mock.drop_every
+    assert {wallet for wallet, _ in rows} <= set(WALLETS)
+    assert {kind for _, kind in rows} <= {"swap", "buy", "sell", "transfer", "other"}
@@ -0,0 +1,90 @@
+import random
+import sqlite3
+
+import pytest
+
+from data import raw_data, wallet_queries
+
+N = 2000
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """2000 wallets, some with NULL scores; token "all" is held by half of them, "few" by 20."""
+    monkeypatch.setattr(raw_data, "DB_PATH", str(tmp_path / "raw_data.db"))
+    monkeypatch.setattr(raw_data, "_schema_ready", False)
+    woi = sqlite3.connect(tmp_path / "woi.db")
+    woi.execute("CREATE TABLE good_wallets (wallet TEXT PRIMARY KEY)")
+    monkeypatch.setitem(wallet_queries.MEMBERSHIPS, "woi", ("woi", str(tmp_path / "woi.db"), "good_wallets", "wallet"))
+    monkeypatch.setitem(wallet_queries.MEMBERSHIPS, "smart", ("smart", str(tmp_path / "none.db"), "smart_wallets", "wallet"))
+
+    rnd = random.Random(3)
+    conn, cursor = raw_data.connect_db()
+    cursor.executemany(
+        "INSERT INTO wallets (wallet_address, score) VALUES (?, ?)",
+        ((f"w{i}", None if i % 7 == 0 else round(rnd.random(), 2)) for i in range(N)),
+    )
+    cursor.executemany("INSERT INTO tokens (mint) VALUES (?)", (("all",), ("few",)))
+    pairs = [(w, 1) for w in rnd.sample(range(1, N + 1), N // 2)]
+    pairs += [(w, 2) for w in rnd.sample(range(1, N + 1), 20)]
+    cursor.executemany("INSERT INTO wallet_tokens (wallet_id, token_id) VALUES (?, ?)", pairs)
+    cursor.executemany("INSERT INTO wallet_tags VALUES (?, 'bot')", ((w,) for w in range(1, N + 1, 3)))
+    conn.commit()
+    woi.executemany("INSERT INTO good_wallets VALUES (?)", ((f"w{i}",) for i in range(0, N, 5)))
+    woi.commit()
+    return conn
+
+
+def _all_pages(**kwargs):
+    got, after = [], None
+    while True:
+        page = wallet_queries.query_wallets(after=after, limit=37, **kwargs)
+        got += [w["wallet_address"] for w in page["wallets"]]
+        after = page["next"]
+        if after is None:
+            return got
+
+
+def _expected(conn, sort, where=""):
+    return [
+        r[0]
+        for r in conn.execute(
+            f"SELECT wallet_address FROM wallets w {where} ORDER BY {sort} DESC, wallet_id DESC"
+        )
+    ]
+
+
+def test_null_scores_are_paged(db):
+    assert db.execute("SELECT COUNT(*) FROM wallets WHERE score IS NULL").fetchone()[0] == 0
+    db.execute("UPDATE wallets SET score = NULL WHERE wallet_id = 5")
+    assert db.execute("SELECT score FROM wallets WHERE wallet_id = 5").fetchone()[0] == 0.0
+
+    got = _all_pages(sort="score")
+    assert len(got) == N
+    assert got == _expected(db, "score")
+
+
+@pytest.mark.parametrize("sort", wallet_queries.SORTS)
+@pytest.mark.parametrize(
+    "filters, where",
+    [
+        ({"token": "all"}, "WHERE wallet_id IN (SELECT wallet_id FROM wallet_tokens WHERE token_id = 1)"),
+        ({"token": "few"}, "WHERE wallet_id IN (SELECT wallet_id FROM wallet_tokens WHERE token_id = 2)"),
+        ({"tag": "bot", "member": "woi"}, "WHERE wallet_id % 3 = 1 AND CAST(substr(wallet_address, 2) AS INT) % 5 = 0"),
+        (
+            {"token": "few", "tag": "bot"},
+            "WHERE wallet_id % 3 = 1 AND wallet_id IN (SELECT wallet_id FROM wallet_tokens WHERE token_id = 2)",
+        ),
+    ],
+    ids=["common-token", "rare-token", "tag-and-member", "rare-token-and-tag"],
+)
+def test_filtered_pages_match_a_full_sort(db, sort, filters, where):
+    assert _all_pages(sort=sort, **filters) == _expected(db, sort, where)
+
+
+def test_filter_driver_choice(db):
+    _, cursor = raw_data.connect_db()
+    common = ("wallet_tokens", "wallet_id", "wallet_id", "token_id", 1)
+    rare = ("wallet_tokens", "wallet_id", "wallet_id", "token_id", 2)
+    assert wallet_queries._pick_driver(cursor, [common], 50) is None
+    assert wallet_queries._pick_driver(cursor, [common, rare], 50) == 1
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from data import writer as writer_mod
+from data.storage import get_connection
+from data.writer import DBWriter
+
+
+def _insert(conn, x):
+    conn.execute("INSERT INTO t VALUES (?)", (x,))
+
+
+def _bad(conn, x):
+    conn.execute("INSERT INTO t VALUES (?)", (x,))
+    raise KeyError(x)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "w.db"
+    conn = get_connection(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    return path
+
+
+def _rows(path):
+    return sorted(r[0] for r in sqlite3.connect(path).execute("SELECT x FROM t"))
+
+
+def test_failing_op_is_rolled_back_alone(db):
+    async def go():
+        async with DBWriter(db, batch_rows=4) as w:
+            for i in range(6):
+                await w.write(_bad if i % 3 == 2 else _insert, i)
+        return w
+
+    w = asyncio.run(go())
+    assert _rows(db) == [0, 1, 3, 4]
+    assert w.written == 4 and w.errors == 2
+
+
+def test_failed_commit_keeps_the_thread_alive(db, monkeypatch):
+    class Flaky(sqlite3.Connection):
+        fails = 1
+
+        def commit(self):
+            if Flaky.fails:
+                Flaky.fails -= 1
+                raise sqlite3.OperationalError("database is locked")
+            super().commit()
+
+    monkeypatch.setattr(
+        writer_mod,
+        "get_connection",
+        lambda path: sqlite3.connect(path, factory=Flaky, check_same_thread=False),
+    )
+
+    async def go():
+        async with DBWriter(db, batch_rows=5) as w:
+            for i in range(12):
+                await w.write(_insert, i)
+            await asyncio.wait_for(w.flush(), 5)
+            assert w._thread.is_alive()
+        return w
+
+    w = asyncio.run(go())
+    assert _rows(db) == list(range(5, 12))  # first batch lost, the rest committed
+    assert w.errors == 5 and w.written == 7
+
+
+def test_fatal_error_reaches_the_submitters(db, monkeypatch):
+    def broken(path):
+        raise MemoryError("boom")
+
+    monkeypatch.setattr(writer_mod, "get_connection", broken)
+
+    async def go():
+        w = DBWriter(db, queue_size=2).start()
+        while w._error is None:  # the thread stays up, draining the queue
+            await asyncio.sleep(0.01)
+        for call in (lambda: w.write(_insert, 1), w.flush, w.close):
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(call(), 5)
+
+    asyncio.run(go())
@@ -0,0 +1,128 @@
+"""
+tracker/mock_rpc.py
+───────────────────
+Local stand-in for a Solana RPC websocket, for tracker tests and load runs.
+
+Speaks the logsSubscribe / logsUnsubscribe subset of the pubsub API and
+emits logsNotification messages for random subscribed wallets at --rate
+events per second per connection. --drop-every N closes each connection
+after N notifications, to exercise reconnect + resubscribe.
+
+Run:
+    python -m tracker.mock_rpc [--port 8900] [--rate 50] [--drop-every 0]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import string
+from typing import Dict
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+SAMPLE_LOGS = (
+    ["Program JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4 invoke [1]", "Program log: Instruction: Swap"],
+    ["Program 6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P invoke [1]", "Program log: Instruction: Buy"],
+    ["Program 6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P invoke [1]", "Program log: Instruction: Sell"],
+    ["Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA invoke [1]", "Program log: Instruction: Transfer"],
+    ["Program ComputeBudget111111111111111111111111111111 invoke [1]"],
+)
+
+
+class MockRpc:
+    def __init__(self, rate: float = 50.0, drop_every: int = 0, fail_rate: float = 0.05):
+        self.rate = rate
+        self.drop_every = drop_every
+        self.fail_rate = fail_rate
+        self.sub_ids = itertools.count(1)
+        self.slot = 300_000_000
+        self.connections = 0
+        self.sent = 0
+
+    def _notification(self, sub_id: int) -> str:
+        self.slot += 1
+        signature = "".join(random.choices(string.ascii_letters + string.digits, k=88))
+        return json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "method": "logsNotification",
+                "params": {
+                    "subscription": sub_id,
+                    "result": {
+                        "context": {"slot": self.slot},
+                        "value": {
+                            "signature": signature,
+                            "err": {"InstructionError": [0, "Custom"]}
+                            if random.random() < self.fail_rate
+                            else None,
+                            "logs": random.choice(SAMPLE_LOGS),
+                        },
+                    },
+                },
+            }
+        )
+
+    async def _emit(self, ws, subs: Dict[int, str]):
+        sent = 0
+        while True:
+            await asyncio.sleep(random.expovariate(self.rate) if self.rate > 0 else 3600)
+            if not subs:
+                continue
+            await ws.send(self._notification(random.choice(list(subs))))
+            sent += 1
+            self.sent += 1
+            if self.drop_every and sent >= self.drop_every:
+                await ws.close(code=1011, reason="mock drop")
+                return
+
+    async def handler(self, ws):
+        self.connections += 1
+        subs: Dict[int, str] = {}
+        emitter = asyncio.create_task(self._emit(ws, subs))
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                method, params = msg.get("method"), msg.get("params") or []
+                if method == "logsSubscribe":
+                    mentions = (params[0] if params else {}).get("mentions") or []
+                    if len(mentions) != 1:
+                        reply = {"error": {"code": -32602, "message": "mentions must hold one pubkey"}}
+                    else:
+                        sub_id = next(self.sub_ids)
+                        subs[sub_id] = mentions[0]
+                        reply = {"result": sub_id}
+                elif method == "logsUnsubscribe":
+                    reply = {"result": subs.pop(params[0] if params else None, None) is not None}
+                else:
+                    reply = {"error": {"code": -32601, "message": "Method not found"}}
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": msg.get("id"), **reply}))
+        except ConnectionClosed:
+            pass
+        finally:
+            emitter.cancel()
+            self.connections -= 1
+
+
+async def run_mock_rpc(host: str = "127.0.0.1", port: int = 8900, **kwargs):
+    mock = MockRpc(**kwargs)
+    async with serve(mock.handler, host, port, max_size=None):
+        print(f"[INFO] Mock RPC websocket on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--rate", type=float, default=50.0, help="events/s per connection")
+    parser.add_argument("--drop-every", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            run_mock_rpc(args.host, args.port, rate=args.rate, drop_every=args.drop_every)
+        )
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,253 @@
+"""
+tracker/tracker.py
+──────────────────
+Real-time activity tracker for the wallets in smart.db.
+
+Wallets are split into batches. Each batch shares ONE websocket connection
+carrying a logsSubscribe (mentions: wallet) subscription per wallet, and
+notifications are routed back to their wallet by subscription id. A
+dropped connection is re-opened with exponential backoff and every
+subscription of the batch is re-sent.
+
+Decoded events go into a bounded in-process queue (tracker.events) and,
+from there, into the append-only wallet_events table of data/events.db
+via a DBWriter. When consumers fall behind and the queue is full, new
+events are dropped and counted rather than stalling the sockets.
+
+Run:
+    python -m tracker.tracker [--ws-url wss://...] [--batch-size 100]
+    python -m tracker.tracker --ws-url ws://127.0.0.1:8900   # against tracker/mock_rpc.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidURI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from data import events_data
+from data.storage import get_connection
+from data.writer import DBWriter
+
+SMART_DB = os.path.join(os.path.dirname(__file__), "..", "data", "smart.db")
+
+WS_URL = f"wss://mainnet.helius-rpc.com/?api-key={os.getenv('HELIUS_API_KEY')}"
+BATCH_SIZE = 100  # subscriptions per websocket connection
+QUEUE_SIZE = 10_000  # decoded events buffered in memory
+PING_INTERVAL = 20  # seconds; keeps idle connections from being reaped
+SUBSCRIBE_TIMEOUT = 30  # seconds for a whole batch to be acknowledged
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+COMMITMENT = "confirmed"
+
+# first matching log line wins; anything else is "other"
+EVENT_KINDS = (
+    ("Instruction: Swap", "swap"),
+    ("Instruction: Buy", "buy"),
+    ("Instruction: Sell", "sell"),
+    ("Instruction: Transfer", "transfer"),
+)
+
+
+def _parse(raw) -> Optional[Dict]:
+    """JSON object from a websocket frame, or None (logged) for anything else."""
+    try:
+        msg = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        print(f"[WARN] Skipping unparseable frame: {e}")
+        return None
+    if not isinstance(msg, dict):
+        print(f"[WARN] Skipping non-object frame: {str(raw)[:200]}")
+        return None
+    return msg
+
+
+def load_smart_wallets() -> List[str]:
+    conn = get_connection(SMART_DB)
+    return [r[0] for r in conn.execute("SELECT wallet FROM smart_wallets ORDER BY wallet")]
+
+
+def decode_logs_notification(wallet: str, result: Dict) -> Dict:
+    """Turns a logsNotification result into a flat event dict."""
+    value = result.get("value") or {}
+    logs = value.get("logs") or []
+    kind = "other"
+    for marker, name in EVENT_KINDS:
+        if any(marker in line for line in logs):
+            kind = name
+            break
+    return {
+        "wallet": wallet,
+        "signature": value.get("signature"),
+        "slot": (result.get("context") or {}).get("slot"),
+        "kind": kind,
+        "failed": value.get("err") is not None,
+        "logs": logs,
+        "received_at": time.time(),
+    }
+
+
+class WalletTracker:
+    def __init__(
+        self,
+        wallets: List[str],
+        ws_url: str = WS_URL,
+        batch_size: int = BATCH_SIZE,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.ws_url = ws_url
+        self.batches = [wallets[i : i + batch_size] for i in range(0, len(wallets), batch_size)]
+        self.events: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.received = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.connected = 0
+
+    def _push(self, event: Dict) -> None:
+        try:
+            self.events.put_nowait(event)
+            self.received += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"[WARN] Event queue full, dropped {self.dropped} events so far")
+
+    async def _subscribe(self, ws, wallets: List[str]) -> Dict[int, str]:
+        """Sends one logsSubscribe per wallet; returns subscription id -> wallet."""
+        for request_id, wallet in enumerate(wallets):
+            await ws.send(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": "logsSubscribe",
+                        "params": [{"mentions": [wallet]}, {"commitment": COMMITMENT}],
+                    }
+                )
+            )
+        subs: Dict[int, str] = {}
+        pending = set(range(len(wallets)))
+        while pending:
+            msg = _parse(await ws.recv())
+            if msg is None:
+                continue
+            if msg.get("id") in pending:
+                pending.discard(msg["id"])
+                if "result" in msg:
+                    subs[msg["result"]] = wallets[msg["id"]]
+                else:
+                    print(f"[WARN] logsSubscribe failed for {wallets[msg['id']]}: {msg.get('error')}")
+            elif msg.get("method") == "logsNotification":
+                # early notification for a subscription confirmed a moment ago
+                self._route(subs, msg)
+        return subs
+
+    def _route(self, subs: Dict[int, str], msg: Dict) -> None:
+        try:
+            params = msg.get("params") or {}
+            wallet = subs.get(params.get("subscription"))
+            event = decode_logs_notification(wallet, params.get("result") or {}) if wallet else None
+        except (AttributeError, TypeError) as e:
+            print(f"[WARN] Skipping malformed notification: {e!r}")
+            return
+        if event:
+            self._push(event)
+
+    async def _run_batch(self, index: int, wallets: List[str]) -> None:
+        """Keeps one connection for this batch alive forever."""
+        attempt = 0
+        while True:
+            try:
+                async with connect(self.ws_url, ping_interval=PING_INTERVAL, max_size=None) as ws:
+                    subs = await asyncio.wait_for(
+                        self._subscribe(ws, wallets), SUBSCRIBE_TIMEOUT
+                    )
+                    self.connected += 1
+                    print(f"[INFO] Batch {index}: {len(subs)}/{len(wallets)} wallets subscribed")
+                    attempt = 0
+                    try:
+                        async for raw in ws:
+                            msg = _parse(raw)
+                            if msg is not None and msg.get("method") == "logsNotification":
+                                self._route(subs, msg)
+                    finally:
+                        self.connected -= 1
+            except (ConnectionClosed, InvalidHandshake, InvalidURI, OSError, asyncio.TimeoutError) as e:
+                print(f"[WARN] Batch {index} connection lost: {e!r}")
+            except Exception as e:
+                # anything else must not end the batch for good: reconnect
+                print(f"[ERROR] Batch {index} failed: {e!r}")
+            # a clean server close lands here too; always reconnect
+            attempt += 1
+            self.reconnects += 1
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _persist(self, writer: DBWriter) -> None:
+        while True:
+            event = await self.events.get()
+            await writer.write(events_data.append_event, event)
+
+    async def run(self, persist: bool = True, duration: Optional[float] = None) -> None:
+        """Tracks until cancelled (or for duration seconds)."""
+        tasks = [
+            asyncio.create_task(self._run_batch(i, batch)) for i, batch in enumerate(self.batches)
+        ]
+        writer = None
+        if persist:
+            events_data.initialize_events_db()
+            writer = DBWriter(events_data.DB_PATH).start()
+            tasks.append(asyncio.create_task(self._persist(writer)))
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if writer is not None:
+                # whatever the persister had not picked up yet
+                while not self.events.empty():
+                    await writer.write(events_data.append_event, self.events.get_nowait())
+                await writer.close()
+
+    def stats(self) -> Dict:
+        return {
+            "batches": len(self.batches),
+            "connected": self.connected,
+            "received": self.received,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "queued": self.events.qsize(),
+        }
+
+
+async def main(ws_url: str, batch_size: int, duration: Optional[float]):
+    wallets = load_smart_wallets()
+    tracker = WalletTracker(wallets, ws_url=ws_url, batch_size=batch_size)
+    print(f"[INFO] Tracking {len(wallets)} smart wallets over {len(tracker.batches)} connections")
+    try:
+        await tracker.run(duration=duration)
+    finally:
+        print(f"[INFO] Tracker stats: {tracker.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ws-url", default=WS_URL)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--duration", type=float, default=None, help="seconds; default forever")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.ws_url, args.batch_size, args.duration))
+    except KeyboardInterrupt:
+        print("[INFO] Tracker stopped")
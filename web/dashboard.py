@@ -1,14 +1,73 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from data.raw_data import export_all_wallets
+from flask import Flask, jsonify, render_template, request
+
+from data import raw_data
+from data.query_cache import QueryCache
+from data.wallet_queries import query_wallets, get_wallet, PAGE_SIZE, WOI_DB, SMART_DB
 
 app = Flask(__name__)
 
+# Served from memory until a pipeline commits to one of these DBs
+QUERY_CACHE = QueryCache([raw_data.DB_PATH, WOI_DB, SMART_DB])
+
+
+def cached_json(key, compute):
+    """
+    JSON response for key via QUERY_CACHE, with an ETag derived from the DB
+    versions. A matching If-None-Match gets a 304 without running the query.
+    compute() returning None means 404.
+    """
+    etag = QUERY_CACHE.etag(key, QUERY_CACHE.versions())
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        value, etag = QUERY_CACHE.get_or_compute(key, compute)
+        if value is None:
+            return jsonify({"error": "not found"}), 404
+        resp = jsonify(value)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"  # always revalidate, usually a 304
+    return resp
+
+
 @app.route("/")
 def home():
-    wallets = export_all_wallets()
-    return render_template("dashboard.html", wallets=wallets)
+    # The page is a shell; rows are loaded page by page from /api/wallets
+    return render_template("dashboard.html", page_size=PAGE_SIZE)
+
+
+@app.route("/api/wallets")
+def api_wallets():
+    """
+    ?sort=token_count|score &token=<mint> &tag=<tag> &member=woi|smart
+    &after=<cursor from the previous page> &limit=<rows, max 500>
+    """
+    args = request.args
+    params = dict(
+        sort=args.get("sort", "token_count"),
+        token=args.get("token") or None,
+        tag=args.get("tag") or None,
+        member=args.get("member") or None,
+        after=args.get("after") or None,
+        limit=args.get("limit", PAGE_SIZE, type=int),
+    )
+    try:
+        return cached_json(("wallets", *params.items()), lambda: query_wallets(**params))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/wallets/<address>")
+def api_wallet(address):
+    return cached_json(("wallet", address), lambda: get_wallet(address))
+
+
+@app.route("/api/cache")
+def api_cache():
+    return jsonify(QUERY_CACHE.stats())
+
 
 if __name__ == "__main__":
     app.run(debug=True)